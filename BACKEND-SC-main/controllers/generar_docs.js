@@ -1,17 +1,128 @@
-import { exec } from 'child_process'
+import { exec, spawn } from 'child_process'
 import { fileURLToPath } from 'url'
 import path from 'path';
 import { dirname, resolve } from 'path'
 import fs from 'fs/promises'
 import { writeFileSync, unlinkSync } from 'fs'
 import { Buffer } from "buffer"
+import axios from 'axios'
 
 const __filename = fileURLToPath(import.meta.url)
 const __dirname = dirname(__filename)
 
+// Si URL_SERVICIO_DOCUMENTOS está definida (ej: http://127.0.0.1:5000), los documentos
+// se generan en el servicio Python residente (scripts_python/servidor_documentos)
+// en lugar de lanzar un intérprete nuevo por cada pedido
+async function generarEnServicio(ruta, body) {
+  const respuesta = await axios.post(`${process.env.URL_SERVICIO_DOCUMENTOS}${ruta}`, body, {
+    responseType: 'arraybuffer',
+    maxBodyLength: Infinity,
+    maxContentLength: Infinity
+  })
+  return Buffer.from(respuesta.data)
+}
+
+// Cola de trabajos del servicio de documentos: el pedido se encola y se
+// consulta después, sin dejar la conexión abierta mientras se genera
+async function pedirTrabajo(metodo, ruta, opciones = {}) {
+  return axios({
+    method: metodo,
+    url: `${process.env.URL_SERVICIO_DOCUMENTOS}${ruta}`,
+    maxBodyLength: Infinity,
+    maxContentLength: Infinity,
+    // Los 4xx del servicio (inexistente, vencido, sin terminar) se devuelven tal cual
+    validateStatus: (estado) => estado < 500,
+    ...opciones
+  })
+}
+
+// Desde esta cantidad de renglones la oferta se genera con --memoria-acotada:
+// renglones leídos de a uno y PDF en un temporal (ver generador_pdf/oferta_acotada.py)
+const RENGLONES_MEMORIA_ACOTADA = 5000
+
+// Desde esta cantidad de renglones (y por debajo de la memoria acotada) la tabla
+// de demanda se arma en varios procesos (ver generador_pdf/oferta_paralela.py)
+const RENGLONES_PARALELO = 1000
+
+// Los scripts se ejecutan con --binario: la salida es una trama (ver scripts_python/comun/salida.py)
+// "SCD1" | largo del encabezado (uint32 BE) | encabezado JSON | bytes del documento
+function leerTramaDocumento(salida) {
+  if (salida.subarray(0, 4).toString('latin1') !== 'SCD1') {
+    throw new Error('La salida del script no es una trama de documento')
+  }
+  const largoEncabezado = salida.readUInt32BE(4)
+  const inicioContenido = 8 + largoEncabezado
+  const encabezado = JSON.parse(salida.subarray(8, inicioContenido).toString('utf8'))
+  const contenido = salida.subarray(inicioContenido, inicioContenido + encabezado.size)
+  return { encabezado, contenido }
+}
+
+// Los scripts escriben en stderr una línea JSON de métricas por documento
+// (ver scripts_python/comun/metricas.py); se pasan al log para poder agregarlas
+function registrarMetricas(stderr) {
+  const texto = stderr ? stderr.toString('utf8').trim() : ''
+  if (texto) console.log(texto)
+}
+
+// Ejecuta un script de lote que escribe un zip en stdout y lo va enviando a
+// medida que llega. Si el script falla antes de mandar nada se responde 500;
+// si falla con el zip a medio enviar se corta la conexión, para que el cliente
+// no reciba un zip truncado con 200. alTerminar se llama una sola vez
+function enviarZipDeScript(res, comando, nombreArchivo, respuestaError, alTerminar) {
+  const proceso = spawn(comando, { shell: true })
+  let stderr = ""
+  let enviando = false
+  let terminado = false
+
+  const terminar = () => {
+    if (terminado) return false
+    terminado = true
+    alTerminar()
+    return true
+  }
+
+  proceso.stderr.on("data", (chunk) => { stderr += chunk })
+  proceso.stdout.on("data", (chunk) => {
+    if (!enviando) {
+      enviando = true
+      res.setHeader("Content-Type", "application/zip")
+      res.setHeader("Content-Disposition", `attachment; filename="${nombreArchivo}"`)
+    }
+    res.write(chunk)
+  })
+  proceso.on("error", (err) => {
+    if (!terminar()) return
+    console.error("No se pudo ejecutar el script del lote:", err.message)
+    if (!enviando) return res.status(500).json(respuestaError)
+    res.destroy(err)
+  })
+  proceso.on("close", (codigo) => {
+    if (!terminar()) return
+    if (codigo !== 0) {
+      console.error("Error en ejecución:", stderr)
+      if (!enviando) return res.status(500).json(respuestaError)
+      return res.destroy()
+    }
+    registrarMetricas(stderr)
+    res.end()
+  })
+}
+
 export class GenerarDocumentoController {
   static async generarExcel(req, res) {
     console.log("excel aqui")
+    if (process.env.URL_SERVICIO_DOCUMENTOS) {
+      try {
+        const buffer = await generarEnServicio('/generarexcel', req.body)
+        res.setHeader("Content-Disposition", "attachment; filename=datos.xlsx")
+        res.setHeader("Content-Type", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        return res.send(buffer)
+      } catch (e) {
+        console.error("Error en servicio de documentos:", e.message)
+        return res.status(500).json({ error: "Error al generar Excel" })
+      }
+    }
+
     const rutaScript = resolve(__dirname, "../scripts_python/generador_excel/generador_excel.py")
     const inputJson = JSON.stringify(req.body)
     const jsonTempPath = resolve(__dirname, "../scripts_python/generador_excel/input_excel.json")
@@ -19,7 +130,7 @@ export class GenerarDocumentoController {
     try {
       writeFileSync(jsonTempPath, inputJson, { encoding: "utf-8" })
 
-      exec(`py "${rutaScript}" < "${jsonTempPath}"`, { maxBuffer: 10 * 1024 * 1024 }, (error, stdout, stderr) => {
+      exec(`py "${rutaScript}" --binario < "${jsonTempPath}"`, { encoding: 'buffer', maxBuffer: 10 * 1024 * 1024 }, (error, stdout, stderr) => {
         try {
           // Siempre intentamos borrar el archivo
           unlinkSync(jsonTempPath)
@@ -33,12 +144,12 @@ export class GenerarDocumentoController {
         }
 
         try {
-          const output = JSON.parse(stdout)
-          const buffer = Buffer.from(output.contentBase64, 'base64')
+          const { encabezado, contenido } = leerTramaDocumento(stdout)
+          registrarMetricas(stderr)
 
-          res.setHeader("Content-Disposition", `attachment; filename=${output.fileName}`)
-          res.setHeader("Content-Type", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-          res.send(buffer)
+          res.setHeader("Content-Disposition", `attachment; filename=${encabezado.fileName}`)
+          res.setHeader("Content-Type", encabezado.contentType)
+          res.send(contenido)
         } catch (e) {
           console.error("Error al parsear JSON:", stdout)
           return res.status(500).json({ error: "Error al generar Excel" })
@@ -50,14 +161,29 @@ export class GenerarDocumentoController {
   }
 
   static async generarPdf(req, res) {
+    if (process.env.URL_SERVICIO_DOCUMENTOS) {
+      try {
+        const pdfBuffer = await generarEnServicio('/generarpdf', req.body)
+        res.setHeader("Content-Type", "application/pdf")
+        res.setHeader("Content-Disposition", 'inline; filename="documento.pdf"')
+        return res.send(pdfBuffer)
+      } catch (e) {
+        console.error("Error en servicio de documentos:", e.message)
+        return res.status(500).json({ mensaje: "Error al procesar PDF" })
+      }
+    }
+
     const rutaScript = resolve(__dirname, "../scripts_python/generador_pdf/generar_pdf_local.py")
     const jsonTempPath = resolve(__dirname, "input_pdf.json")
-    const inputJson = JSON.stringify(req.body)
+    const cantidadRenglones = req.body?.data_renglones?.length || 0
+    const opciones = cantidadRenglones >= RENGLONES_MEMORIA_ACOTADA ? " --memoria-acotada" : ""
+    const paralelo = req.body?.paralelo ?? cantidadRenglones >= RENGLONES_PARALELO
+    const inputJson = JSON.stringify({ ...req.body, paralelo })
 
     try {
       writeFileSync(jsonTempPath, inputJson, { encoding: "utf-8" })
 
-      exec(`py "${rutaScript}" < "${jsonTempPath}"`, { maxBuffer: 15 * 1024 * 1024 }, (error, stdout, stderr) => {
+      exec(`py "${rutaScript}" --binario${opciones} < "${jsonTempPath}"`, { encoding: 'buffer', maxBuffer: 15 * 1024 * 1024 }, (error, stdout, stderr) => {
         unlinkSync(jsonTempPath)
 
         if (error) {
@@ -66,12 +192,12 @@ export class GenerarDocumentoController {
         }
 
         try {
-          const output = JSON.parse(stdout)
-          const pdfBuffer = Buffer.from(output.contentBase64, 'base64')
+          const { encabezado, contenido } = leerTramaDocumento(stdout)
+          registrarMetricas(stderr)
 
-          res.setHeader("Content-Type", "application/pdf")
-          res.setHeader("Content-Disposition", 'inline; filename="documento.pdf"')
-          res.send(pdfBuffer)
+          res.setHeader("Content-Type", encabezado.contentType)
+          res.setHeader("Content-Disposition", `inline; filename="${encabezado.fileName}"`)
+          res.send(contenido)
         } catch (e) {
           console.error("Error al parsear salida:", stdout)
           return res.status(500).json({ mensaje: "Error al procesar PDF" })
@@ -82,7 +208,46 @@ export class GenerarDocumentoController {
     }
   }
 
+  static async generarPdfLote(req, res) {
+    const rutaScript = resolve(__dirname, "../scripts_python/generador_pdf/generar_pdf_lote.py")
+    const jsonTempPath = resolve(__dirname, `input_pdf_lote_${Date.now()}.json`)
+    const inputJson = JSON.stringify(req.body)
+
+    try {
+      writeFileSync(jsonTempPath, inputJson, { encoding: "utf-8" })
+
+      // El zip se va enviando a medida que el script termina cada PDF
+      enviarZipDeScript(
+        res,
+        `py "${rutaScript}" < "${jsonTempPath}"`,
+        "ofertas.zip",
+        { mensaje: "Error al generar el lote de PDFs" },
+        () => {
+          try {
+            unlinkSync(jsonTempPath)
+          } catch (err) {
+            console.warn("No se pudo eliminar el archivo temporal del lote:", err.message)
+          }
+        }
+      )
+    } catch (e) {
+      return res.status(500).json({ mensaje: "Error inesperado al generar el lote de PDFs" })
+    }
+  }
+
   static async generarPartePDF(req, res) {
+    if (process.env.URL_SERVICIO_DOCUMENTOS) {
+      try {
+        const pdfBuffer = await generarEnServicio('/generarparteentregas', req.body)
+        res.setHeader("Content-Disposition", 'attachment; filename="parte_entregas.pdf"')
+        res.setHeader("Content-Type", "application/pdf")
+        return res.send(pdfBuffer)
+      } catch (e) {
+        console.error("Error en servicio de documentos:", e.message)
+        return res.status(500).json({ error: "Error al generar PDF" })
+      }
+    }
+
     const rutaScript = resolve(__dirname, "../scripts_python/generador_parte_entregas/retorno_parte_entregas.py")
     const jsonTempPath = resolve(__dirname, "input_parte.json")
     const inputJson = JSON.stringify(req.body)
@@ -90,7 +255,7 @@ export class GenerarDocumentoController {
     try {
       writeFileSync(jsonTempPath, inputJson, { encoding: "utf-8" })
 
-      exec(`py "${rutaScript}" < "${jsonTempPath}"`, { maxBuffer: 10 * 1024 * 1024 }, (error, stdout, stderr) => {
+      exec(`py "${rutaScript}" --binario < "${jsonTempPath}"`, { encoding: 'buffer', maxBuffer: 10 * 1024 * 1024 }, (error, stdout, stderr) => {
         unlinkSync(jsonTempPath)
 
         if (error) {
@@ -99,13 +264,12 @@ export class GenerarDocumentoController {
         }
 
         try {
-          const output = JSON.parse(stdout)
-
-          const pdfBuffer = Buffer.from(output.contentBase64, 'base64')
+          const { encabezado, contenido } = leerTramaDocumento(stdout)
+          registrarMetricas(stderr)
 
-          res.setHeader("Content-Disposition", `attachment; filename="${output.fileName}"`)
-          res.setHeader("Content-Type", "application/pdf")
-          res.send(pdfBuffer)
+          res.setHeader("Content-Disposition", `attachment; filename="${encabezado.fileName}"`)
+          res.setHeader("Content-Type", encabezado.contentType)
+          res.send(contenido)
         } catch (e) {
           console.error("Error al parsear JSON:", stdout)
           console.log("ERROR:", e.message)
@@ -117,6 +281,109 @@ export class GenerarDocumentoController {
     }
   }
 
+  // Partes de todo un día de despacho: un PDF combinado (formato "pdf", por
+  // defecto) o un zip con un PDF por parte (formato "zip")
+  static async generarParteLote(req, res) {
+    const rutaScript = resolve(__dirname, "../scripts_python/generador_parte_entregas/generar_partes_lote.py")
+    const jsonTempPath = resolve(__dirname, `input_partes_lote_${Date.now()}.json`)
+    const inputJson = JSON.stringify(req.body)
+    const formato = req.body?.formato ?? "pdf"
+
+    const eliminarTemporal = () => {
+      try {
+        unlinkSync(jsonTempPath)
+      } catch (err) {
+        console.warn("No se pudo eliminar el archivo temporal del lote:", err.message)
+      }
+    }
+
+    try {
+      writeFileSync(jsonTempPath, inputJson, { encoding: "utf-8" })
+
+      if (formato !== "zip") {
+        exec(`py "${rutaScript}" --binario < "${jsonTempPath}"`, { encoding: 'buffer', maxBuffer: 200 * 1024 * 1024 }, (error, stdout, stderr) => {
+          eliminarTemporal()
+
+          if (error) {
+            console.error("Error en ejecución:", stderr.toString('utf8'))
+            return res.status(500).json({ error: "Error al generar los partes de entregas" })
+          }
+
+          try {
+            const { encabezado, contenido } = leerTramaDocumento(stdout)
+            registrarMetricas(stderr)
+
+            res.setHeader("Content-Disposition", `attachment; filename="${encabezado.fileName}"`)
+            res.setHeader("Content-Type", encabezado.contentType)
+            res.send(contenido)
+          } catch (e) {
+            console.log("ERROR:", e.message)
+            return res.status(500).json({ error: "Error al generar los partes de entregas" })
+          }
+        })
+        return
+      }
+
+      // El zip se va enviando a medida que el script termina cada PDF
+      enviarZipDeScript(
+        res,
+        `py "${rutaScript}" < "${jsonTempPath}"`,
+        "partes_entregas.zip",
+        { error: "Error al generar el lote de partes de entregas" },
+        eliminarTemporal
+      )
+    } catch (e) {
+      return res.status(500).json({ error: "Error inesperado al generar los partes de entregas" })
+    }
+  }
+
+  static async encolarTrabajo(req, res) {
+    if (!process.env.URL_SERVICIO_DOCUMENTOS) {
+      return res.status(503).json({ error: "La cola de trabajos requiere el servicio de documentos" })
+    }
+    try {
+      const respuesta = await pedirTrabajo('post', `/trabajos/${encodeURIComponent(req.params.tipo)}`, { data: req.body })
+      return res.status(respuesta.status).json(respuesta.data)
+    } catch (e) {
+      console.error("Error al encolar trabajo:", e.message)
+      return res.status(500).json({ error: "Error al encolar el trabajo" })
+    }
+  }
+
+  static async consultarTrabajo(req, res) {
+    if (!process.env.URL_SERVICIO_DOCUMENTOS) {
+      return res.status(503).json({ error: "La cola de trabajos requiere el servicio de documentos" })
+    }
+    try {
+      const respuesta = await pedirTrabajo('get', `/trabajos/${encodeURIComponent(req.params.id)}`)
+      return res.status(respuesta.status).json(respuesta.data)
+    } catch (e) {
+      console.error("Error al consultar trabajo:", e.message)
+      return res.status(500).json({ error: "Error al consultar el trabajo" })
+    }
+  }
+
+  static async descargarTrabajo(req, res) {
+    if (!process.env.URL_SERVICIO_DOCUMENTOS) {
+      return res.status(503).json({ error: "La cola de trabajos requiere el servicio de documentos" })
+    }
+    try {
+      const respuesta = await pedirTrabajo('get', `/trabajos/${encodeURIComponent(req.params.id)}/documento`, {
+        responseType: 'arraybuffer'
+      })
+      const contenido = Buffer.from(respuesta.data)
+      if (respuesta.status !== 200) {
+        return res.status(respuesta.status).json(JSON.parse(contenido.toString('utf8')))
+      }
+      res.setHeader("Content-Type", respuesta.headers['content-type'])
+      res.setHeader("Content-Disposition", respuesta.headers['content-disposition'])
+      return res.send(contenido)
+    } catch (e) {
+      console.error("Error al descargar trabajo:", e.message)
+      return res.status(500).json({ error: "Error al descargar el documento" })
+    }
+  }
+
   static async obtenerComparativos(req, res) {
     const rutaScript = resolve(__dirname, '../scripts_python/comparativos/obtener_comparativos.py')
 
@@ -5,7 +5,14 @@ export const generarDOCSRouter = Router()
 
 generarDOCSRouter.post('/excel', GenerarDocumentoController.generarExcel)
 generarDOCSRouter.post('/pdf', GenerarDocumentoController.generarPdf)
+generarDOCSRouter.post('/pdf/lote', GenerarDocumentoController.generarPdfLote)
 generarDOCSRouter.post('/parte', GenerarDocumentoController.generarPartePDF)
+generarDOCSRouter.post('/parte/lote', GenerarDocumentoController.generarParteLote)
+
+// Cola de trabajos (tipo: pdf, excel o parte)
+generarDOCSRouter.post('/trabajos/:tipo', GenerarDocumentoController.encolarTrabajo)
+generarDOCSRouter.get('/trabajos/:id', GenerarDocumentoController.consultarTrabajo)
+generarDOCSRouter.get('/trabajos/:id/documento', GenerarDocumentoController.descargarTrabajo)
 
 generarDOCSRouter.get('/comparativos', GenerarDocumentoController.obtenerComparativos)
 generarDOCSRouter.post('/comparativos/marcar-cargado', GenerarDocumentoController.marcarComoCargado)
@@ -0,0 +1,95 @@
+import os
+import sys
+import random
+import timeit
+import argparse
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.formato import formatear_numeros, formatear_fechas
+
+# Compara el formato por columna de comun/formato.py con el formato celda por
+# celda que se usaba antes (tres replace por precio, strftime por fecha).
+#
+#   py benchmarks/bench_formato.py [--filas 100000] [--repeticiones 5]
+
+
+def formatear_miles_por_celda(valor):
+    # Implementación anterior de generador_pdf.formatear_miles
+    try:
+        valor_en = f"{float(valor):,.2f}"
+        return valor_en.replace(",", "X").replace(".", ",").replace("X", ".")
+    except (ValueError, TypeError):
+        if valor == "":
+            return "-"
+        return str(valor)
+
+
+def generar_datos(filas, semilla=1234):
+    aleatorio = random.Random(semilla)
+    precios = [round(aleatorio.uniform(0, 5_000_000), 2) for _ in range(filas)]
+    # La misma columna con algunas celdas vacías o con texto, como llegan
+    # los renglones sin cotizar
+    precios_mixtos = list(precios)
+    for indice in range(0, filas, 50):
+        precios_mixtos[indice] = aleatorio.choice(["", "-", None, "NO COTIZA"])
+    inicio = date(2020, 1, 1)
+    fechas = [(inicio + timedelta(days=aleatorio.randrange(2000))).isoformat() for _ in range(filas)]
+    return precios, precios_mixtos, fechas
+
+
+def medir(nombre, funcion, repeticiones, filas):
+    mejor = min(timeit.repeat(funcion, number=1, repeat=repeticiones))
+    print(f"{nombre:<42} {mejor * 1000:9.1f} ms  {filas / mejor:12,.0f} celdas/s")
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del formato argentino por columna")
+    parser.add_argument("--filas", type=int, default=100_000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    precios, precios_mixtos, fechas = generar_datos(args.filas)
+
+    for titulo, columna in (("Precios", precios), ("Precios con celdas de texto", precios_mixtos)):
+        # Los dos caminos tienen que dar exactamente el mismo texto
+        esperado = [formatear_miles_por_celda(valor) for valor in columna]
+        if formatear_numeros(columna) != esperado:
+            raise SystemExit("formatear_numeros no coincide con el formato por celda")
+
+        print(f"{titulo} ({args.filas:,} celdas)")
+        antes = medir("por celda (3 replace)", lambda: [formatear_miles_por_celda(v) for v in columna], args.repeticiones, args.filas)
+        despues = medir("formatear_numeros (columna)", lambda: formatear_numeros(columna), args.repeticiones, args.filas)
+        print(f"{'mejora':<42} {antes / despues:9.2f}x\n")
+
+    try:
+        import pandas as pd
+    except ImportError:
+        pd = None
+
+    if pd is not None:
+        # Como queda después de pd.to_numeric en la lectura de demandas
+        serie_precios = pd.Series(precios, dtype=float)
+        print(f"Precios en Series de pandas ({args.filas:,} celdas)")
+        antes = medir("Series.apply por celda", lambda: serie_precios.apply(formatear_miles_por_celda), args.repeticiones, args.filas)
+        despues = medir("formatear_numeros (Series)", lambda: formatear_numeros(serie_precios), args.repeticiones, args.filas)
+        print(f"{'mejora':<42} {antes / despues:9.2f}x")
+
+        serie_fechas = pd.Series(fechas)
+        print(f"\nFechas en Series de pandas ({args.filas:,} celdas)")
+        antes = medir(
+            "Series.apply strftime por celda",
+            lambda: serie_fechas.apply(lambda v: pd.Timestamp(v).strftime("%d/%m/%Y")),
+            args.repeticiones,
+            args.filas,
+        )
+        despues = medir("formatear_fechas (Series)", lambda: formatear_fechas(serie_fechas), args.repeticiones, args.filas)
+        print(f"{'mejora':<42} {antes / despues:9.2f}x")
+
+    print(f"\nFechas en lista ({args.filas:,} celdas)")
+    medir("formatear_fechas (lista)", lambda: formatear_fechas(fechas), args.repeticiones, args.filas)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import platform
+from concurrent.futures import ProcessPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, "generador_pdf"))
+
+# Benchmark del PDF de oferta (generador_pdf.construir_PDF, sin pasar por la cache).
+#
+# Por cada tamaño (10, 100, 1000 y 10000 renglones por defecto) se generan
+# licitaciones sintéticas con los cuatro juegos de columnas de
+# generar_tabla_demanda (con y sin observaciones / nombre_comercial), con
+# descripciones cortas y largas, y entre 0 y 5 firmas. Los datos salen de una
+# semilla fija: la misma corrida genera siempre los mismos PDF.
+#
+# Cada caso corre en un proceso nuevo (para medir su pico de memoria) con un
+# render de calentamiento antes de medir. Se informa renders/s, latencia p50 y
+# p95, pico de RSS, tamaño del PDF y páginas.
+#
+# Con un baseline guardado se compara cada caso y el script termina con código 1
+# si alguno empeoró más que la tolerancia, para correrlo antes de un deploy.
+#
+#   py benchmarks/bench_oferta.py                        # todos los tamaños
+#   py benchmarks/bench_oferta.py --tamanos 10 100       # corrida rápida
+#   py benchmarks/bench_oferta.py --guardar-baseline     # fija el baseline actual
+#   py benchmarks/bench_oferta.py --salida resultados.json
+
+RUTA_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_oferta.json")
+
+TAMANOS = [10, 100, 1000, 10000]
+
+# Repeticiones medidas por tamaño (más renglones, menos repeticiones)
+REPETICIONES = {10: 20, 100: 10, 1000: 3, 10000: 1}
+
+# Juegos de columnas de generar_tabla_demanda: (observaciones, nombre_comercial)
+LAYOUTS = {
+    "caso1": (True, True),
+    "caso2": (True, False),
+    "caso3": (False, True),
+    "caso4": (False, False),
+}
+
+DESCRIPCIONES = ("corta", "larga")
+
+# Tolerancias de regresión contra el baseline (proporción sobre el valor guardado)
+TOLERANCIA_LATENCIA = 0.15
+TOLERANCIA_MEMORIA = 0.20
+TOLERANCIA_TAMANO = 0.05
+
+PALABRAS = (
+    "LIDOCAINA CLORHIDRATO AMPOLLA FRASCO AMPOLLA COMPRIMIDO RECUBIERTO "
+    "SOLUCION INYECTABLE ESTERIL SIN EPINEFRINA ENDOVENOSO INTRAMUSCULAR "
+    "JERINGA DESCARTABLE AGUJA GUANTE LATEX CAJA UNIDADES ENVASE BLISTER"
+).split()
+
+
+def generar_licitacion(renglones, observaciones, nombre_comercial, descripcion, firmas, semilla=1234):
+    aleatorio = random.Random(semilla)
+    palabras_descripcion = (4, 8) if descripcion == "corta" else (25, 60)
+
+    data_renglones = []
+    total = 0
+    for numero in range(1, renglones + 1):
+        cantidad = aleatorio.randint(1, 5000)
+        precio = round(aleatorio.uniform(10, 250_000), 2)
+        total += cantidad * precio
+        renglon = {
+            "renglon": numero,
+            "cantidad": cantidad,
+            "descripcion": " ".join(aleatorio.choices(PALABRAS, k=aleatorio.randint(*palabras_descripcion))),
+            "laboratorio_elegido": aleatorio.choice(["ROEMMERS", "BAGO", "DENVER FARMA", "RICHMOND", "NO COTIZA"]),
+            "ANMAT": aleatorio.choice(["SI", "NO", ""]),
+            "precio_vta": precio,
+            "precio_vta_total": round(cantidad * precio, 2),
+        }
+        if observaciones:
+            renglon["observaciones"] = " ".join(aleatorio.choices(PALABRAS, k=aleatorio.randint(0, 12)))
+        if nombre_comercial:
+            renglon["nombre_comercial"] = " ".join(aleatorio.choices(PALABRAS, k=aleatorio.randint(1, 4)))
+        data_renglones.append(renglon)
+
+    return {
+        "data_renglones": data_renglones,
+        "data_cliente": {
+            "cliente": "HOSPITAL DE NIÑOS DR. HÉCTOR QUINTANA",
+            "objeto": "ADQUISICIÓN DE MEDICAMENTOS E INSUMOS",
+            "fecha": "05/03/2025",
+            "hora": "10:00",
+            "tipo": "LICITACIÓN PÚBLICA",
+            "nroLic": f"{renglones}/2025",
+        },
+        "data_entrega": {
+            "text_monto": "SON PESOS: CANTIDAD EXPRESADA EN LETRAS",
+            "entrega": "INMEDIATA",
+            "mantenimiento": "30 DÍAS",
+            "pago": "30 DÍAS",
+        },
+        "firmas_chequeadas": firmas,
+        "total_licitacion": round(total, 2),
+    }
+
+
+def armar_casos(tamanos, firmas_disponibles):
+    # Todas las combinaciones de layout y descripción; la cantidad de firmas va
+    # rotando de 0 a 5 para cubrir todas sin multiplicar los casos
+    casos = []
+    for renglones in tamanos:
+        indice = 0
+        for layout in LAYOUTS:
+            for descripcion in DESCRIPCIONES:
+                cantidad_firmas = indice % (len(firmas_disponibles) + 1)
+                casos.append({
+                    "id": f"{renglones}-{layout}-{descripcion}-{cantidad_firmas}f",
+                    "renglones": renglones,
+                    "layout": layout,
+                    "descripcion": descripcion,
+                    "firmas": firmas_disponibles[:cantidad_firmas],
+                })
+                indice += 1
+    return casos
+
+
+def percentil(valores, proporcion):
+    # Percentil por rango más cercano
+    ordenados = sorted(valores)
+    posicion = max(math.ceil(proporcion * len(ordenados)) - 1, 0)
+    return ordenados[posicion]
+
+
+def memoria_pico_mb():
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss está en KB en Linux y en bytes en macOS
+        return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    except (ImportError, AttributeError):
+        return None
+
+
+def medir_caso(caso, repeticiones):
+    # Corre dentro de un proceso nuevo por caso
+    from generador_pdf import construir_PDF
+    from comun.metricas import Metricas
+
+    observaciones, nombre_comercial = LAYOUTS[caso["layout"]]
+    licitacion = generar_licitacion(
+        caso["renglones"], observaciones, nombre_comercial, caso["descripcion"], caso["firmas"]
+    )
+    argumentos = (
+        licitacion["data_renglones"],
+        licitacion["data_cliente"],
+        licitacion["data_entrega"],
+        licitacion["firmas_chequeadas"],
+        licitacion["total_licitacion"],
+    )
+
+    # Calentamiento: fuentes, imágenes y estilos quedan cargados antes de medir
+    calentamiento = generar_licitacion(10, observaciones, nombre_comercial, "corta", caso["firmas"])
+    construir_PDF(
+        calentamiento["data_renglones"],
+        calentamiento["data_cliente"],
+        calentamiento["data_entrega"],
+        calentamiento["firmas_chequeadas"],
+        calentamiento["total_licitacion"],
+    )
+
+    latencias = []
+    for _ in range(repeticiones):
+        metricas = Metricas("oferta")
+        inicio = time.perf_counter()
+        contenido = construir_PDF(*argumentos, metricas=metricas).getvalue()
+        latencias.append(time.perf_counter() - inicio)
+
+    return {
+        "id": caso["id"],
+        "renglones": caso["renglones"],
+        "layout": caso["layout"],
+        "descripcion": caso["descripcion"],
+        "firmas": len(caso["firmas"]),
+        "repeticiones": repeticiones,
+        "renders_por_segundo": repeticiones / sum(latencias),
+        "p50_ms": percentil(latencias, 0.50) * 1000,
+        "p95_ms": percentil(latencias, 0.95) * 1000,
+        "pico_rss_mb": memoria_pico_mb(),
+        "bytes": len(contenido),
+        "paginas": metricas.valores.get("paginas"),
+    }
+
+
+def comparar(resultado, base, tolerancias):
+    # Devuelve [(métrica, valor base, valor actual, variación)] de lo que empeoró
+    regresiones = []
+    for clave, tolerancia in tolerancias.items():
+        anterior = base.get(clave)
+        actual = resultado.get(clave)
+        if not anterior or actual is None:
+            continue
+        variacion = actual / anterior - 1
+        if variacion > tolerancia:
+            regresiones.append((clave, anterior, actual, variacion))
+    return regresiones
+
+
+def imprimir_resultado(resultado, base):
+    memoria = resultado["pico_rss_mb"]
+    linea = (
+        f"{resultado['id']:<30} {resultado['repeticiones']:>4} "
+        f"{resultado['renders_por_segundo']:>9.2f} {resultado['p50_ms']:>10.1f} {resultado['p95_ms']:>10.1f} "
+        f"{memoria if memoria is not None else float('nan'):>9.1f} "
+        f"{resultado['bytes'] / 1024:>10.1f} {resultado['paginas'] or 0:>6}"
+    )
+    if base:
+        linea += f" {(resultado['p50_ms'] / base['p50_ms'] - 1) * 100:>+8.1f}%"
+    print(linea, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del generador de ofertas PDF")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS)
+    parser.add_argument("--repeticiones", type=int, help="repeticiones por caso (por defecto según el tamaño)")
+    parser.add_argument("--baseline", default=RUTA_BASELINE)
+    parser.add_argument("--guardar-baseline", action="store_true", help="guarda esta corrida como baseline")
+    parser.add_argument("--salida", help="guarda los resultados en un JSON")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_LATENCIA, help="tolerancia de latencia (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    from recursos import FIRMAS_DISPONIBLES
+    firmas_disponibles = sorted(FIRMAS_DISPONIBLES)[:5]
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.guardar_baseline:
+        with open(args.baseline, encoding="utf-8") as archivo:
+            baseline = json.load(archivo).get("casos", {})
+
+    tolerancias = {
+        "p50_ms": args.tolerancia,
+        "p95_ms": args.tolerancia,
+        "pico_rss_mb": TOLERANCIA_MEMORIA,
+        "bytes": TOLERANCIA_TAMANO,
+    }
+
+    print(
+        f"{'caso':<30} {'rep':>4} {'renders/s':>9} {'p50 ms':>10} {'p95 ms':>10} "
+        f"{'RSS MB':>9} {'PDF KB':>10} {'pags':>6}" + (f" {'vs base':>9}" if baseline else "")
+    )
+
+    resultados = {}
+    regresiones = []
+    for caso in armar_casos(args.tamanos, firmas_disponibles):
+        repeticiones = args.repeticiones or REPETICIONES.get(caso["renglones"], 1)
+        # Un proceso por caso: el pico de RSS es el de ese caso solo
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            resultado = pool.submit(medir_caso, caso, repeticiones).result()
+        resultados[caso["id"]] = resultado
+        base = baseline.get(caso["id"])
+        imprimir_resultado(resultado, base)
+        if base:
+            for regresion in comparar(resultado, base, tolerancias):
+                regresiones.append((caso["id"],) + regresion)
+
+    corrida = {
+        "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "casos": resultados,
+    }
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(corrida, archivo, indent=2, ensure_ascii=False)
+    if args.guardar_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as archivo:
+            json.dump(corrida, archivo, indent=2, ensure_ascii=False)
+        print(f"\nBaseline guardado en {args.baseline}")
+
+    if regresiones:
+        print("\nREGRESIONES contra el baseline:")
+        for id_caso, clave, anterior, actual, variacion in regresiones:
+            print(f"  {id_caso:<30} {clave:<12} {anterior:>12.1f} -> {actual:>12.1f} ({variacion:+.1%})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
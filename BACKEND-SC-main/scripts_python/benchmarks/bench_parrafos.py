@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, "generador_pdf"))
+
+from bench_oferta import PALABRAS, generar_licitacion
+
+# Benchmark de la cache de párrafos (comun/parrafos.py) en un proceso que queda
+# vivo, como los workers del servidor de documentos.
+#
+# Se arma un catálogo de descripciones, nombres comerciales y laboratorios y
+# varias licitaciones que toman sus renglones de ese catálogo. Cada licitación
+# se genera sin cache, con la cache recién vaciada (fría: sólo se reutiliza lo
+# repetido dentro de la misma licitación) y después de haber generado las
+# anteriores (caliente). Los tres PDF tienen que ser idénticos byte a byte.
+#
+#   py benchmarks/bench_parrafos.py [--renglones 1000] [--catalogo 3000] [--licitaciones 4]
+
+
+def generar_catalogo(cantidad, semilla=4321):
+    aleatorio = random.Random(semilla)
+    return [
+        {
+            "descripcion": " ".join(aleatorio.choices(PALABRAS, k=aleatorio.randint(4, 30))),
+            "nombre_comercial": " ".join(aleatorio.choices(PALABRAS, k=aleatorio.randint(1, 4))),
+        }
+        for _ in range(cantidad)
+    ]
+
+
+def licitacion_del_catalogo(renglones, catalogo, semilla):
+    licitacion = generar_licitacion(renglones, True, True, "corta", [], semilla=semilla)
+    aleatorio = random.Random(semilla)
+    for renglon in licitacion["data_renglones"]:
+        renglon.update(aleatorio.choice(catalogo))
+    return licitacion
+
+
+def generar(licitacion):
+    from generador_pdf import construir_PDF
+
+    inicio = time.perf_counter()
+    contenido = construir_PDF(
+        licitacion["data_renglones"],
+        licitacion["data_cliente"],
+        licitacion["data_entrega"],
+        licitacion["firmas_chequeadas"],
+        licitacion["total_licitacion"],
+    ).getvalue()
+    return contenido, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la cache de párrafos")
+    parser.add_argument("--renglones", type=int, default=1000)
+    parser.add_argument("--catalogo", type=int, default=3000)
+    parser.add_argument("--licitaciones", type=int, default=4)
+    args = parser.parse_args()
+
+    # Sin fecha ni id aleatorio en el PDF, para poder comparar los bytes
+    from reportlab import rl_config
+    rl_config.invariant = 1
+    from comun.parrafos import cache_parrafos
+
+    catalogo = generar_catalogo(args.catalogo)
+    licitaciones = [
+        licitacion_del_catalogo(args.renglones, catalogo, semilla) for semilla in range(args.licitaciones)
+    ]
+    maximo = cache_parrafos.maximo
+
+    # Calentamiento: fuentes, imágenes y estilos quedan cargados antes de medir
+    generar(licitacion_del_catalogo(10, generar_catalogo(10, semilla=1), semilla=99))
+
+    print(f"{'licitación':<12} {'sin cache ms':>13} {'fría ms':>10} {'caliente ms':>12} {'mejora':>8}")
+    for numero, licitacion in enumerate(licitaciones, 1):
+        cache_parrafos.maximo = 0
+        cache_parrafos.vaciar()
+        sin_cache, tiempo_sin_cache = generar(licitacion)
+
+        cache_parrafos.maximo = maximo
+        fria, tiempo_fria = generar(licitacion)
+
+        # Caliente: con todo lo que dejaron las licitaciones anteriores
+        cache_parrafos.vaciar()
+        for anterior in licitaciones[:numero - 1]:
+            generar(anterior)
+        caliente, tiempo_caliente = generar(licitacion)
+
+        if not sin_cache == fria == caliente:
+            raise SystemExit(f"La licitación {numero} no da el mismo PDF con y sin cache")
+        print(
+            f"{numero:<12} {tiempo_sin_cache * 1000:>13.1f} {tiempo_fria * 1000:>10.1f} "
+            f"{tiempo_caliente * 1000:>12.1f} {tiempo_sin_cache / tiempo_caliente:>7.2f}x"
+        )
+
+    estadisticas = cache_parrafos.estadisticas()
+    print(
+        f"\ncache: {estadisticas['entradas']} entradas (máximo {estadisticas['maximo']}), "
+        f"{estadisticas['aciertos']} aciertos, {estadisticas['fallos']} fallos, "
+        f"{estadisticas['desalojos']} desalojos"
+    )
+
+
+if __name__ == "__main__":
+    main()
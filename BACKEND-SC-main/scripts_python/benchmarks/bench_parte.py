@@ -0,0 +1,146 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, "generador_parte_entregas"))
+
+# Benchmark y control de paridad de los motores del parte de entregas
+# (generador_parte_entregas: "platypus" y "canvas", sin pasar por la cache).
+#
+# Por cada cantidad de entregas se arma un parte sintético con nombres de
+# cliente de largo variable (algunos más anchos que la celda, para que se
+# trunquen) y remitos de uno o varios números, y se mide cada motor (mejor
+# tiempo de varias repeticiones, después de un render de calentamiento).
+#
+# Con pypdfium2 instalado se rasteriza cada página de los dos PDF y se comparan
+# los pixeles; el script termina con código 1 si alguna página difiere. Los
+# casos raros (marcado, palabras que no entran, textos vacíos, orden numérico o
+# con saltos de línea) van siempre en el primer parte. La paridad en los casos
+# borde se controla en tests/test_parte_paridad.py.
+#
+#   py benchmarks/bench_parte.py [--entregas 15 100 300 600] [--repeticiones 3] [--sin-paridad]
+
+PALABRAS_CLIENTE = (
+    "FARMACIA DROGUERIA HOSPITAL CLINICA SANATORIO CENTRO MEDICO SAN JOSE "
+    "SANTA RITA DEL NORTE LOS ANDES NUEVA ESPERANZA POLICLINICO REGIONAL S.A. "
+    "S.R.L. SOCIEDAD COOPERATIVA ASOCIACION MUTUAL PROVINCIAL MUNICIPAL"
+).split()
+
+CASOS_RAROS = [
+    {"cliente": "A & B <b>DISTRIBUIDORA</b> S.R.L."},
+    {"remito": "0001-00000001 0002-00000002 0003-00000003"},
+    {"cliente": "X" * 120},
+    {"cliente": "", "remito": ""},
+    {"orden": 7},
+    {"cliente": "  ESPACIOS   \n  Y TABULACIONES\t ÁÉÍÓÚ Ñ  "},
+    {"remito": "R" * 40},
+    {"orden": "1\n2"},
+]
+
+
+def generar_parte(cantidad, semilla=2024):
+    aleatorio = random.Random(semilla)
+    entregas = []
+    for indice in range(cantidad):
+        cantidad_remitos = 1 if aleatorio.random() < 0.9 else 2
+        entregas.append({
+            "orden": str(indice + 1),
+            "cliente": " ".join(aleatorio.choices(PALABRAS_CLIENTE, k=aleatorio.randint(2, 14))),
+            "remito": " ".join(
+                f"{aleatorio.randint(1, 20):04d}-{aleatorio.randint(1, 99999999):08d}" for _ in range(cantidad_remitos)
+            ),
+        })
+    for entrega, cambios in zip(entregas, CASOS_RAROS):
+        entrega.update(cambios)
+    json_data = {
+        "fecha_parte": "01/03/2025",
+        "conductor": "JUAN PEREZ",
+        "numero_parte": "1234",
+        "sucursal": "CASA CENTRAL",
+        "fecha_entrega": "02/03/2025",
+        "vehiculo": "FIAT DUCATO",
+        "patente": "AB123CD",
+        "observaciones": "SIN OBSERVACIONES",
+    }
+    return json_data, entregas
+
+
+def generar(motor, json_data, entregas, repeticiones):
+    from generador_parte import MOTOR_CANVAS, construir_parte_entregas_pdf
+    from parte_canvas import construir_parte_entregas_canvas
+
+    construir = construir_parte_entregas_canvas if motor == MOTOR_CANVAS else construir_parte_entregas_pdf
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        contenido = construir(json_data, entregas).getvalue()
+        tiempo = time.perf_counter() - inicio
+        mejor = tiempo if mejor is None else min(mejor, tiempo)
+    return contenido, mejor
+
+
+def paginas_distintas(pdf_a, pdf_b):
+    # Números de página (desde 1) cuya imagen difiere; None sin pypdfium2
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        return None
+
+    documento_a = pdfium.PdfDocument(pdf_a)
+    documento_b = pdfium.PdfDocument(pdf_b)
+    if len(documento_a) != len(documento_b):
+        return ["cantidad de páginas"]
+    distintas = []
+    for numero in range(len(documento_a)):
+        imagen_a = documento_a[numero].render(scale=2).to_pil().convert("L")
+        imagen_b = documento_b[numero].render(scale=2).to_pil().convert("L")
+        if imagen_a.tobytes() != imagen_b.tobytes():
+            distintas.append(numero + 1)
+    return distintas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los motores del parte de entregas")
+    parser.add_argument("--entregas", type=int, nargs="+", default=[15, 100, 300, 600])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--sin-paridad", action="store_true")
+    args = parser.parse_args()
+
+    from generador_parte import MOTOR_CANVAS, MOTOR_PLATYPUS
+
+    # Calentamiento: fuentes y estilos quedan cargados antes de medir
+    json_data, entregas = generar_parte(20, semilla=1)
+    generar(MOTOR_PLATYPUS, json_data, entregas, 1)
+    generar(MOTOR_CANVAS, json_data, entregas, 1)
+
+    print(f"{'entregas':>9} {'platypus ms':>12} {'canvas ms':>10} {'mejora':>8} {'paridad':>10}")
+    fallas = 0
+    for cantidad in args.entregas:
+        json_data, entregas = generar_parte(cantidad)
+        platypus, tiempo_platypus = generar(MOTOR_PLATYPUS, json_data, entregas, args.repeticiones)
+        canvas, tiempo_canvas = generar(MOTOR_CANVAS, json_data, entregas, args.repeticiones)
+        paridad = "-"
+        if not args.sin_paridad:
+            distintas = paginas_distintas(platypus, canvas)
+            if distintas is None:
+                paridad = "sin pdfium"
+            elif distintas:
+                paridad = "DIFIERE"
+                fallas += 1
+                print(f"  páginas distintas con {cantidad} entregas: {distintas}")
+            else:
+                paridad = "ok"
+        print(
+            f"{cantidad:>9} {tiempo_platypus * 1000:>12.1f} {tiempo_canvas * 1000:>10.1f} "
+            f"{tiempo_platypus / tiempo_canvas:>7.1f}x {paridad:>10}"
+        )
+    if fallas:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
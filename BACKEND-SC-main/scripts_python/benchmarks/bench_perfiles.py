@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, "generador_pdf"))
+sys.path.append(os.path.join(BASE_DIR, "generador_parte_entregas"))
+
+import recursos
+from generador_pdf import construir_PDF
+from generador_parte import construir_parte_entregas_pdf
+from bench_oferta import generar_licitacion
+from comun.perfiles import PERFILES, PERFIL_ESTANDAR
+
+# Tamaño del PDF en cada perfil de salida (comun/perfiles.py), sin pasar por la
+# cache: por cada documento se informa el tamaño y el tiempo de render en el
+# perfil estándar y en los demás, y cuánto se achica respecto del estándar.
+#
+#   py benchmarks/bench_perfiles.py
+#   py benchmarks/bench_perfiles.py --renglones 10 1000 --entregas 15 300
+
+PALABRAS_CLIENTE = "FARMACIA CENTRAL HOSPITAL SANATORIO CLINICA NORTE SUR SAN MARTIN S.A. S.R.L.".split()
+
+
+def generar_parte(entregas, semilla=1234):
+    aleatorio = random.Random(semilla)
+    return {
+        "json_data": {
+            "fecha_parte": "05/03/2025",
+            "conductor": "JUAN PEREZ",
+            "numero_parte": "1234",
+            "sucursal": "CASA CENTRAL",
+            "fecha_entrega": "06/03/2025",
+            "vehiculo": "FIAT DUCATO",
+            "patente": "AB123CD",
+            "observaciones": "ENTREGAR ANTES DE LAS 12 HS",
+        },
+        "entregas": [
+            {
+                "orden": str(numero),
+                "cliente": " ".join(aleatorio.choices(PALABRAS_CLIENTE, k=aleatorio.randint(2, 12))),
+                "remito": f"0001-{aleatorio.randint(1, 99999999):08d}",
+            }
+            for numero in range(1, entregas + 1)
+        ],
+    }
+
+
+def medir(construir):
+    # Un render de calentamiento (decodifica y prepara las imágenes) y uno medido
+    construir()
+    inicio = time.perf_counter()
+    contenido = construir().getvalue()
+    return len(contenido), time.perf_counter() - inicio
+
+
+def informar(titulo, construir_con_perfil):
+    print(titulo)
+    base = None
+    for perfil in PERFILES:
+        tamano, segundos = medir(lambda: construir_con_perfil(perfil))
+        if perfil == PERFIL_ESTANDAR:
+            base = tamano
+            comparacion = ""
+        else:
+            comparacion = f"  {base / 1024:,.1f} KB -> {tamano / 1024:,.1f} KB ({(tamano - base) / base:+.1%})"
+        print(f"  {perfil:<10} {tamano:>12,} B {segundos * 1000:9.1f} ms{comparacion}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tamaño de los PDF en cada perfil de salida")
+    parser.add_argument("--renglones", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--entregas", type=int, nargs="+", default=[15, 150])
+    args = parser.parse_args()
+
+    firmas = sorted(recursos.FIRMAS_DISPONIBLES)[:2]
+    for renglones in args.renglones:
+        datos = generar_licitacion(renglones, True, True, "corta", firmas)
+        informar(
+            f"Oferta, {renglones} renglones, {len(firmas)} firmas",
+            lambda perfil: construir_PDF(
+                datos["data_renglones"],
+                datos["data_cliente"],
+                datos["data_entrega"],
+                datos["firmas_chequeadas"],
+                datos["total_licitacion"],
+                perfil=perfil,
+            ),
+        )
+
+    for entregas in args.entregas:
+        datos = generar_parte(entregas)
+        informar(
+            f"Parte de entregas, {entregas} entregas",
+            lambda perfil: construir_parte_entregas_pdf(datos["json_data"], datos["entregas"], perfil=perfil),
+        )
+
+
+if __name__ == "__main__":
+    main()
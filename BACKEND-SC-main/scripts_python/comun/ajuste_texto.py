@@ -0,0 +1,96 @@
+import os
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import Flowable
+
+from comun.parrafos import CacheLRU
+
+# Ajuste de un texto a una celda de una línea sin armar un Paragraph dentro de
+# un KeepInFrame.
+#
+# Las celdas de cliente y remito del parte de entregas muestran sólo la primera
+# línea de su párrafo: el KeepInFrame la recorta (truncate) o, si el texto entra
+# entero en esa línea, la deja como está (shrink sin achicar). Para encontrar
+# esa línea KeepInFrame arma y corta el párrafo completo, a veces varias veces.
+# primera_linea hace el mismo corte de palabras que Paragraph en una sola
+# pasada, con los anchos de palabra guardados en cache_anchos, y devuelve lo
+# necesario para dibujarla igual:
+#
+# - la línea, que va a la tabla como texto común;
+# - si el texto entró entero (para el modo shrink);
+# - el ajuste entre palabras (Tw) cuando la línea entra achicando los espacios
+#   (spaceShrinkage de reportlab). En ese caso la celda es una LineaCelda.
+#
+# Los textos que Paragraph no trata como texto plano (marcado, entidades,
+# espacios duros, guiones blandos) o con una palabra más ancha que la celda
+# devuelven None: ahí sigue haciendo falta el Paragraph.
+#
+# Variables de entorno:
+#   CACHE_ANCHOS_PALABRAS  máximo de palabras medidas en cache (por defecto 50000; 0 la desactiva)
+
+cache_anchos = CacheLRU(int(os.getenv("CACHE_ANCHOS_PALABRAS", "50000")))
+
+
+def ancho_palabra(palabra, fuente, tamanio):
+    clave = (palabra, fuente, tamanio)
+    ancho = cache_anchos.obtener(clave)
+    if ancho is None:
+        ancho = stringWidth(palabra, fuente, tamanio)
+        cache_anchos.guardar(clave, ancho)
+    return ancho
+
+
+def primera_linea(texto, estilo, ancho):
+    # (línea, completa, espaciado): la primera línea del Paragraph(texto, estilo)
+    # cortado a `ancho`, si el texto entra entero en ella y el Tw con que la
+    # dibuja Paragraph (0 si no hace falta). None si hace falta el Paragraph real
+    if not isinstance(texto, str) or "<" in texto or "&" in texto or "\xa0" in texto or "\xad" in texto:
+        return None
+    if estilo.hyphenationLang or estilo.uriWasteReduce or estilo.embeddedHyphenation:
+        return None
+    fuente, tamanio = estilo.fontName, estilo.fontSize
+    ancho_espacio = ancho_palabra(" ", fuente, tamanio)
+    achique = estilo.spaceShrinkage * ancho_espacio
+    linea = []
+    actual = -ancho_espacio
+    completa = True
+    for palabra in texto.split():
+        medida = ancho_palabra(palabra, fuente, tamanio)
+        nuevo = actual + ancho_espacio + medida
+        if nuevo > ancho + achique * len(linea):
+            if medida > ancho:
+                # Paragraph corta la palabra en pedazos
+                return None
+            if linea:
+                completa = False
+                break
+        linea.append(palabra)
+        actual = nuevo
+    # Como _leftDrawParaLine: lo que se pasa del ancho se reparte entre los espacios
+    sobrante = ancho - actual
+    espaciado = sobrante / (len(linea) - 1) if sobrante < -1e-8 and len(linea) > 1 else 0
+    return " ".join(linea), completa, espaciado
+
+
+class LineaCelda(Flowable):
+    # Una línea de texto con ajuste entre palabras, dibujada como la primera
+    # línea de un Paragraph con ese estilo: ocupa un interlineado de alto
+    def __init__(self, linea, estilo, espaciado=0):
+        Flowable.__init__(self)
+        self.linea = linea
+        self.estilo = estilo
+        self.espaciado = espaciado
+
+    def wrap(self, availWidth, availHeight):
+        self.width = availWidth
+        self.height = self.estilo.leading
+        return self.width, self.height
+
+    def draw(self):
+        estilo = self.estilo
+        texto = self.canv.beginText(0, estilo.leading - estilo.fontSize)
+        texto.setFont(estilo.fontName, estilo.fontSize, estilo.leading)
+        texto.setFillColor(estilo.textColor)
+        if self.espaciado:
+            texto.setWordSpace(self.espaciado)
+        texto.textOut(self.linea)
+        self.canv.drawText(texto)
@@ -0,0 +1,170 @@
+import os
+import json
+import hashlib
+import tempfile
+from comun.metricas import fase_opcional
+
+# Cache en disco de los documentos generados (oferta, parte de entregas, excel).
+#
+# La clave es el sha256 del nombre del generador, su versión y los datos de
+# entrada serializados en forma canónica (claves ordenadas, sin espacios), así
+# que el mismo pedido devuelve los mismos bytes sin volver a renderizar.
+#
+# - Las escrituras son atómicas: se escribe un temporal en la misma carpeta y se
+#   renombra con os.replace, nunca se lee un archivo a medio escribir.
+# - El tamaño total está acotado: al pasar el máximo se borran los archivos
+#   usados hace más tiempo (LRU por mtime, que se actualiza en cada acierto).
+# - Cualquier error de disco se trata como un fallo de cache: el documento se
+#   genera igual.
+#
+# Variables de entorno:
+#   CACHE_DOCUMENTOS      "0" para desactivarla (activada por defecto)
+#   CACHE_DOCUMENTOS_DIR  carpeta (por defecto scripts_python/.cache_documentos)
+#   CACHE_DOCUMENTOS_MB   tamaño máximo en MB (por defecto 256)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CARPETA_POR_DEFECTO = os.path.join(BASE_DIR, ".cache_documentos")
+EXTENSION = ".bin"
+EXTENSION_TEMPORAL = ".tmp"
+
+
+def serializar_canonico(datos):
+    return json.dumps(
+        datos, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    ).encode("utf-8")
+
+
+def version_de_archivos(rutas):
+    # Huella del contenido del código e imágenes de un generador: si cambia
+    # cualquiera de ellos cambian todas las claves de ese generador
+    huella = hashlib.sha256()
+    for ruta in sorted(rutas):
+        huella.update(os.path.basename(ruta).encode("utf-8"))
+        try:
+            with open(ruta, "rb") as archivo:
+                huella.update(archivo.read())
+        except OSError:
+            huella.update(b"-")
+    return huella.hexdigest()[:16]
+
+
+class CacheDocumentos:
+    def __init__(self, carpeta=CARPETA_POR_DEFECTO, tamano_maximo=256 * 1024 * 1024, activa=True):
+        self.carpeta = carpeta
+        self.tamano_maximo = tamano_maximo
+        self.activa = activa
+        self.contadores = {"hits": 0, "misses": 0, "escrituras": 0, "desalojos": 0}
+        # Resultado del último obtener(): True acierto, False fallo, None sin cache
+        self.ultimo_acierto = None
+
+    def clave(self, generador, version, datos):
+        huella = hashlib.sha256()
+        huella.update(f"{generador}:{version}:".encode("utf-8"))
+        huella.update(serializar_canonico(datos))
+        return huella.hexdigest()
+
+    def ruta(self, clave):
+        return os.path.join(self.carpeta, clave + EXTENSION)
+
+    def leer(self, clave):
+        if not self.activa:
+            return None
+        ruta = self.ruta(clave)
+        try:
+            with open(ruta, "rb") as archivo:
+                contenido = archivo.read()
+            # El mtime marca el último uso para el desalojo LRU
+            os.utime(ruta)
+        except OSError:
+            self.contadores["misses"] += 1
+            return None
+        self.contadores["hits"] += 1
+        return contenido
+
+    def guardar(self, clave, contenido):
+        if not self.activa:
+            return
+        try:
+            os.makedirs(self.carpeta, exist_ok=True)
+            descriptor, temporal = tempfile.mkstemp(dir=self.carpeta, suffix=EXTENSION_TEMPORAL)
+            try:
+                with os.fdopen(descriptor, "wb") as archivo:
+                    archivo.write(contenido)
+                # mkstemp crea el archivo sólo legible por el dueño
+                os.chmod(temporal, 0o644)
+                os.replace(temporal, self.ruta(clave))
+            except OSError:
+                os.remove(temporal)
+                raise
+        except OSError:
+            return
+        self.contadores["escrituras"] += 1
+        self.desalojar()
+
+    def entradas(self):
+        # [(mtime, tamaño, ruta)] de los documentos guardados
+        try:
+            iterador = os.scandir(self.carpeta)
+        except OSError:
+            return []
+        entradas = []
+        with iterador:
+            for entrada in iterador:
+                if not entrada.name.endswith(EXTENSION):
+                    continue
+                try:
+                    estado = entrada.stat()
+                except OSError:
+                    continue
+                entradas.append((estado.st_mtime, estado.st_size, entrada.path))
+        return entradas
+
+    def desalojar(self):
+        entradas = self.entradas()
+        total = sum(tamano for _, tamano, _ in entradas)
+        if total <= self.tamano_maximo:
+            return
+        for _, tamano, ruta in sorted(entradas):
+            try:
+                os.remove(ruta)
+            except OSError:
+                continue
+            total -= tamano
+            self.contadores["desalojos"] += 1
+            if total <= self.tamano_maximo:
+                break
+
+    def obtener(self, generador, version, datos, generar, metricas=None):
+        # Devuelve los bytes del documento, generándolo sólo si no está en cache.
+        # Con metricas (comun/metricas.py) la clave, lectura y escritura se
+        # miden como fase "cache" y se registra "cache": "hit" / "miss"
+        if not self.activa:
+            self.ultimo_acierto = None
+            return generar()
+        with fase_opcional(metricas, "cache"):
+            clave = self.clave(generador, version, datos)
+            contenido = self.leer(clave)
+        self.ultimo_acierto = contenido is not None
+        if metricas is not None:
+            metricas.registrar("cache", "hit" if self.ultimo_acierto else "miss")
+        if contenido is None:
+            contenido = generar()
+            with fase_opcional(metricas, "cache"):
+                self.guardar(clave, contenido)
+        return contenido
+
+    def estadisticas(self):
+        entradas = self.entradas()
+        return {
+            **self.contadores,
+            "documentos": len(entradas),
+            "bytes": sum(tamano for _, tamano, _ in entradas),
+            "bytes_maximo": self.tamano_maximo,
+        }
+
+
+cache = CacheDocumentos(
+    carpeta=os.getenv("CACHE_DOCUMENTOS_DIR", CARPETA_POR_DEFECTO),
+    tamano_maximo=int(float(os.getenv("CACHE_DOCUMENTOS_MB", "256")) * 1024 * 1024),
+    activa=os.getenv("CACHE_DOCUMENTOS", "1") != "0",
+)
@@ -0,0 +1,156 @@
+import json
+import tempfile
+
+# Lectura por partes del JSON de entrada, para pedidos que no conviene tener
+# enteros en memoria (ver el modo de memoria acotada de la oferta).
+#
+# LectorJSON recorre el objeto raíz campo por campo leyendo el stream de a
+# pedazos; los campos pedidos como listas se entregan elemento por elemento,
+# así nunca están a la vez el texto completo y todos los objetos decodificados:
+#
+#   lector = LectorJSON(sys.stdin)
+#   for clave, valor in lector.recorrer_objeto(listas=("data_renglones",)):
+#       if clave == "data_renglones":
+#           for renglon in valor: ...
+#
+# RenglonesEnDisco guarda esos elementos como una línea JSON cada uno en un
+# SpooledTemporaryFile: quedan en memoria hasta UMBRAL_RENGLONES_EN_MEMORIA
+# bytes y después pasan a un archivo temporal. Se puede recorrer varias veces.
+
+TAMANO_LECTURA = 64 * 1024
+UMBRAL_RENGLONES_EN_MEMORIA = 8 * 1024 * 1024
+BLANCOS = " \t\n\r"
+
+
+class LectorJSON:
+    def __init__(self, entrada, tamano_lectura=TAMANO_LECTURA):
+        # entrada: stream de texto (ej: sys.stdin como TextIOWrapper utf-8)
+        self.entrada = entrada
+        self.tamano_lectura = tamano_lectura
+        self.texto = ""
+        self.posicion = 0
+        self.terminado = False
+        self.decodificador = json.JSONDecoder()
+
+    def leer_mas(self):
+        # Agrega al texto pendiente otro pedazo del stream; False al final. Lee
+        # al menos lo que ya hay pendiente, así un valor largo que no se pudo
+        # decodificar no se vuelve a intentar una vez por pedazo
+        if self.terminado:
+            return False
+        pendiente = self.texto[self.posicion:]
+        parte = self.entrada.read(max(self.tamano_lectura, len(pendiente)))
+        if not parte:
+            self.terminado = True
+            return False
+        self.texto = pendiente + parte
+        self.posicion = 0
+        return True
+
+    def siguiente(self):
+        # Siguiente carácter que no es blanco, sin consumirlo; "" al final
+        while True:
+            while self.posicion < len(self.texto) and self.texto[self.posicion] in BLANCOS:
+                self.posicion += 1
+            if self.posicion < len(self.texto):
+                return self.texto[self.posicion]
+            if not self.leer_mas():
+                return ""
+
+    def consumir(self, simbolos):
+        # Consume uno de los símbolos esperados y lo devuelve
+        caracter = self.siguiente()
+        if not caracter or caracter not in simbolos:
+            esperado = " o ".join(repr(simbolo) for simbolo in simbolos)
+            raise ValueError(f"JSON inválido: se esperaba {esperado} y llegó {caracter!r}")
+        self.posicion += 1
+        return caracter
+
+    def valor(self):
+        # Un valor JSON completo (objeto, lista, texto, número o literal)
+        self.siguiente()
+        while True:
+            try:
+                valor, fin = self.decodificador.raw_decode(self.texto, self.posicion)
+            except json.JSONDecodeError:
+                if self.leer_mas():
+                    continue
+                raise
+            # Un número o literal que termina justo donde termina lo leído puede
+            # seguir en el pedazo siguiente
+            if fin == len(self.texto) and self.leer_mas():
+                continue
+            self.posicion = fin
+            return valor
+
+    def recorrer_lista(self):
+        self.consumir("[")
+        if self.siguiente() == "]":
+            self.posicion += 1
+            return
+        while True:
+            yield self.valor()
+            if self.consumir(",]") == "]":
+                return
+
+    def recorrer_objeto(self, listas=()):
+        # (clave, valor) de cada campo del objeto raíz. Para las claves de
+        # listas, valor es un generador de los elementos de la lista (vacío si
+        # es null) que hay que recorrer antes de pedir el campo siguiente; lo
+        # que quede sin recorrer se saltea
+        self.consumir("{")
+        if self.siguiente() == "}":
+            self.posicion += 1
+            return
+        while True:
+            clave = self.valor()
+            if not isinstance(clave, str):
+                raise ValueError("JSON inválido: las claves de un objeto son textos")
+            self.consumir(":")
+            if clave in listas:
+                if self.siguiente() == "[":
+                    elementos = self.recorrer_lista()
+                elif self.valor() is None:
+                    elementos = iter(())
+                else:
+                    raise ValueError(f"JSON inválido: {clave} debe ser una lista")
+                yield clave, elementos
+                for _ in elementos:
+                    pass
+            else:
+                yield clave, self.valor()
+            if self.consumir(",}") == "}":
+                return
+
+
+class RenglonesEnDisco:
+    # Secuencia de dicts guardada fuera de la memoria a partir de cierto tamaño.
+    # claves: unión de las claves de todos los renglones (las columnas)
+    def __init__(self, umbral=UMBRAL_RENGLONES_EN_MEMORIA):
+        self.archivo = tempfile.SpooledTemporaryFile(max_size=umbral)
+        self.cantidad = 0
+        self.claves = set()
+
+    def agregar(self, renglon):
+        self.archivo.seek(0, 2)
+        self.archivo.write(
+            json.dumps(renglon, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        )
+        self.archivo.write(b"\n")
+        self.cantidad += 1
+        self.claves.update(renglon.keys())
+
+    def __len__(self):
+        return self.cantidad
+
+    def __bool__(self):
+        return self.cantidad > 0
+
+    def __iter__(self):
+        # Un recorrido a la vez: cada recorrido vuelve al principio del archivo
+        self.archivo.seek(0)
+        for linea in self.archivo:
+            yield json.loads(linea)
+
+    def cerrar(self):
+        self.archivo.close()
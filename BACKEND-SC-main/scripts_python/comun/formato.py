@@ -0,0 +1,99 @@
+from datetime import date, datetime
+
+# Formato argentino de números y fechas, compartido por el PDF de oferta, el
+# Excel y la lectura de demandas.
+#
+# Las funciones en plural formatean una columna entera en una sola llamada
+# (lista, tupla o Series de pandas) y son las que hay que usar al armar tablas:
+# en una columna numérica los separadores se cambian una sola vez sobre el
+# texto de toda la columna, en lugar de tres replace por celda.
+#
+#   formatear_numeros([15200, "3.5", "", "-"])  -> ["15.200,00", "3,50", "-", "-"]
+#   formatear_numeros([15200], decimales=0)     -> ["15.200"]
+#   formatear_numeros([15200.5], miles=False)   -> ["15200,50"]
+#   formatear_numeros([12.345], decimales=None) -> ["12,345"]
+#   formatear_fechas(["2024-03-05"])            -> ["05/03/2024"]
+
+FORMATO_FECHA = "%d/%m/%Y"
+
+# Formato de número de Excel equivalente: Excel lo muestra como 15.200,00
+# cuando la configuración regional es argentina
+FORMATO_EXCEL_PRECIO = "#,##0.00"
+FORMATO_EXCEL_CANTIDAD = "#,##0"
+
+
+def es_serie_pandas(valores):
+    return hasattr(valores, "index") and hasattr(valores, "dtype")
+
+
+def formatear_numeros(valores, decimales=2, miles=True, vacio="-"):
+    # Lo que no es número se devuelve como texto ("" se muestra como vacio).
+    # decimales=None no redondea: cada valor va como texto, sólo con coma
+    # decimal (sin separador de miles ni vacio)
+    if not isinstance(valores, (list, tuple)) and not es_serie_pandas(valores):
+        valores = list(valores)
+    if decimales is None:
+        resultado = [str(valor).replace(".", ",") for valor in valores]
+        if es_serie_pandas(valores):
+            return type(valores)(resultado, index=valores.index, name=valores.name)
+        return resultado
+    patron = ("{:_.%df}" if miles else "{:.%df}") % decimales
+    try:
+        if es_serie_pandas(valores) and valores.dtype.kind in "iuf":
+            # Series numérica: numpy convierte toda la columna de una vez
+            numeros = valores.to_numpy(dtype=float).tolist()
+        else:
+            numeros = list(map(float, valores))
+    except (ValueError, TypeError):
+        numeros = None
+
+    if numeros is None:
+        # Columna con textos mezclados: celda por celda
+        resultado = []
+        for valor in valores:
+            try:
+                texto = patron.format(float(valor))
+            except (ValueError, TypeError):
+                resultado.append(vacio if valor == "" else str(valor))
+                continue
+            resultado.append(texto.replace(".", ",").replace("_", "."))
+    elif not numeros:
+        resultado = []
+    else:
+        # Columna numérica: se formatea todo en un solo texto y los separadores
+        # se cambian con dos replace sobre ese texto, no sobre cada celda
+        resultado = (
+            "\n".join(map(patron.format, numeros))
+            .replace(".", ",")
+            .replace("_", ".")
+            .split("\n")
+        )
+
+    if es_serie_pandas(valores):
+        return type(valores)(resultado, index=valores.index, name=valores.name)
+    return resultado
+
+
+def formatear_numero(valor, decimales=2, miles=True, vacio="-"):
+    return formatear_numeros((valor,), decimales, miles, vacio)[0]
+
+
+def formatear_fecha(valor, formato=FORMATO_FECHA):
+    # Acepta date/datetime o texto ISO ("2024-03-05", "2024-03-05T10:00:00Z");
+    # lo que no se puede interpretar se devuelve sin cambios
+    if valor is None or valor == "":
+        return ""
+    if isinstance(valor, (date, datetime)):
+        return valor.strftime(formato)
+    try:
+        return datetime.fromisoformat(str(valor)).strftime(formato)
+    except ValueError:
+        return str(valor)
+
+
+def formatear_fechas(valores, formato=FORMATO_FECHA):
+    if es_serie_pandas(valores):
+        # Con pandas la conversión y el strftime se hacen sobre toda la columna
+        import pandas as pd
+        return pd.to_datetime(valores).dt.strftime(formato)
+    return [formatear_fecha(valor, formato) for valor in valores]
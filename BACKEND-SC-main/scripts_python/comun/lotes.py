@@ -0,0 +1,79 @@
+import json
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from comun.salida import escribir_trama
+from comun.metricas import emitir_linea
+
+# Lotes de documentos generados en un pool de procesos, un PDF por elemento
+# (ver generador_pdf/generar_pdf_lote.py y
+# generador_parte_entregas/generar_partes_lote.py).
+#
+# - generar(indice, elemento) corre en los procesos del pool y devuelve
+#   (contenido, metricas); tiene que ser una función de módulo.
+# - nombre_archivo(indice, elemento) da el nombre del PDF en el zip o la trama
+#   y se llama en este proceso, también para los elementos que fallaron: tiene
+#   que aceptar cualquier cosa (ver nombre_pdf).
+#
+# Un error en un elemento no corta el lote: queda en errores.json (zip) o en
+# el "error" de su trama.
+
+
+def nombre_pdf(indice, elemento, prefijo, clave_datos, clave_numero):
+    # "nombre_archivo" del elemento; si no, <prefijo>_<n>_<numero>.pdf con el
+    # número de elemento[clave_datos][clave_numero], o <prefijo>_<n>.pdf. Un
+    # elemento inválido (null, texto, datos que no son un objeto) también
+    # recibe un nombre, para su entrada en errores.json
+    if not isinstance(elemento, dict):
+        return f"{prefijo}_{indice + 1}.pdf"
+    nombre = elemento.get("nombre_archivo")
+    if nombre and isinstance(nombre, str):
+        return nombre
+    # El índice va siempre en el nombre: dos elementos pueden compartir número
+    datos = elemento.get(clave_datos)
+    numero = datos.get(clave_numero) if isinstance(datos, dict) else None
+    if numero:
+        return f"{prefijo}_{indice + 1}_{numero}.pdf".replace("/", "-")
+    return f"{prefijo}_{indice + 1}.pdf"
+
+
+def generar_lote(elementos, generar, max_workers):
+    # Devuelve (indice, contenido, error, metricas) en el orden en que van terminando
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futuros = {
+            pool.submit(generar, indice, elemento): indice
+            for indice, elemento in enumerate(elementos)
+        }
+        for futuro in as_completed(futuros):
+            indice = futuros[futuro]
+            try:
+                contenido, metricas = futuro.result()
+            except Exception as e:
+                yield indice, None, str(e), None
+                continue
+            emitir_linea({**metricas, "index": indice})
+            yield indice, contenido, None, metricas
+
+
+def escribir_zip(salida, elementos, resultados, nombre_archivo):
+    errores = []
+    # zipfile escribe en streams no posicionables (stdout) usando data descriptors
+    with zipfile.ZipFile(salida, mode="w", compression=zipfile.ZIP_STORED) as archivo_zip:
+        for indice, contenido, error, _ in resultados:
+            nombre = nombre_archivo(indice, elementos[indice])
+            if error is not None:
+                errores.append({"index": indice, "fileName": nombre, "error": error})
+                continue
+            archivo_zip.writestr(nombre, contenido)
+            salida.flush()
+        if errores:
+            archivo_zip.writestr("errores.json", json.dumps(errores, ensure_ascii=False))
+
+
+def escribir_tramas(salida, elementos, resultados, nombre_archivo):
+    for indice, contenido, error, metricas in resultados:
+        nombre = nombre_archivo(indice, elementos[indice])
+        extra = {"index": indice}
+        if error is not None:
+            extra["error"] = error
+        escribir_trama(salida, contenido or b"", nombre, "application/pdf", metricas, extra=extra)
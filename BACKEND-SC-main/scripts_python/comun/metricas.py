@@ -0,0 +1,88 @@
+import sys
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+# Métricas de una generación de documento.
+#
+# Cada fase (lectura del JSON, armado de tablas, doc.build, codificación...)
+# acumula tiempo de reloj y de CPU; además se registran valores sueltos como
+# páginas, renglones, cortes de tabla, tamaño de salida y acierto de cache.
+#
+#   metricas = Metricas("oferta")
+#   with metricas.fase("build"):
+#       doc.build(elements)
+#   metricas.registrar("paginas", doc.page)
+#
+# Con al_iniciar_fase, cada fase avisa su nombre al empezar (la cola de
+# trabajos lo usa como progreso, ver comun/trabajos.py).
+#
+# como_dict() es el bloque "metrics" de la respuesta y emitir() escribe una
+# línea JSON por pedido en stderr para poder agregarlas desde los logs:
+#   {"evento": "metricas_documento", "documento": "oferta", "total": {...}, "fases": {...}, ...}
+
+EVENTO = "metricas_documento"
+
+
+def milisegundos(segundos):
+    return round(segundos * 1000, 3)
+
+
+class Metricas:
+    def __init__(self, documento, al_iniciar_fase=None):
+        self.documento = documento
+        self.al_iniciar_fase = al_iniciar_fase
+        self.fases = {}
+        self.valores = {}
+        self.inicio_reloj = time.perf_counter()
+        self.inicio_cpu = time.process_time()
+
+    @contextmanager
+    def fase(self, nombre):
+        if self.al_iniciar_fase is not None:
+            self.al_iniciar_fase(nombre)
+        inicio_reloj = time.perf_counter()
+        inicio_cpu = time.process_time()
+        try:
+            yield self
+        finally:
+            # Una fase que se repite (ej: varias tablas) suma sus tiempos
+            reloj, cpu = self.fases.get(nombre, (0.0, 0.0))
+            self.fases[nombre] = (
+                reloj + time.perf_counter() - inicio_reloj,
+                cpu + time.process_time() - inicio_cpu,
+            )
+
+    def registrar(self, nombre, valor):
+        self.valores[nombre] = valor
+
+    def contar(self, nombre, cantidad=1):
+        self.valores[nombre] = self.valores.get(nombre, 0) + cantidad
+
+    def como_dict(self):
+        return {
+            "documento": self.documento,
+            "total": {
+                "wall_ms": milisegundos(time.perf_counter() - self.inicio_reloj),
+                "cpu_ms": milisegundos(time.process_time() - self.inicio_cpu),
+            },
+            "fases": {
+                nombre: {"wall_ms": milisegundos(reloj), "cpu_ms": milisegundos(cpu)}
+                for nombre, (reloj, cpu) in self.fases.items()
+            },
+            **self.valores,
+        }
+
+    def emitir(self, salida=None):
+        emitir_linea(self.como_dict(), salida)
+
+
+def fase_opcional(metricas, nombre):
+    # Para código que mide sólo si le pasaron métricas
+    return metricas.fase(nombre) if metricas is not None else nullcontext()
+
+
+def emitir_linea(metricas, salida=None):
+    # Una sola línea por pedido: stdout queda reservado para el documento
+    salida = sys.stderr if salida is None else salida
+    print(json.dumps({"evento": EVENTO, **metricas}, ensure_ascii=False), file=salida, flush=True)
@@ -0,0 +1,103 @@
+import os
+import threading
+from collections import OrderedDict
+from reportlab.platypus import Paragraph
+
+# Párrafos con el análisis del texto y el corte de líneas reutilizados entre
+# pedidos.
+#
+# Las mismas descripciones de producto ("LIDOCAINA 2% S/EPIN AMP X 5ML EV"...)
+# aparecen en licitación tras licitación, siempre con el mismo estilo y en una
+# columna del mismo ancho. ParrafoCacheado guarda en cache_parrafos:
+#
+# - por (texto, estilo): los fragmentos que arma el parser de reportlab;
+# - por (texto, estilo, ancho): las líneas ya cortadas (blPara), el alto y los
+#   anchos de corte que deja Paragraph.wrap.
+#
+# Un párrafo con el mismo texto, estilo y ancho que otro ya medido no vuelve a
+# parsear ni a medir texto: toma esas líneas y se dibuja igual. En un proceso
+# que queda vivo (servidor de documentos) el texto repetido del catálogo
+# prácticamente no cuesta nada. El estilo entra en la clave como objeto (fuente,
+# tamaño, interlineado, alineación...); por eso sólo conviene con estilos fijos
+# del módulo, como los de generador_pdf/disenos_columnas.py.
+#
+# La cache es un LRU acotado en entradas, una por proceso. Cada entrada ocupa
+# alrededor de 1,6 KB: con el máximo por defecto, unos 32 MB.
+#
+# Variables de entorno:
+#   CACHE_PARRAFOS_ENTRADAS  máximo de entradas (por defecto 20000; 0 la desactiva)
+
+
+class CacheLRU:
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self.entradas = OrderedDict()
+        self.candado = threading.Lock()
+        self.contadores = {"aciertos": 0, "fallos": 0, "desalojos": 0}
+
+    def obtener(self, clave):
+        with self.candado:
+            valor = self.entradas.get(clave)
+            if valor is None:
+                self.contadores["fallos"] += 1
+                return None
+            self.entradas.move_to_end(clave)
+            self.contadores["aciertos"] += 1
+            return valor
+
+    def guardar(self, clave, valor):
+        if self.maximo <= 0:
+            return
+        with self.candado:
+            self.entradas[clave] = valor
+            self.entradas.move_to_end(clave)
+            while len(self.entradas) > self.maximo:
+                self.entradas.popitem(last=False)
+                self.contadores["desalojos"] += 1
+
+    def vaciar(self):
+        with self.candado:
+            self.entradas.clear()
+
+    def estadisticas(self):
+        with self.candado:
+            return {**self.contadores, "entradas": len(self.entradas), "maximo": self.maximo}
+
+
+cache_parrafos = CacheLRU(int(os.getenv("CACHE_PARRAFOS_ENTRADAS", "20000")))
+
+
+class ParrafoCacheado(Paragraph):
+    def __init__(self, text, style=None, bulletText=None, frags=None, **opciones):
+        if frags is not None or style is None or bulletText is not None:
+            # Partes de un split de reportlab (vienen con sus fragmentos) y
+            # párrafos con viñeta: como un Paragraph común
+            self.clave = None
+            Paragraph.__init__(self, text, style, bulletText=bulletText, frags=frags, **opciones)
+            return
+        self.clave = (text, style)
+        analizado = cache_parrafos.obtener(self.clave)
+        if analizado is None:
+            Paragraph.__init__(self, text, style, **opciones)
+            cache_parrafos.guardar(self.clave, (self.text, self.frags, self.style, self.bulletText))
+            return
+        # Lo mismo que deja Paragraph._setup después de parsear
+        self.caseSensitive = opciones.get("caseSensitive", 1)
+        self.encoding = opciones.get("encoding", "utf8")
+        self.text, self.frags, self.style, self.bulletText = analizado
+        self.debug = 0
+
+    def wrap(self, availWidth, availHeight):
+        if self.clave is None:
+            return Paragraph.wrap(self, availWidth, availHeight)
+        clave = (self.clave, availWidth)
+        cortado = cache_parrafos.obtener(clave)
+        if cortado is None:
+            resultado = Paragraph.wrap(self, availWidth, availHeight)
+            # Sin blPara: el ancho no alcanza ni para empezar (no hay líneas)
+            if "blPara" in self.__dict__:
+                cache_parrafos.guardar(clave, (self.blPara, self._wrapWidths, self.height))
+            return resultado
+        self.width = availWidth
+        self.blPara, self._wrapWidths, self.height = cortado
+        return self.width, self.height
@@ -0,0 +1,48 @@
+# Perfiles de salida de los PDF (oferta y parte de entregas).
+#
+#   "estandar"  el documento de siempre: compresión según rl_config de reportlab
+#               e imágenes a la resolución de los PNG originales
+#   "compacto"  para enviar por conexiones lentas: compresión de los streams de
+#               página forzada y encabezado / pie reescalados a DPI_COMPACTO
+#
+# En los dos perfiles las imágenes idénticas se embeben una sola vez (ver
+# generador_pdf/recursos.py) y se usan sólo fuentes estándar (Helvetica), que
+# el PDF referencia por nombre y nunca embebe.
+#
+# El perfil llega en el campo "perfil" del JSON; sin ese campo es "estandar".
+#
+#   py benchmarks/bench_perfiles.py     # tamaño antes / después de cada perfil
+
+PERFIL_ESTANDAR = "estandar"
+PERFIL_COMPACTO = "compacto"
+
+# Resolución con que se embeben encabezado y pie en el perfil compacto
+DPI_COMPACTO = 150
+
+PERFILES = {
+    PERFIL_ESTANDAR: {"compresion": None, "dpi_imagenes": None},
+    PERFIL_COMPACTO: {"compresion": 1, "dpi_imagenes": DPI_COMPACTO},
+}
+
+
+def validar_perfil(perfil):
+    if perfil is None:
+        return PERFIL_ESTANDAR
+    if perfil not in PERFILES:
+        raise ValueError(
+            f"Perfil de salida desconocido: {perfil!r} (opciones: {', '.join(PERFILES)})"
+        )
+    return perfil
+
+
+def opciones_documento(perfil):
+    # Argumentos extra para BaseDocTemplate; el perfil estándar no agrega ninguno
+    opciones = {}
+    compresion = PERFILES[validar_perfil(perfil)]["compresion"]
+    if compresion is not None:
+        opciones["pageCompression"] = compresion
+    return opciones
+
+
+def dpi_imagenes(perfil):
+    return PERFILES[validar_perfil(perfil)]["dpi_imagenes"]
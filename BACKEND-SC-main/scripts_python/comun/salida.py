@@ -0,0 +1,127 @@
+import sys
+import json
+import base64
+import shutil
+import struct
+from comun.metricas import fase_opcional
+
+# Protocolo de salida de los generadores.
+#
+# Modo por defecto (compatibilidad): un JSON en stdout con el documento en base64
+#   {"fileName": ..., "contentBase64": ...}
+#
+# Modo binario (opt-in con --binario): una trama en stdout binario
+#   MAGIA (4 bytes) | largo del encabezado (uint32 big-endian) | encabezado JSON utf-8 | bytes del documento
+# El encabezado lleva fileName, contentType, size y metrics.
+#
+# Los errores siempre salen como JSON en stderr {"error": ...} con código de salida 1.
+
+MAGIA = b"SCD1"
+FLAG_BINARIO = "--binario"
+# Pedazos en que se copia / codifica un documento que está en un archivo
+# (múltiplo de 3 para que el base64 de cada pedazo se pueda concatenar)
+TAMANO_PARTE = 3 * 256 * 1024
+
+
+def modo_binario(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    return FLAG_BINARIO in argv
+
+
+def escribir_encabezado_trama(salida, tamano, nombre_archivo, content_type, metricas=None, extra=None):
+    encabezado = {
+        "fileName": nombre_archivo,
+        "contentType": content_type,
+        "size": tamano,
+        "metrics": metricas or {},
+    }
+    # Campos adicionales del encabezado (ej: "index" y "error" en los lotes)
+    if extra:
+        encabezado.update(extra)
+    encabezado = json.dumps(encabezado).encode("utf-8")
+    salida.write(MAGIA)
+    salida.write(struct.pack(">I", len(encabezado)))
+    salida.write(encabezado)
+
+
+def escribir_trama(salida, contenido, nombre_archivo, content_type, metricas=None, extra=None):
+    contenido = memoryview(contenido)
+    escribir_encabezado_trama(salida, contenido.nbytes, nombre_archivo, content_type, metricas, extra)
+    salida.write(contenido)
+    salida.flush()
+
+
+def leer_trama(entrada):
+    magia = entrada.read(len(MAGIA))
+    if magia != MAGIA:
+        raise ValueError("La salida no es una trama de documento válida")
+    (largo,) = struct.unpack(">I", entrada.read(4))
+    encabezado = json.loads(entrada.read(largo).decode("utf-8"))
+    contenido = entrada.read(encabezado["size"])
+    return encabezado, contenido
+
+
+def escribir_documento(buffer, nombre_archivo, content_type, metricas=None):
+    # metricas (comun/metricas.py): su bloque va en la respuesta como "metrics" y,
+    # ya escrito el documento, se emite la línea de métricas en stderr con el
+    # tiempo de codificación y escritura incluido
+    # getbuffer() evita copiar el documento: se escribe directo desde el BytesIO
+    contenido = buffer.getbuffer()
+    try:
+        if modo_binario():
+            bloque_metricas = metricas.como_dict() if metricas is not None else None
+            with fase_opcional(metricas, "salida"):
+                escribir_trama(sys.stdout.buffer, contenido, nombre_archivo, content_type, bloque_metricas)
+        else:
+            with fase_opcional(metricas, "codificacion"):
+                respuesta = {
+                    "fileName": nombre_archivo,
+                    "contentBase64": base64.b64encode(contenido).decode("utf-8"),
+                }
+            if metricas is not None:
+                respuesta["metrics"] = metricas.como_dict()
+            with fase_opcional(metricas, "salida"):
+                print(json.dumps(respuesta), flush=True)
+    finally:
+        contenido.release()
+
+    if metricas is not None:
+        metricas.emitir()
+
+
+def escribir_documento_archivo(archivo, nombre_archivo, content_type, metricas=None):
+    # Como escribir_documento para un documento en un archivo (ya rebobinado):
+    # se copia o se codifica de a TAMANO_PARTE, sin leerlo entero. La salida es
+    # la misma que con escribir_documento
+    archivo.seek(0, 2)
+    tamano = archivo.tell()
+    archivo.seek(0)
+    if modo_binario():
+        bloque_metricas = metricas.como_dict() if metricas is not None else None
+        with fase_opcional(metricas, "salida"):
+            salida = sys.stdout.buffer
+            escribir_encabezado_trama(salida, tamano, nombre_archivo, content_type, bloque_metricas)
+            shutil.copyfileobj(archivo, salida, TAMANO_PARTE)
+            salida.flush()
+    else:
+        with fase_opcional(metricas, "salida"):
+            salida = sys.stdout
+            salida.write('{"fileName": %s, "contentBase64": "' % json.dumps(nombre_archivo))
+            while True:
+                parte = archivo.read(TAMANO_PARTE)
+                if not parte:
+                    break
+                salida.write(base64.b64encode(parte).decode("ascii"))
+            salida.write('"')
+        if metricas is not None:
+            salida.write(', "metrics": %s' % json.dumps(metricas.como_dict()))
+        salida.write("}\n")
+        salida.flush()
+
+    if metricas is not None:
+        metricas.emitir()
+
+
+def escribir_error(error):
+    print(json.dumps({"error": str(error)}), file=sys.stderr)
+    sys.exit(1)
@@ -0,0 +1,233 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import tempfile
+from contextlib import closing
+
+# Cola de trabajos de los generadores (oferta, parte de entregas, excel) para
+# el servidor de documentos: el pedido se encola y se responde enseguida con un
+# id; los workers lo generan y el cliente consulta el estado y descarga el
+# documento cuando está terminado.
+#
+#   id = cola.encolar("pdf", datos)        # pendiente
+#   cola.tomar()                           # en_proceso (lo toma un solo worker)
+#   cola.registrar_fase(id, "build")       # progreso: fase en curso
+#   cola.terminar(id, contenido, metricas) # terminado, vence en TTL
+#   cola.estado(id), cola.artefacto(id)
+#
+# Los trabajos viven en una base SQLite y los documentos terminados en archivos
+# de la misma carpeta (escritura atómica, igual que comun/cache_documentos.py).
+# Cada operación abre su propia conexión, así que la cola se puede usar desde
+# varios hilos y procesos a la vez. Los trabajos terminados o con error se
+# borran, con su documento, al pasar el TTL.
+#
+# Variables de entorno:
+#   TRABAJOS_DIR          carpeta (por defecto scripts_python/.trabajos)
+#   TRABAJOS_TTL_MINUTOS  minutos que se guarda un documento terminado (por defecto 60)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CARPETA_POR_DEFECTO = os.path.join(BASE_DIR, ".trabajos")
+NOMBRE_BASE = "trabajos.sqlite3"
+EXTENSION = ".bin"
+EXTENSION_TEMPORAL = ".tmp"
+
+PENDIENTE = "pendiente"
+EN_PROCESO = "en_proceso"
+TERMINADO = "terminado"
+ERROR = "error"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id TEXT PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    datos BLOB,
+    fase TEXT,
+    error TEXT,
+    metricas TEXT,
+    creado REAL NOT NULL,
+    iniciado REAL,
+    terminado REAL,
+    vence REAL
+);
+CREATE INDEX IF NOT EXISTS trabajos_estado ON trabajos (estado, creado);
+"""
+
+
+class ColaTrabajos:
+    def __init__(self, carpeta=CARPETA_POR_DEFECTO, ttl=3600):
+        self.carpeta = carpeta
+        self.ttl = ttl
+        self.ruta_base = os.path.join(carpeta, NOMBRE_BASE)
+        self.preparada = False
+
+    def conectar(self):
+        if not self.preparada:
+            os.makedirs(self.carpeta, exist_ok=True)
+        # Sin transacciones implícitas: cada sentencia se confirma sola salvo
+        # los BEGIN explícitos de tomar()
+        conexion = sqlite3.connect(self.ruta_base, timeout=30, isolation_level=None)
+        conexion.row_factory = sqlite3.Row
+        if not self.preparada:
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.executescript(ESQUEMA)
+            self.preparada = True
+        return closing(conexion)
+
+    def ruta(self, id_trabajo):
+        return os.path.join(self.carpeta, id_trabajo + EXTENSION)
+
+    def encolar(self, tipo, datos):
+        id_trabajo = uuid.uuid4().hex
+        contenido = json.dumps(datos, ensure_ascii=False, default=str).encode("utf-8")
+        with self.conectar() as conexion:
+            conexion.execute(
+                "INSERT INTO trabajos (id, tipo, estado, datos, creado) VALUES (?, ?, ?, ?, ?)",
+                (id_trabajo, tipo, PENDIENTE, contenido, time.time()),
+            )
+        return id_trabajo
+
+    def tomar(self):
+        # (id, tipo, datos) del pendiente más antiguo, ya marcado en_proceso;
+        # None si no hay pendientes. BEGIN IMMEDIATE evita que dos workers
+        # tomen el mismo trabajo
+        with self.conectar() as conexion:
+            conexion.execute("BEGIN IMMEDIATE")
+            try:
+                fila = conexion.execute(
+                    "SELECT id, tipo, datos FROM trabajos WHERE estado = ? ORDER BY creado LIMIT 1",
+                    (PENDIENTE,),
+                ).fetchone()
+                if fila is not None:
+                    conexion.execute(
+                        "UPDATE trabajos SET estado = ?, iniciado = ? WHERE id = ?",
+                        (EN_PROCESO, time.time(), fila["id"]),
+                    )
+                conexion.execute("COMMIT")
+            except BaseException:
+                conexion.execute("ROLLBACK")
+                raise
+        if fila is None:
+            return None
+        return fila["id"], fila["tipo"], json.loads(fila["datos"])
+
+    def registrar_fase(self, id_trabajo, fase):
+        with self.conectar() as conexion:
+            conexion.execute("UPDATE trabajos SET fase = ? WHERE id = ?", (fase, id_trabajo))
+
+    def guardar_artefacto(self, id_trabajo, contenido):
+        descriptor, temporal = tempfile.mkstemp(dir=self.carpeta, suffix=EXTENSION_TEMPORAL)
+        try:
+            with os.fdopen(descriptor, "wb") as archivo:
+                archivo.write(contenido)
+            os.replace(temporal, self.ruta(id_trabajo))
+        except OSError:
+            os.remove(temporal)
+            raise
+
+    def terminar(self, id_trabajo, contenido, metricas=None):
+        self.guardar_artefacto(id_trabajo, contenido)
+        ahora = time.time()
+        with self.conectar() as conexion:
+            conexion.execute(
+                "UPDATE trabajos SET estado = ?, datos = NULL, fase = NULL, metricas = ?,"
+                " terminado = ?, vence = ? WHERE id = ?",
+                (
+                    TERMINADO,
+                    json.dumps(metricas, separators=(",", ":")) if metricas is not None else None,
+                    ahora,
+                    ahora + self.ttl,
+                    id_trabajo,
+                ),
+            )
+
+    def fallar(self, id_trabajo, mensaje):
+        ahora = time.time()
+        with self.conectar() as conexion:
+            conexion.execute(
+                "UPDATE trabajos SET estado = ?, datos = NULL, error = ?, terminado = ?, vence = ?"
+                " WHERE id = ?",
+                (ERROR, mensaje, ahora, ahora + self.ttl, id_trabajo),
+            )
+
+    def estado(self, id_trabajo):
+        # Estado y progreso de un trabajo; None si no existe o ya venció
+        ahora = time.time()
+        with self.conectar() as conexion:
+            fila = conexion.execute(
+                "SELECT id, tipo, estado, fase, error, metricas, creado, iniciado, terminado, vence"
+                " FROM trabajos WHERE id = ?",
+                (id_trabajo,),
+            ).fetchone()
+            if fila is None or (fila["vence"] is not None and fila["vence"] < ahora):
+                return None
+            resultado = {"id": fila["id"], "tipo": fila["tipo"], "estado": fila["estado"]}
+            if fila["estado"] == PENDIENTE:
+                # Trabajos pendientes que se van a tomar antes que este
+                resultado["posicion"] = conexion.execute(
+                    "SELECT COUNT(*) FROM trabajos WHERE estado = ? AND creado < ?",
+                    (PENDIENTE, fila["creado"]),
+                ).fetchone()[0]
+        if fila["estado"] == EN_PROCESO:
+            resultado["fase"] = fila["fase"]
+            resultado["segundos"] = round(ahora - fila["iniciado"], 3)
+        elif fila["estado"] == TERMINADO:
+            resultado["segundos"] = round(fila["terminado"] - fila["iniciado"], 3)
+            resultado["vence_en"] = round(fila["vence"] - ahora, 3)
+            if fila["metricas"] is not None:
+                resultado["metricas"] = json.loads(fila["metricas"])
+        elif fila["estado"] == ERROR:
+            resultado["error"] = fila["error"]
+        return resultado
+
+    def artefacto(self, id_trabajo):
+        # Bytes del documento de un trabajo terminado y vigente; None si no
+        estado = self.estado(id_trabajo)
+        if estado is None or estado["estado"] != TERMINADO:
+            return None
+        try:
+            with open(self.ruta(id_trabajo), "rb") as archivo:
+                return archivo.read()
+        except OSError:
+            return None
+
+    def purgar(self):
+        # Borra los trabajos vencidos y sus documentos; devuelve cuántos
+        with self.conectar() as conexion:
+            vencidos = [
+                fila["id"]
+                for fila in conexion.execute(
+                    "SELECT id FROM trabajos WHERE vence IS NOT NULL AND vence < ?", (time.time(),)
+                )
+            ]
+            for id_trabajo in vencidos:
+                try:
+                    os.remove(self.ruta(id_trabajo))
+                except OSError:
+                    pass
+                conexion.execute("DELETE FROM trabajos WHERE id = ?", (id_trabajo,))
+        return len(vencidos)
+
+    def reanudar(self):
+        # Al arrancar el servidor: los trabajos que quedaron en_proceso (el
+        # proceso anterior terminó sin completarlos) vuelven a la cola
+        with self.conectar() as conexion:
+            return conexion.execute(
+                "UPDATE trabajos SET estado = ?, fase = NULL, iniciado = NULL WHERE estado = ?",
+                (PENDIENTE, EN_PROCESO),
+            ).rowcount
+
+    def estadisticas(self):
+        with self.conectar() as conexion:
+            cantidades = dict(
+                conexion.execute("SELECT estado, COUNT(*) FROM trabajos GROUP BY estado").fetchall()
+            )
+        return {estado: cantidades.get(estado, 0) for estado in (PENDIENTE, EN_PROCESO, TERMINADO, ERROR)}
+
+
+cola = ColaTrabajos(
+    carpeta=os.getenv("TRABAJOS_DIR", CARPETA_POR_DEFECTO),
+    ttl=float(os.getenv("TRABAJOS_TTL_MINUTOS", "60")) * 60,
+)
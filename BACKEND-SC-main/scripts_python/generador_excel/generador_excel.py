@@ -1,80 +1,135 @@
 import sys
+import os
 import json
-import base64
 import pandas as pd
 import io
 from openpyxl.utils import get_column_letter
 from openpyxl.styles import PatternFill
 
-def main():
-    try:
-        sys.stdin = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
-        data = json.load(sys.stdin)
-        data_renglones = data.get("data_renglones", [])
-        headers = data.get("headers", {})
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.salida import escribir_documento, escribir_error
+from comun.cache_documentos import cache, version_de_archivos
+from comun import formato
+from comun.metricas import Metricas
+
+MIMETYPE_EXCEL = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
+VERSION_EXCEL = version_de_archivos([__file__, formato.__file__])
+
+def generar_excel(data_renglones, headers, metricas=None):
+    # El mismo pedido devuelve el libro ya generado (ver comun/cache_documentos.py);
+    # metricas (comun/metricas.py) recibe los tiempos por fase y los conteos
+    if metricas is None:
+        metricas = Metricas("excel")
+    metricas.registrar("renglones", len(data_renglones or []))
+    contenido = cache.obtener(
+        "excel",
+        VERSION_EXCEL,
+        [data_renglones, headers],
+        lambda: construir_excel(data_renglones, headers, metricas).getvalue(),
+        metricas=metricas,
+    )
+    metricas.registrar("bytes", len(contenido))
+    return io.BytesIO(contenido)
+
+def construir_excel(data_renglones, headers, metricas=None):
+    if metricas is None:
+        metricas = Metricas("excel")
+
+    with metricas.fase("dataframe"):
         df = pd.DataFrame(data_renglones)
         df.rename(columns=headers, inplace=True)
 
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name="Sheet1")
-            worksheet = writer.sheets["Sheet1"]
-
-            max_row = worksheet.max_row
-            max_col = worksheet.max_column
-
-            for col_idx in range(1, max_col + 1):
-                header_cell = worksheet.cell(row=1, column=col_idx)
-                if header_cell.value is None:
-                    continue
-                header_str = str(header_cell.value).strip()
-                if (header_str.lower().startswith("id") or 
-                    header_str in ["FECHA", "NOMBRE USUARIO", "Valorizado"]):
-                    col_letter = get_column_letter(col_idx)
-                    worksheet.column_dimensions[col_letter].hidden = True
-
-            fixed_width_columns = [
-                "Cliente", "Descripción (pliego)", 
-                "Droga + Presentación (KAIROS)", 
-                "Mantenimiento", "Observaciones", "DESCRIPCIÓN"
+    output = io.BytesIO()
+    writer = pd.ExcelWriter(output, engine='openpyxl')
+    with metricas.fase("hoja"):
+        df.to_excel(writer, index=False, sheet_name="Sheet1")
+    with metricas.fase("estilos"):
+        dar_formato_hoja(writer.sheets["Sheet1"])
+    with metricas.fase("guardado"):
+        writer.close()
+
+    output.seek(0)
+    return output
+
+def dar_formato_hoja(worksheet):
+    max_row = worksheet.max_row
+    max_col = worksheet.max_column
+
+    for col_idx in range(1, max_col + 1):
+        header_cell = worksheet.cell(row=1, column=col_idx)
+        if header_cell.value is None:
+            continue
+        header_str = str(header_cell.value).strip()
+        if (header_str.lower().startswith("id") or 
+            header_str in ["FECHA", "NOMBRE USUARIO", "Valorizado"]):
+            col_letter = get_column_letter(col_idx)
+            worksheet.column_dimensions[col_letter].hidden = True
+
+    fixed_width_columns = [
+        "Cliente", "Descripción (pliego)", 
+        "Droga + Presentación (KAIROS)", 
+        "Mantenimiento", "Observaciones", "DESCRIPCIÓN"
+    ]
+
+    # Los precios quedan numéricos (este Excel se vuelve a importar) y se
+    # muestran en formato argentino con el formato de número de la celda
+    price_columns = ["Costo U."]
+
+    for col_idx in range(1, max_col + 1):
+        col_letter = get_column_letter(col_idx)
+        header_cell = worksheet.cell(row=1, column=col_idx)
+        if header_cell.value is None or worksheet.column_dimensions[col_letter].hidden:
+            continue
+        header_str = str(header_cell.value).strip()
+        if header_str in fixed_width_columns:
+            worksheet.column_dimensions[col_letter].width = 35
+        elif header_str in price_columns:
+            price_cells = [
+                cell for cell in worksheet[col_letter][1:]
+                if isinstance(cell.value, (int, float)) and not isinstance(cell.value, bool)
             ]
+            for cell in price_cells:
+                cell.number_format = formato.FORMATO_EXCEL_PRECIO
+            # El ancho se mide sobre el texto que se va a ver: "15.200,00"
+            textos = formato.formatear_numeros(cell.value for cell in price_cells)
+            max_length = max(map(len, textos), default=0)
+            max_length = max(max_length, len(header_str))
+            worksheet.column_dimensions[col_letter].width = max_length + 2
+        else:
+            max_length = max((len(str(cell.value)) for cell in worksheet[col_letter] if cell.value), default=0)
+            worksheet.column_dimensions[col_letter].width = max_length + 2
+
+    white_fill = PatternFill(fill_type="solid", fgColor="FFFFFF")
+    grey_fill = PatternFill(fill_type="solid", fgColor="D3D3D3")
+
+    for col_idx in range(1, max_col + 1):
+        worksheet.cell(row=1, column=col_idx).fill = white_fill
+
+    editable_headers = ["Costo U.", "Mantenimiento", "Observaciones"]
+    for col_idx in range(1, max_col + 1):
+        header_cell = worksheet.cell(row=1, column=col_idx)
+        if header_cell.value is None:
+            continue
+        header_str = str(header_cell.value).strip()
+        for row in range(2, max_row + 1):
+            current_cell = worksheet.cell(row=row, column=col_idx)
+            current_cell.fill = white_fill if header_str in editable_headers else grey_fill
+
+def main():
+    try:
+        sys.stdin = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+        metricas = Metricas("excel")
+        with metricas.fase("lectura_json"):
+            data = json.load(sys.stdin)
+        data_renglones = data.get("data_renglones", [])
+        headers = data.get("headers", {})
 
-            for col_idx in range(1, max_col + 1):
-                col_letter = get_column_letter(col_idx)
-                header_cell = worksheet.cell(row=1, column=col_idx)
-                if header_cell.value is None or worksheet.column_dimensions[col_letter].hidden:
-                    continue
-                header_str = str(header_cell.value).strip()
-                if header_str in fixed_width_columns:
-                    worksheet.column_dimensions[col_letter].width = 35
-                else:
-                    max_length = max((len(str(cell.value)) for cell in worksheet[col_letter] if cell.value), default=0)
-                    worksheet.column_dimensions[col_letter].width = max_length + 2
-
-            white_fill = PatternFill(fill_type="solid", fgColor="FFFFFF")
-            grey_fill = PatternFill(fill_type="solid", fgColor="D3D3D3")
-
-            for col_idx in range(1, max_col + 1):
-                worksheet.cell(row=1, column=col_idx).fill = white_fill
-
-            editable_headers = ["Costo U.", "Mantenimiento", "Observaciones"]
-            for col_idx in range(1, max_col + 1):
-                header_cell = worksheet.cell(row=1, column=col_idx)
-                if header_cell.value is None:
-                    continue
-                header_str = str(header_cell.value).strip()
-                for row in range(2, max_row + 1):
-                    current_cell = worksheet.cell(row=row, column=col_idx)
-                    current_cell.fill = white_fill if header_str in editable_headers else grey_fill
-
-        output.seek(0)
-        encoded_excel = base64.b64encode(output.read()).decode('utf-8')
-        print(json.dumps({ "fileName": "datos.xlsx", "contentBase64": encoded_excel }))
+        output = generar_excel(data_renglones, headers, metricas)
+        escribir_documento(output, "datos.xlsx", MIMETYPE_EXCEL, metricas)
 
     except Exception as e:
-        print(json.dumps({ "error": str(e) }), file=sys.stderr)
-        sys.exit(1)
+        escribir_error(e)
 
 if __name__ == "__main__":
     main()
@@ -9,153 +9,314 @@ from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.units import cm
 from reportlab.lib import colors
+import os
+import sys
 
-def generar_parte_entregas_pdf(json_data, entregas):
-    pagina = landscape(A4)
-    margen_x = 2 * cm
-    margen_y = 2 * cm
-    ancho_total = pagina[0] - 2 * margen_x
-
-    styles = getSampleStyleSheet()
-    style_obs = styles["Normal"]
-    style_obs.fontSize = 9
-    style_obs.leading = 11
-    style_obs.alignment = 1
-
-    def build_encabezado():
-        data = [
-            ["PARTE DE ENTREGAS", "Fecha Parte:", json_data["fecha_parte"], "Conductor:", json_data["conductor"], f"N° {json_data['numero_parte']}"],
-            [json_data["sucursal"], "Fecha Entrega:", json_data["fecha_entrega"], "Vehículo:", json_data["vehiculo"], ""],
-            ["", "", "", "Patente:", json_data["patente"], ""]
-        ]
-        col_widths = [ancho_total * p for p in [0.20, 0.12, 0.12, 0.12, 0.30, 0.14]]
-        row_heights = [0.6 * cm] * 3
-        tabla = Table(data, colWidths=col_widths, rowHeights=row_heights)
-        tabla.setStyle(TableStyle([
-            ("BOX", (0,0), (-1,-1), 0.8, colors.black),
-            ("LINEBEFORE", (1,0), (1,-1), 0.5, colors.black),
-            ("LINEBEFORE", (3,0), (3,-1), 0.5, colors.black),
-            ("LINEBEFORE", (5,0), (5,-1), 0.5, colors.black),
-            ("SPAN", (5,0), (5,2)),
-            ("ALIGN", (5,0), (5,2), "CENTER"),
-            ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
-            ("FONTNAME", (0,0), (-1,-1), "Helvetica"),
-            ("FONTSIZE", (0,0), (-1,-1), 9),
-            ("FONTNAME", (5,0), (5,0), "Helvetica-Bold"),
-            ("FONTSIZE", (5,0), (5,0), 11),
-        ]))
-        return tabla
-
-
-
-    def build_tabla_entregas(bloque):
-        style_celda = ParagraphStyle(name="celda", fontSize=9, leading=11)
-        data = [
-            ["Ord.", "ENTREGADO AL CONDUCTOR PARA SU REPARTO", "", "OBSERVACIONES DE ENTREGA", "", "", ""],
-            ["", "Nombre Cliente", "Remito No", "Entregado", "No Entregado", "Con Devolución", "Obs."]
-        ]
-
-        for e in bloque:
-            cliente_paragraph = Paragraph(e["cliente"], style_celda)
-            cliente_cell = KeepInFrame(maxWidth=ancho_total * 0.38, maxHeight=0.6*cm, content=[cliente_paragraph], mode="truncate")
-            remito_paragraph = Paragraph(e["remito"], style_celda)
-            remito_cell = KeepInFrame(maxWidth=ancho_total * 0.14, maxHeight=0.6*cm, content=[remito_paragraph], mode="shrink")
-            data.append([e["orden"], cliente_cell, remito_cell, "", "", "", ""])
-
-        col_props = [0.04, 0.38, 0.14, 0.09, 0.09, 0.12, 0.14]
-        col_widths = [ancho_total * p for p in col_props]
-        row_heights = [0.6 * cm] * len(data)
-
-        tabla = Table(data, colWidths=col_widths, rowHeights=row_heights)
-        tabla.setStyle(TableStyle([
-            ("GRID", (0,0), (-1,-1), 0.5, colors.black),
-            ("SPAN", (0,0), (0,1)),
-            ("SPAN", (1,0), (2,0)),
-            ("SPAN", (3,0), (6,0)),
-            ("ALIGN", (0,0), (-1,1), "CENTER"),
-            ("FONTNAME", (0,0), (-1,1), "Helvetica-Bold"),
-            ("FONTSIZE", (0,0), (-1,1), 9),
-            ("FONTNAME", (0,2), (-1,-1), "Helvetica"),
-            ("FONTSIZE", (0,2), (-1,-1), 9),
-            ("BACKGROUND", (2, 2), (2, -1), colors.white),
-        ]))
-        return tabla
-
-
-    def build_pie():
-        obs_paragraph = Paragraph(json_data["observaciones"], style_obs)
-        obs_width = ancho_total * 0.30
-        firmas_width = ancho_total - obs_width
-
-        tabla_firmas_data = [
-            ["CONTROL SALIDA", "", "CONTROL RETORNO", ""],
-            ["", "", "", ""],
-            ["Firma Conductor", "Firma Enc. Despacho", "Firma Conductor", "Firma Enc. Despacho"]
-        ]
-        tabla_firmas = Table(
-            tabla_firmas_data,
-            colWidths=[firmas_width * 0.25] * 4,
-            rowHeights=[0.8 * cm, 1.3 * cm, 0.6 * cm]
-        )
-        tabla_firmas.setStyle(TableStyle([
-            ("GRID", (0,0), (-1,-1), 0.5, colors.black),
-            ("SPAN", (0,0), (1,0)),
-            ("SPAN", (2,0), (3,0)),
-            ("ALIGN", (0,0), (-1,-1), "CENTER"),
-            ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
-            ("FONTNAME", (0,0), (-1,-1), "Helvetica"),
-            ("FONTSIZE", (0,0), (-1,-1), 8),
-            ("FONTNAME", (0,0), (3,0), "Helvetica-Bold"),
-            ("FONTNAME", (0,2), (3,2), "Helvetica-Bold"),
-        ]))
-
-        tabla_contenedora = Table(
-            [[obs_paragraph, tabla_firmas]],
-            colWidths=[obs_width, firmas_width],
-            rowHeights=[sum(tabla_firmas._rowHeights)]
-        )
-        tabla_contenedora.setStyle(TableStyle([
-            ("BOX", (0,0), (0,0), 0.5, colors.black),
-            ("VALIGN", (0,0), (0,0), "MIDDLE"),
-        ]))
-        return tabla_contenedora
-
-    def draw_header(canvas, doc):
-        canvas.saveState()
-        canvas.setFont("Helvetica-Bold", 16)
-        canvas.drawString(margen_x, pagina[1] - margen_y + 1 * cm, "MACROPHARMA S.A.")
-        encabezado = build_encabezado()
-        w, h = encabezado.wrap(doc.width, doc.topMargin)
-        encabezado.drawOn(canvas, margen_x, pagina[1] - h - margen_y + 0.5 * cm)
-        canvas.setFont("Helvetica-Bold", 10)
-        canvas.drawRightString(pagina[0] - margen_x, pagina[1] - h - 2 * cm - 0.3 * cm, json_data["sucursal"])
-        canvas.restoreState()
-
-    def draw_footer(canvas, doc):
-        canvas.saveState()
-        pie = build_pie()
-        pie.wrapOn(canvas, doc.width, doc.bottomMargin)
-        pie.drawOn(canvas, margen_x, margen_y)
-        canvas.restoreState()
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.cache_documentos import cache, version_de_archivos
+from comun.ajuste_texto import LineaCelda, primera_linea
+from comun import ajuste_texto
+from comun.metricas import Metricas
+from comun import perfiles
+
+# Motores del parte de entregas:
+#   "platypus"  el documento armado con tablas de platypus página por página
+#   "canvas"    el formulario fijo se dibuja una vez y en cada página sólo se
+#               escriben orden, cliente y remito (ver parte_canvas.py)
+# Los dos dan el mismo resultado visual (tests/test_parte_paridad.py); el motor
+# no entra en la clave de la cache.
+#
+# Variables de entorno:
+#   MOTOR_PARTE_ENTREGAS  motor por defecto ("platypus"; "canvas" para usar el otro)
+MOTOR_CANVAS = "canvas"
+MOTOR_PLATYPUS = "platypus"
+MOTOR_POR_DEFECTO = os.getenv("MOTOR_PARTE_ENTREGAS", MOTOR_PLATYPUS)
+
+VERSION_PARTE = version_de_archivos([
+    __file__,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "parte_canvas.py"),
+    ajuste_texto.__file__,
+    perfiles.__file__,
+])
+
+# Geometría del formulario, la misma en todas las páginas
+PAGINA = landscape(A4)
+MARGEN_X = 2 * cm
+MARGEN_Y = 2 * cm
+ANCHO_TOTAL = PAGINA[0] - 2 * MARGEN_X
+MARGEN_SUPERIOR = 3.5 * cm
+MARGEN_INFERIOR = 4.2 * cm
+ALTO_FILA = 0.6 * cm
+# Padding por defecto de las celdas de Table (no se cambia en las tablas del parte)
+PADDING_CELDA = 6
+PADDING_VERTICAL_CELDA = 3
+ENTREGAS_POR_PAGINA = 15
+PROPORCIONES_ENTREGAS = [0.04, 0.38, 0.14, 0.09, 0.09, 0.12, 0.14]
+
+ESTILO_CELDA = ParagraphStyle(name="celda", fontSize=9, leading=11)
+ESTILO_OBSERVACIONES = ParagraphStyle(
+    name="observaciones", parent=getSampleStyleSheet()["Normal"], fontSize=9, leading=11, alignment=1
+)
+
+
+def generar_parte_entregas_pdf(json_data, entregas, metricas=None, perfil=None, motor=None):
+    # El mismo pedido devuelve el PDF ya generado (ver comun/cache_documentos.py);
+    # metricas (comun/metricas.py) recibe los tiempos por fase y los conteos.
+    # perfil: "estandar" (None) o "compacto", ver comun/perfiles.py.
+    # motor: "platypus" o "canvas" (None: MOTOR_PARTE_ENTREGAS)
+    if metricas is None:
+        metricas = Metricas("parte_entregas")
+    perfil = perfiles.validar_perfil(perfil)
+    motor = motor or MOTOR_POR_DEFECTO
+    if motor == MOTOR_CANVAS:
+        from parte_canvas import construir_parte_entregas_canvas as construir
+    elif motor == MOTOR_PLATYPUS:
+        construir = construir_parte_entregas_pdf
+    else:
+        raise ValueError(f"Motor de parte de entregas desconocido: {motor!r}")
+    metricas.registrar("renglones", len(entregas or []))
+    metricas.registrar("perfil", perfil)
+    metricas.registrar("motor", motor)
+    datos = [json_data, entregas]
+    contenido = cache.obtener(
+        "parte_entregas",
+        VERSION_PARTE,
+        datos if perfil == perfiles.PERFIL_ESTANDAR else [*datos, perfil],
+        lambda: construir(json_data, entregas, metricas, perfil).getvalue(),
+        metricas=metricas,
+    )
+    metricas.registrar("bytes", len(contenido))
+    return BytesIO(contenido)
+
+
+def build_encabezado(json_data):
+    data = [
+        ["PARTE DE ENTREGAS", "Fecha Parte:", json_data["fecha_parte"], "Conductor:", json_data["conductor"], f"N° {json_data['numero_parte']}"],
+        [json_data["sucursal"], "Fecha Entrega:", json_data["fecha_entrega"], "Vehículo:", json_data["vehiculo"], ""],
+        ["", "", "", "Patente:", json_data["patente"], ""]
+    ]
+    col_widths = [ANCHO_TOTAL * p for p in [0.20, 0.12, 0.12, 0.12, 0.30, 0.14]]
+    row_heights = [0.6 * cm] * 3
+    tabla = Table(data, colWidths=col_widths, rowHeights=row_heights)
+    tabla.setStyle(TableStyle([
+        ("BOX", (0,0), (-1,-1), 0.8, colors.black),
+        ("LINEBEFORE", (1,0), (1,-1), 0.5, colors.black),
+        ("LINEBEFORE", (3,0), (3,-1), 0.5, colors.black),
+        ("LINEBEFORE", (5,0), (5,-1), 0.5, colors.black),
+        ("SPAN", (5,0), (5,2)),
+        ("ALIGN", (5,0), (5,2), "CENTER"),
+        ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
+        ("FONTNAME", (0,0), (-1,-1), "Helvetica"),
+        ("FONTSIZE", (0,0), (-1,-1), 9),
+        ("FONTNAME", (5,0), (5,0), "Helvetica-Bold"),
+        ("FONTSIZE", (5,0), (5,0), 11),
+    ]))
+    return tabla
+
+
+def celda_cliente(cliente):
+    cliente_paragraph = Paragraph(cliente, ESTILO_CELDA)
+    return KeepInFrame(maxWidth=ANCHO_TOTAL * 0.38, maxHeight=ALTO_FILA, content=[cliente_paragraph], mode="truncate")
+
+
+def celda_remito(remito):
+    remito_paragraph = Paragraph(remito, ESTILO_CELDA)
+    return KeepInFrame(maxWidth=ANCHO_TOTAL * 0.14, maxHeight=ALTO_FILA, content=[remito_paragraph], mode="shrink")
+
+
+def contenido_ajustado(texto, proporcion, crear_celda, truncar):
+    # Lo que se ve del párrafo de cliente (truncar) o remito (achicar) es su
+    # primera línea: va a la tabla como texto (o LineaCelda si Paragraph la
+    # dibuja con los espacios achicados). Si no se puede calcular así, o el
+    # remito no entra en una línea, el KeepInFrame de siempre
+    ancho_util = ANCHO_TOTAL * proporcion - 2 * PADDING_CELDA
+    alto_util = ALTO_FILA - 2 * PADDING_VERTICAL_CELDA
+    ajuste = primera_linea(texto, ESTILO_CELDA, ancho_util)
+    if ajuste is None or not (truncar or ajuste[1]) or ESTILO_CELDA.leading > alto_util:
+        return crear_celda(texto)
+    linea, _, espaciado = ajuste
+    return LineaCelda(linea, ESTILO_CELDA, espaciado) if espaciado else linea
+
+
+def build_tabla_entregas(bloque):
+    # bloque: entregas de una página; con None en lugar de una entrega queda la
+    # fila vacía (el motor canvas arma así la grilla sin textos)
+    data = [
+        ["Ord.", "ENTREGADO AL CONDUCTOR PARA SU REPARTO", "", "OBSERVACIONES DE ENTREGA", "", "", ""],
+        ["", "Nombre Cliente", "Remito No", "Entregado", "No Entregado", "Con Devolución", "Obs."]
+    ]
+
+    for e in bloque:
+        if e is None:
+            data.append([""] * 7)
+            continue
+        data.append([
+            e["orden"],
+            contenido_ajustado(e["cliente"], PROPORCIONES_ENTREGAS[1], celda_cliente, True),
+            contenido_ajustado(e["remito"], PROPORCIONES_ENTREGAS[2], celda_remito, False),
+            "", "", "", "",
+        ])
+
+    col_widths = [ANCHO_TOTAL * p for p in PROPORCIONES_ENTREGAS]
+    row_heights = [ALTO_FILA] * len(data)
+
+    tabla = Table(data, colWidths=col_widths, rowHeights=row_heights)
+    tabla.setStyle(TableStyle([
+        ("GRID", (0,0), (-1,-1), 0.5, colors.black),
+        ("SPAN", (0,0), (0,1)),
+        ("SPAN", (1,0), (2,0)),
+        ("SPAN", (3,0), (6,0)),
+        ("ALIGN", (0,0), (-1,1), "CENTER"),
+        ("FONTNAME", (0,0), (-1,1), "Helvetica-Bold"),
+        ("FONTSIZE", (0,0), (-1,1), 9),
+        ("FONTNAME", (0,2), (-1,-1), "Helvetica"),
+        ("FONTSIZE", (0,2), (-1,-1), 9),
+        # Cliente y remito como texto: con el interlineado del párrafo la
+        # línea queda donde la dejaba el KeepInFrame
+        ("FONTNAME", (1,2), (2,-1), ESTILO_CELDA.fontName),
+        ("FONTSIZE", (1,2), (2,-1), ESTILO_CELDA.fontSize),
+        ("LEADING", (1,2), (2,-1), ESTILO_CELDA.leading),
+        ("TEXTCOLOR", (1,2), (2,-1), ESTILO_CELDA.textColor),
+        ("BACKGROUND", (2, 2), (2, -1), colors.white),
+    ]))
+    return tabla
+
+
+def build_pie(json_data):
+    obs_paragraph = Paragraph(json_data["observaciones"], ESTILO_OBSERVACIONES)
+    obs_width = ANCHO_TOTAL * 0.30
+    firmas_width = ANCHO_TOTAL - obs_width
+
+    tabla_firmas_data = [
+        ["CONTROL SALIDA", "", "CONTROL RETORNO", ""],
+        ["", "", "", ""],
+        ["Firma Conductor", "Firma Enc. Despacho", "Firma Conductor", "Firma Enc. Despacho"]
+    ]
+    tabla_firmas = Table(
+        tabla_firmas_data,
+        colWidths=[firmas_width * 0.25] * 4,
+        rowHeights=[0.8 * cm, 1.3 * cm, 0.6 * cm]
+    )
+    tabla_firmas.setStyle(TableStyle([
+        ("GRID", (0,0), (-1,-1), 0.5, colors.black),
+        ("SPAN", (0,0), (1,0)),
+        ("SPAN", (2,0), (3,0)),
+        ("ALIGN", (0,0), (-1,-1), "CENTER"),
+        ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
+        ("FONTNAME", (0,0), (-1,-1), "Helvetica"),
+        ("FONTSIZE", (0,0), (-1,-1), 8),
+        ("FONTNAME", (0,0), (3,0), "Helvetica-Bold"),
+        ("FONTNAME", (0,2), (3,2), "Helvetica-Bold"),
+    ]))
+
+    tabla_contenedora = Table(
+        [[obs_paragraph, tabla_firmas]],
+        colWidths=[obs_width, firmas_width],
+        rowHeights=[sum(tabla_firmas._rowHeights)]
+    )
+    tabla_contenedora.setStyle(TableStyle([
+        ("BOX", (0,0), (0,0), 0.5, colors.black),
+        ("VALIGN", (0,0), (0,0), "MIDDLE"),
+    ]))
+    return tabla_contenedora
+
+
+NOMBRE_FORM_ENCABEZADO = "ParteEncabezado"
+NOMBRE_FORM_PIE = "PartePie"
+
+
+class FormularioParte:
+    # Encabezado y pie de un parte: el contenido es el mismo en todas las
+    # páginas, así que las tablas se arman una sola vez por documento y se
+    # miden la primera vez que se dibujan
+    def __init__(self, json_data):
+        self.json_data = json_data
+        self.encabezado = build_encabezado(json_data)
+        self.pie = build_pie(json_data)
+        self.alto_encabezado = None
+
+    def medir(self, canvas, doc):
+        if self.alto_encabezado is None:
+            self.alto_encabezado = self.encabezado.wrap(doc.width, doc.topMargin)[1]
+            self.pie.wrapOn(canvas, doc.width, doc.bottomMargin)
+
+
+def dibujar_encabezado(canvas, doc, formulario):
+    formulario.medir(canvas, doc)
+    h = formulario.alto_encabezado
+    canvas.saveState()
+    canvas.setFont("Helvetica-Bold", 16)
+    canvas.drawString(MARGEN_X, PAGINA[1] - MARGEN_Y + 1 * cm, "MACROPHARMA S.A.")
+    formulario.encabezado.drawOn(canvas, MARGEN_X, PAGINA[1] - h - MARGEN_Y + 0.5 * cm)
+    canvas.setFont("Helvetica-Bold", 10)
+    canvas.drawRightString(PAGINA[0] - MARGEN_X, PAGINA[1] - h - 2 * cm - 0.3 * cm, formulario.json_data["sucursal"])
+    canvas.restoreState()
+
+
+def dibujar_pie(canvas, doc, formulario):
+    formulario.medir(canvas, doc)
+    canvas.saveState()
+    formulario.pie.drawOn(canvas, MARGEN_X, MARGEN_Y)
+    canvas.restoreState()
+
+
+def draw_header(canvas, doc, formulario):
+    # Se dibuja una sola vez por documento en un form XObject y cada página
+    # lo referencia, como el encabezado de la oferta
+    if not canvas.hasForm(NOMBRE_FORM_ENCABEZADO):
+        canvas.beginForm(NOMBRE_FORM_ENCABEZADO)
+        dibujar_encabezado(canvas, doc, formulario)
+        canvas.endForm()
+    canvas.doForm(NOMBRE_FORM_ENCABEZADO)
+
+
+def draw_footer(canvas, doc, formulario):
+    if not canvas.hasForm(NOMBRE_FORM_PIE):
+        canvas.beginForm(NOMBRE_FORM_PIE)
+        dibujar_pie(canvas, doc, formulario)
+        canvas.endForm()
+    canvas.doForm(NOMBRE_FORM_PIE)
+
+
+def crear_frame_cuerpo():
+    return Frame(MARGEN_X, MARGEN_Y + 3 * cm, ANCHO_TOTAL, PAGINA[1] - 9 * cm, id='cuerpo')
+
+
+def bloques_entregas(entregas):
+    # Las entregas se cortan en bloques de 15, un bloque por página
+    return [entregas[i:i + ENTREGAS_POR_PAGINA] for i in range(0, len(entregas), ENTREGAS_POR_PAGINA)]
+
+
+def construir_parte_entregas_pdf(json_data, entregas, metricas=None, perfil=None):
+    if metricas is None:
+        metricas = Metricas("parte_entregas")
 
     # === GENERAR PDF EN MEMORIA ===
     buffer = BytesIO()
-    doc = BaseDocTemplate(buffer, pagesize=pagina,
-        rightMargin=margen_x, leftMargin=margen_x,
-        topMargin=3.5*cm, bottomMargin=4.2*cm
+    doc = BaseDocTemplate(buffer, pagesize=PAGINA,
+        rightMargin=MARGEN_X, leftMargin=MARGEN_X,
+        topMargin=MARGEN_SUPERIOR, bottomMargin=MARGEN_INFERIOR,
+        **perfiles.opciones_documento(perfil)
     )
-    frame_cuerpo = Frame(margen_x, margen_y + 3 * cm, ancho_total, pagina[1] - 9 * cm, id='cuerpo')
+    frame_cuerpo = crear_frame_cuerpo()
+    formulario = FormularioParte(json_data)
     template = PageTemplate(id='plantilla', frames=[frame_cuerpo],
-                            onPage=draw_header, onPageEnd=draw_footer)
+                            onPage=lambda canvas, doc: draw_header(canvas, doc, formulario),
+                            onPageEnd=lambda canvas, doc: draw_footer(canvas, doc, formulario))
     doc.addPageTemplates([template])
 
     elementos = []
-    bloques = [entregas[i:i+15] for i in range(0, len(entregas), 15)]
-    for bloque in bloques:
-        elementos.append(build_tabla_entregas(bloque))
-        if bloque != bloques[-1]:
-            elementos.append(PageBreak())
+    # Sin entregas va una página con la grilla vacía, como en el motor canvas
+    bloques = bloques_entregas(entregas) or [[]]
+    with metricas.fase("tablas"):
+        for numero, bloque in enumerate(bloques, 1):
+            elementos.append(build_tabla_entregas(bloque))
+            if numero < len(bloques):
+                elementos.append(PageBreak())
+    metricas.registrar("cortes_tabla", max(len(bloques) - 1, 0))
 
-    doc.build(elementos)
+    with metricas.fase("build"):
+        doc.build(elementos)
+    metricas.registrar("paginas", doc.page)
     buffer.seek(0)
     return buffer
@@ -0,0 +1,239 @@
+import sys
+import io
+import os
+import json
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from reportlab.pdfbase.pdfdoc import PDFPageLabel
+from reportlab.pdfgen.canvas import Canvas
+from generador_parte import PAGINA, generar_parte_entregas_pdf
+from parte_canvas import dibujar_parte
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.salida import modo_binario, escribir_documento, escribir_error
+from comun.metricas import Metricas
+from comun import lotes, perfiles
+
+# Genera los partes de entregas de todo un día de despacho (uno por
+# conductor / vehículo / sucursal) en una sola llamada, repartidos en varios
+# procesos.
+#
+# Entrada (stdin): {"partes": [{json_data, entregas, nombre_archivo?, perfil?}, ...],
+#                   "formato": "pdf" | "zip", "perfil"?}
+#
+# Salida (stdout):
+#   - "pdf" (por defecto): un solo PDF con todos los partes, uno detrás de otro.
+#     Cada parte tiene su propio encabezado y su propia numeración de páginas
+#     (etiquetas "N° <numero_parte> - 1, 2, ...") y una entrada en el índice
+#     del PDF. Sale como escribir_documento (con --binario, una trama). Si falla
+#     un parte no se genera el PDF: el error dice cuál fue. El perfil de salida
+#     es del documento: vale sólo el "perfil" general y un parte con otro perfil
+#     es un error.
+#   - "zip": un zip con un PDF por parte y un errores.json si alguno falló; con
+#     --binario una trama por parte, como generador_pdf/generar_pdf_lote.py. Cada
+#     parte usa su propio perfil. Un error en un parte no corta el lote.
+#
+# En el PDF combinado cada proceso dibuja sus partes con el motor canvas (ver
+# parte_canvas.py) en un canvas que guarda los operadores de cada XObject y de
+# cada página; este proceso los copia en el documento final. Los XObject de
+# cada parte llevan el prefijo "Ruta<n>_" para no mezclarse con los de otro.
+#
+# Variables de entorno:
+#   WORKERS_LOTE_PARTES  procesos (por defecto la cantidad de CPU)
+
+CANTIDAD_WORKERS = int(os.getenv("WORKERS_LOTE_PARTES", os.cpu_count() or 1))
+
+FORMATO_PDF = "pdf"
+FORMATO_ZIP = "zip"
+
+# Se registran en este orden en todos los canvas: así las páginas dibujadas en
+# otro proceso nombran las fuentes igual que el PDF combinado (/F1, /F2)
+FUENTES_PARTE = ("Helvetica", "Helvetica-Bold")
+
+
+class FuentesIncompatibles(Exception):
+    # Las páginas capturadas usan una fuente con otro nombre interno
+    pass
+
+
+def validar_parte(indice, parte):
+    if not isinstance(parte, dict) or not parte.get("json_data") or not parte.get("entregas"):
+        raise ValueError(f"Parte {indice + 1}: faltan json_data o entregas")
+    if not isinstance(parte["json_data"], dict) or not isinstance(parte["entregas"], list):
+        raise ValueError(f"Parte {indice + 1}: json_data tiene que ser un objeto y entregas una lista")
+
+
+def validar_perfil_combinado(indice, parte, perfil):
+    # En el PDF combinado todos los partes comparten el perfil del documento
+    if parte.get("perfil") is not None and perfiles.validar_perfil(parte["perfil"]) != perfiles.validar_perfil(perfil):
+        raise ValueError(
+            f"Parte {indice + 1}: el perfil {parte['perfil']!r} no se puede aplicar a un solo parte "
+            f"en el formato {FORMATO_PDF}; usar el \"perfil\" general del lote"
+        )
+
+
+def nombre_archivo_parte(indice, parte):
+    return lotes.nombre_pdf(indice, parte, "parte_entregas", "json_data", "numero_parte")
+
+
+def registrar_fuentes(canvas):
+    for fuente in FUENTES_PARTE:
+        canvas._doc.getInternalFontName(fuente)
+
+
+def prefijo_ruta(indice):
+    return f"Ruta{indice + 1}_"
+
+
+# ==== ZIP: un PDF por parte ====
+
+def generar_pdf_parte(indice, parte):
+    validar_parte(indice, parte)
+    metricas = Metricas("parte_entregas")
+    buffer = generar_parte_entregas_pdf(
+        parte["json_data"], parte["entregas"], metricas, perfil=parte.get("perfil")
+    )
+    return buffer.getvalue(), metricas.como_dict()
+
+
+# ==== PDF combinado ====
+
+class CanvasCaptura(Canvas):
+    # Canvas descartable que además guarda los operadores de cada form XObject
+    # y de cada página (con los forms que usa) para repetirlos en otro documento
+    def __init__(self):
+        Canvas.__init__(self, BytesIO(), pagesize=PAGINA)
+        registrar_fuentes(self)
+        self.forms = []
+        self.paginas = []
+
+    def endForm(self, **extra_attributes):
+        self.forms.append((self._formData[0], list(self._code)))
+        Canvas.endForm(self, **extra_attributes)
+
+    def showPage(self):
+        self.paginas.append((list(self._code), list(self._formsinuse)))
+        Canvas.showPage(self)
+
+
+def capturar_parte(indice, parte):
+    # Se ejecuta en los procesos del pool
+    validar_parte(indice, parte)
+    canvas = CanvasCaptura()
+    try:
+        dibujar_parte(
+            canvas, parte["json_data"], parte["entregas"], Metricas("parte_entregas"), prefijo_ruta(indice)
+        )
+    except Exception as e:
+        raise ValueError(f"Parte {indice + 1}: {e}") from e
+    return {
+        "forms": canvas.forms,
+        "paginas": canvas.paginas,
+        "fuentes": dict(canvas._doc.fontMapping),
+    }
+
+
+def repetir_parte(canvas, captura):
+    # Agrega al documento los XObject y las páginas capturadas de un parte
+    documento = canvas._doc
+    for fuente, nombre_interno in captura["fuentes"].items():
+        if documento.getInternalFontName(fuente) != nombre_interno:
+            raise FuentesIncompatibles(f"La fuente {fuente} no es {nombre_interno} en este documento")
+    for nombre, codigo in captura["forms"]:
+        canvas.beginForm(nombre)
+        canvas._code.extend(codigo)
+        canvas.endForm()
+    for codigo, forms in captura["paginas"]:
+        canvas._code.extend(codigo)
+        canvas._formsinuse.extend(forms)
+        canvas.showPage()
+
+
+def iniciar_ruta(canvas, indice, json_data):
+    # Numeración propia y entrada en el índice del PDF desde la página actual
+    numero_parte = json_data.get("numero_parte", indice + 1)
+    canvas.addPageLabel(
+        canvas.getPageNumber() - 1, style=PDFPageLabel.ARABIC, start=1, prefix=f"N° {numero_parte} - "
+    )
+    clave = prefijo_ruta(indice) + "inicio"
+    canvas.bookmarkPage(clave)
+    titulo = f"Parte N° {numero_parte} - {json_data.get('conductor', '')} - {json_data.get('vehiculo', '')}"
+    canvas.addOutlineEntry(titulo, clave, level=0)
+
+
+def generar_pdf_combinado(partes, metricas=None, perfil=None, procesos=None):
+    if metricas is None:
+        metricas = Metricas("partes_lote")
+    procesos = min(procesos or CANTIDAD_WORKERS, len(partes))
+    for indice, parte in enumerate(partes):
+        validar_parte(indice, parte)
+        validar_perfil_combinado(indice, parte, perfil)
+
+    capturas = [None] * len(partes)
+    if procesos >= 2:
+        with metricas.fase("tablas"):
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                capturas = list(pool.map(capturar_parte, range(len(partes)), partes))
+
+    buffer = BytesIO()
+    canvas = Canvas(buffer, pagesize=PAGINA, **perfiles.opciones_documento(perfil))
+    registrar_fuentes(canvas)
+    dibujados_aca = 0
+    for indice, (parte, captura) in enumerate(zip(partes, capturas)):
+        iniciar_ruta(canvas, indice, parte["json_data"])
+        if captura is not None:
+            try:
+                with metricas.fase("build"):
+                    repetir_parte(canvas, captura)
+                continue
+            except FuentesIncompatibles:
+                # Todavía no se agregó nada de este parte: se dibuja acá
+                pass
+        try:
+            dibujar_parte(canvas, parte["json_data"], parte["entregas"], metricas, prefijo_ruta(indice))
+        except Exception as e:
+            raise ValueError(f"Parte {indice + 1}: {e}") from e
+        dibujados_aca += 1
+
+    with metricas.fase("build"):
+        canvas.showOutline()
+        canvas.save()
+    metricas.registrar("partes", len(partes))
+    metricas.registrar("paginas", canvas.getPageNumber() - 1)
+    metricas.registrar("procesos", procesos if procesos >= 2 else 1)
+    metricas.registrar("partes_en_procesos", len(partes) - dibujados_aca)
+    buffer.seek(0)
+    return buffer
+
+
+def main():
+    try:
+        sys.stdin = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+        metricas = Metricas("partes_lote")
+        with metricas.fase("lectura_json"):
+            data = json.load(sys.stdin)
+        partes = data.get("partes") if isinstance(data, dict) else data
+        formato = (data.get("formato") if isinstance(data, dict) else None) or FORMATO_PDF
+
+        if not partes:
+            raise ValueError("No se recibieron partes para generar")
+
+        if formato == FORMATO_PDF:
+            perfil = perfiles.validar_perfil(data.get("perfil") if isinstance(data, dict) else None)
+            buffer = generar_pdf_combinado(partes, metricas, perfil=perfil)
+            escribir_documento(buffer, "partes_entregas.pdf", "application/pdf", metricas)
+        elif formato == FORMATO_ZIP:
+            resultados = lotes.generar_lote(partes, generar_pdf_parte, CANTIDAD_WORKERS)
+            if modo_binario():
+                lotes.escribir_tramas(sys.stdout.buffer, partes, resultados, nombre_archivo_parte)
+            else:
+                lotes.escribir_zip(sys.stdout.buffer, partes, resultados, nombre_archivo_parte)
+        else:
+            raise ValueError(f"Formato de lote desconocido: {formato!r} (opciones: {FORMATO_PDF}, {FORMATO_ZIP})")
+
+    except Exception as e:
+        escribir_error(e)
+
+
+if __name__ == "__main__":
+    main()
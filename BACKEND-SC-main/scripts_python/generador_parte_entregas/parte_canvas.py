@@ -0,0 +1,203 @@
+import os
+import sys
+from io import BytesIO
+from types import SimpleNamespace
+from reportlab.lib.colors import toColor
+from reportlab.lib.rl_accel import fp_str
+from reportlab.pdfgen.canvas import Canvas
+
+from generador_parte import (
+    ANCHO_TOTAL,
+    ESTILO_CELDA,
+    FormularioParte,
+    MARGEN_INFERIOR,
+    MARGEN_SUPERIOR,
+    PAGINA,
+    bloques_entregas,
+    build_tabla_entregas,
+    celda_cliente,
+    celda_remito,
+    crear_frame_cuerpo,
+    dibujar_encabezado,
+    dibujar_pie,
+)
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.ajuste_texto import primera_linea
+from comun.metricas import Metricas
+from comun import perfiles
+
+# Motor "canvas" del parte de entregas: el mismo documento que
+# construir_parte_entregas_pdf sin armar una tabla de platypus por página.
+#
+# El formulario es igual en todas las páginas: encabezado, pie con las firmas y
+# la grilla de entregas. Se dibuja una sola vez en XObjects (uno para encabezado
+# y pie, uno por cantidad de filas de la grilla) y cada página los reutiliza;
+# después sólo se escriben orden, cliente y remito de cada fila con drawString,
+# en las mismas posiciones en que los deja la tabla.
+#
+# Cliente y remito ocupan una sola línea visible: se calcula con
+# comun/ajuste_texto.py, como en la tabla. Los textos que no se pueden resolver
+# así (marcado, una palabra más ancha que la celda, un remito que no entra en
+# una línea) se dibujan con el KeepInFrame de siempre.
+
+NOMBRE_FORM_FIJO = "ParteEntregasFijo"
+
+
+def documento_formulario():
+    # Lo que dibujar_encabezado y dibujar_pie leen del documento de platypus
+    return SimpleNamespace(width=ANCHO_TOTAL, topMargin=MARGEN_SUPERIOR, bottomMargin=MARGEN_INFERIOR)
+
+
+class GrillaEntregas:
+    # Grilla vacía de una página con `filas` entregas: el XObject que la dibuja
+    # y la geometría de sus celdas en la página
+    def __init__(self, canvas, filas, prefijo=""):
+        self.nombre = f"{prefijo}GrillaParte{filas}"
+        tabla = build_tabla_entregas([None] * filas)
+        frame = crear_frame_cuerpo()
+        ancho, alto = tabla.wrapOn(canvas, frame._aW, frame._y - frame._y1p)
+        # Donde la ubica el frame: centrada y pegada arriba
+        x = frame._x + 0.5 * (frame._aW - ancho)
+        y = frame._y - alto
+        canvas.beginForm(self.nombre)
+        tabla.drawOn(canvas, x, y)
+        canvas.endForm()
+        self.columnas = [x + posicion for posicion in tabla._colpositions]
+        self.filas = [y + posicion for posicion in tabla._rowpositions]
+        self.estilos = tabla._cellStyles
+
+    def celda(self, fila, columna):
+        # (x, y, ancho, alto, estilo) de la celda en coordenadas de página
+        return (
+            self.columnas[columna],
+            self.filas[fila + 1],
+            self.columnas[columna + 1] - self.columnas[columna],
+            self.filas[fila] - self.filas[fila + 1],
+            self.estilos[fila][columna],
+        )
+
+
+class TextoPagina:
+    # Todos los textos de una página en un solo objeto de texto. Las filas
+    # están en el mismo lugar en todas las páginas: el operador que ubica cada
+    # texto se formatea una vez por documento
+    def __init__(self, canvas, origenes):
+        self.objeto = canvas.beginText()
+        self.origenes = origenes
+        self.fuente = None
+
+    def escribir(self, x, y, linea, fuente, tamanio, color, espaciado=0):
+        # Cada texto es una sola línea ubicada con su origen: el interlineado
+        # de la celda no se usa. espaciado: ajuste entre palabras (Tw)
+        color = toColor(color)
+        if self.fuente != (fuente, tamanio, color):
+            self.objeto.setFont(fuente, tamanio)
+            self.objeto.setFillColor(color)
+            self.fuente = (fuente, tamanio, color)
+        origen = self.origenes.get((x, y))
+        if origen is None:
+            origen = self.origenes[(x, y)] = "1 0 0 1 %s Tm" % fp_str(x, y)
+        self.objeto._code.append(origen)
+        if espaciado:
+            self.objeto.setWordSpace(espaciado)
+            self.objeto._textOut(linea)
+            self.objeto.setWordSpace(0)
+        else:
+            self.objeto._textOut(linea)
+
+
+def dibujar_orden(texto, orden, celda):
+    # Como Table._drawCell con un texto (alineación izquierda, abajo)
+    x, y, _, _, estilo = celda
+    lineas = str(orden).split("\n")
+    y += estilo.bottomPadding + len(lineas) * estilo.leading - estilo.fontsize
+    for linea in lineas:
+        texto.escribir(
+            x + estilo.leftPadding, y, linea,
+            estilo.fontname, estilo.fontsize, estilo.color,
+        )
+        y -= estilo.leading
+
+
+def dibujar_parrafo(canvas, texto, contenido, celda, crear_celda, truncar):
+    # Cliente (truncar) o remito (achicar) en una sola línea; si no se puede,
+    # el KeepInFrame de la tabla. Devuelve True si usó el KeepInFrame
+    x, y, ancho, alto, estilo = celda
+    ancho_util = ancho - estilo.leftPadding - estilo.rightPadding
+    alto_util = alto - estilo.topPadding - estilo.bottomPadding
+    ajuste = primera_linea(contenido, ESTILO_CELDA, ancho_util)
+    if ajuste is not None and (truncar or ajuste[1]) and ESTILO_CELDA.leading <= alto_util:
+        linea, _, espaciado = ajuste
+        if linea:
+            # Primera línea del párrafo, pegado al fondo de la celda
+            texto.escribir(
+                x + estilo.leftPadding,
+                y + estilo.bottomPadding + ESTILO_CELDA.leading - ESTILO_CELDA.fontSize,
+                linea,
+                ESTILO_CELDA.fontName, ESTILO_CELDA.fontSize, ESTILO_CELDA.textColor,
+                espaciado,
+            )
+        return False
+    flowable = crear_celda(contenido)
+    flowable.wrapOn(canvas, ancho_util, alto_util)
+    flowable.drawOn(canvas, x + estilo.leftPadding, y + estilo.bottomPadding)
+    return True
+
+
+def dibujar_parte(canvas, json_data, entregas, metricas, prefijo=""):
+    # Las páginas de un parte en canvas, cada una cerrada con showPage.
+    # prefijo: nombres propios para los XObject de este parte cuando van varios
+    # partes en un mismo PDF. Devuelve (páginas, celdas con KeepInFrame)
+    bloques = bloques_entregas(entregas) or [[]]
+    nombre_fijo = prefijo + NOMBRE_FORM_FIJO
+    grillas = {}
+    origenes = {}
+    celdas_platypus = 0
+
+    with metricas.fase("tablas"):
+        documento = documento_formulario()
+        formulario = FormularioParte(json_data)
+        canvas.beginForm(nombre_fijo)
+        dibujar_encabezado(canvas, documento, formulario)
+        dibujar_pie(canvas, documento, formulario)
+        canvas.endForm()
+        for bloque in bloques:
+            if len(bloque) not in grillas:
+                grillas[len(bloque)] = GrillaEntregas(canvas, len(bloque), prefijo)
+
+    with metricas.fase("build"):
+        for bloque in bloques:
+            grilla = grillas[len(bloque)]
+            canvas.doForm(nombre_fijo)
+            canvas.doForm(grilla.nombre)
+            # Las entregas empiezan después de las dos filas de títulos
+            texto = TextoPagina(canvas, origenes)
+            for fila, entrega in enumerate(bloque, 2):
+                dibujar_orden(texto, entrega["orden"], grilla.celda(fila, 0))
+                celdas_platypus += dibujar_parrafo(
+                    canvas, texto, entrega["cliente"], grilla.celda(fila, 1), celda_cliente, True
+                )
+                celdas_platypus += dibujar_parrafo(
+                    canvas, texto, entrega["remito"], grilla.celda(fila, 2), celda_remito, False
+                )
+            canvas.drawText(texto.objeto)
+            canvas.showPage()
+    return len(bloques), celdas_platypus
+
+
+def construir_parte_entregas_canvas(json_data, entregas, metricas=None, perfil=None):
+    # Mismos argumentos y mismo resultado visual que construir_parte_entregas_pdf
+    if metricas is None:
+        metricas = Metricas("parte_entregas")
+
+    buffer = BytesIO()
+    canvas = Canvas(buffer, pagesize=PAGINA, **perfiles.opciones_documento(perfil))
+    paginas, celdas_platypus = dibujar_parte(canvas, json_data, entregas, metricas)
+    with metricas.fase("build"):
+        canvas.save()
+    metricas.registrar("cortes_tabla", paginas - 1)
+    metricas.registrar("paginas", paginas)
+    metricas.registrar("celdas_platypus", celdas_platypus)
+    buffer.seek(0)
+    return buffer
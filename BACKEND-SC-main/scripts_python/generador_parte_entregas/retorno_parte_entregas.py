@@ -1,29 +1,29 @@
 import sys
+import os
 import json
-import base64
 import io
-from io import BytesIO
 from generador_parte import generar_parte_entregas_pdf # Debe estar en el mismo folder o en PYTHONPATH
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.salida import escribir_documento, escribir_error
+from comun.metricas import Metricas
+
 def main():
     try:
         sys.stdin = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
-        data = json.load(sys.stdin)
+        metricas = Metricas("parte_entregas")
+        with metricas.fase("lectura_json"):
+            data = json.load(sys.stdin)
         json_data = data.get("json_data")
         entregas = data.get("entregas")
 
         if not json_data or not entregas:
             raise ValueError("Faltan json_data o entregas")
 
-        buffer = generar_parte_entregas_pdf(json_data, entregas)
-        encoded_pdf = base64.b64encode(buffer.read()).decode('utf-8')
-        print(json.dumps({
-            "fileName": "parte_entregas.pdf",
-            "contentBase64": encoded_pdf
-        }))
+        buffer = generar_parte_entregas_pdf(json_data, entregas, metricas, perfil=data.get("perfil"))
+        escribir_documento(buffer, "parte_entregas.pdf", "application/pdf", metricas)
     except Exception as e:
-        print(json.dumps({"error": str(e)}), file=sys.stderr)
-        sys.exit(1)
+        escribir_error(e)
 
 if __name__ == "__main__":
     main()
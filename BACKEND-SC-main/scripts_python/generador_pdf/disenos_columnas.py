@@ -0,0 +1,360 @@
+from reportlab.lib import colors
+from reportlab.lib.colors import Color
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import Paragraph, TableStyle
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.parrafos import ParrafoCacheado
+
+# Diseños de columnas de la tabla de demanda de la oferta.
+#
+# DISENOS_COLUMNAS dice qué columnas se muestran y con qué ancho según las
+# columnas que trae la licitación; COLUMNAS_DEMANDA, cómo se muestra cada una.
+# Para agregar un diseño alcanza con sumar una entrada (y las columnas nuevas
+# que use): generar_tabla_demanda no cambia.
+#
+# plan_columnas() compila cada diseño una sola vez por proceso en un
+# PlanColumnas con todo lo que no depende de los renglones: orden y anchos,
+# celdas del encabezado, comandos de estilo (en rangos, sin un comando por
+# fila) y la función que arma la celda de cada columna.
+
+# Se usa el primer diseño cuyas columnas requeridas estén todas en la
+# licitación. Los anchos base se escalan para que la tabla mida ANCHO_TABLA
+DISENOS_COLUMNAS = [
+    {
+        "nombre": "CASO 1",
+        "requiere": ("observaciones", "nombre_comercial"),
+        "columnas": [
+            ("renglon", 0.4),
+            ("cantidad", 0.4),
+            ("descripcion", 1.4),
+            ("nombre_comercial", 1.2),
+            ("laboratorio_elegido", 0.9),
+            ("ANMAT", 0.5),
+            ("Col_signo", 0.1),
+            ("precio_vta", 0.6),
+            ("Col_signo2", 0.1),
+            ("precio_vta_total", 0.9),
+            ("observaciones", 1.3),
+        ],
+    },
+    {
+        "nombre": "CASO 2",
+        "requiere": ("observaciones",),
+        "columnas": [
+            ("renglon", 0.4),
+            ("cantidad", 0.4),
+            ("descripcion", 1.5),
+            ("laboratorio_elegido", 0.9),
+            ("ANMAT", 0.5),
+            ("Col_signo", 0.1),
+            ("precio_vta", 0.6),
+            ("Col_signo2", 0.1),
+            ("precio_vta_total", 0.9),
+            ("observaciones", 1.4),
+        ],
+    },
+    {
+        "nombre": "CASO 3",
+        "requiere": ("nombre_comercial",),
+        "columnas": [
+            ("renglon", 0.4),
+            ("cantidad", 0.4),
+            ("descripcion", 1.6),
+            ("nombre_comercial", 1.5),
+            ("laboratorio_elegido", 0.9),
+            ("ANMAT", 0.5),
+            ("Col_signo", 0.1),
+            ("precio_vta", 0.6),
+            ("Col_signo2", 0.1),
+            ("precio_vta_total", 0.9),
+        ],
+    },
+    {
+        "nombre": "CASO 4",
+        "requiere": (),
+        "columnas": [
+            ("renglon", 0.4),
+            ("cantidad", 0.4),
+            ("descripcion", 1.7),
+            ("laboratorio_elegido", 0.9),
+            ("ANMAT", 0.7),
+            ("Col_signo", 0.1),
+            ("precio_vta", 0.7),
+            ("Col_signo2", 0.1),
+            ("precio_vta_total", 1.0),
+        ],
+    },
+]
+
+ANCHO_TABLA = 8.0
+
+# Cómo se muestra cada columna:
+#   titulo         texto del encabezado ("" sin texto)
+#   une_siguiente  el encabezado ocupa también la columna siguiente
+#   estilo         estilo del cuerpo (ESTILOS)
+#   texto_plano    los valores que entran en una línea se dibujan sin Paragraph,
+#                  con la fuente / alineación del estilo puestas por TableStyle
+#   cache_cortes   texto que se repite entre licitaciones (catálogo): el corte
+#                  de líneas se reutiliza entre pedidos (comun/parrafos.py)
+#   precio         se formatea como número argentino (comun/formato.py)
+#   constante      valor fijo en todos los renglones (sin leer el renglón)
+#   total          valor en la fila de totales (TOTAL_LICITACION: el total)
+TOTAL_LICITACION = object()
+
+COLUMNAS_DEMANDA = {
+    "renglon": {"titulo": "N° RENG.", "estilo": "cuerpo", "texto_plano": True},
+    "cantidad": {"titulo": "CANT", "estilo": "cuerpo", "texto_plano": True},
+    "descripcion": {"titulo": "DESCRIPCIÓN", "estilo": "descripcion", "cache_cortes": True},
+    "nombre_comercial": {"titulo": "NOMBRE COMERCIAL", "estilo": "cuerpo", "cache_cortes": True},
+    "laboratorio_elegido": {"titulo": "LABORATORIO", "estilo": "cuerpo", "cache_cortes": True},
+    "ANMAT": {"titulo": "ANMAT", "estilo": "cuerpo", "texto_plano": True},
+    "Col_signo": {
+        "titulo": "PRECIO VTA UNITARIO",
+        "une_siguiente": True,
+        "estilo": "cuerpo",
+        "texto_plano": True,
+        "constante": "$",
+    },
+    "precio_vta": {
+        "titulo": "",
+        "estilo": "precio_unitario",
+        "texto_plano": True,
+        "precio": True,
+        "total": " ",
+    },
+    "Col_signo2": {
+        "titulo": "PRECIO TOTAL",
+        "une_siguiente": True,
+        "estilo": "cuerpo",
+        "texto_plano": True,
+        "constante": "$",
+        "total": "$",
+    },
+    "precio_vta_total": {
+        "titulo": "",
+        "estilo": "precio_total",
+        "texto_plano": True,
+        "precio": True,
+        "total": TOTAL_LICITACION,
+    },
+    "observaciones": {"titulo": "OBSERVACIONES", "estilo": "cuerpo"},
+}
+
+_estilos_base = getSampleStyleSheet()
+
+ESTILOS = {
+    "encabezado": ParagraphStyle(
+        name="HeaderStyle",
+        parent=_estilos_base["Heading1"],
+        fontName="Helvetica-Bold",
+        fontSize=8,
+        alignment=1,
+        textColor="white",
+        leading=10,
+    ),
+    "cuerpo": ParagraphStyle(
+        name="BodyStyle",
+        parent=_estilos_base["BodyText"],
+        wordWrap="CJK",
+        fontSize=7,
+        leading=10,
+        alignment=1,
+    ),
+    "descripcion": ParagraphStyle(
+        name="BodyStyle",
+        parent=_estilos_base["BodyText"],
+        wordWrap="CJK",
+        fontSize=7,
+        leading=10,
+        alignment=0,
+    ),
+    "precio_unitario": ParagraphStyle(
+        name="BodyStyle",
+        parent=_estilos_base["BodyText"],
+        wordWrap="CJK",
+        fontSize=7,
+        leading=10,
+        alignment=2,
+    ),
+    "precio_total": ParagraphStyle(
+        name="BodyStyle",
+        parent=_estilos_base["BodyText"],
+        fontName="Helvetica-Bold",
+        wordWrap="CJK",
+        fontSize=7,
+        leading=14,
+        alignment=2,
+    ),
+    "total": ParagraphStyle(
+        name="BodyStyle",
+        parent=_estilos_base["BodyText"],
+        fontName="Helvetica-Bold",
+        wordWrap="CJK",
+        fontSize=8,
+        textColor="white",
+        leading=14,
+        alignment=2,
+    ),
+}
+
+COLOR_ENCABEZADO = Color(17 / 255.0, 126 / 255.0, 191 / 255.0)
+COLOR_TOTALES = Color(68 / 255.0, 114 / 255.0, 196 / 255.0)
+PADDING_CELDAS = 1.5
+ALINEACIONES = {0: "LEFT", 1: "CENTER", 2: "RIGHT"}
+
+
+def clave_descripcion(columnas):
+    # Clave del renglón que se muestra en la columna DESCRIPCIÓN
+    if "descripcionTarot" in columnas and "descripcion" not in columnas:
+        return "descripcionTarot"
+    return "descripcion"
+
+
+def elegir_diseno(columnas):
+    for diseno in DISENOS_COLUMNAS:
+        if all(columna in columnas for columna in diseno["requiere"]):
+            return diseno
+    raise ValueError("No hay un diseño de columnas para la tabla de demanda")
+
+
+def generar_celda(estilo, ancho_disponible, texto_plano, cache_cortes=False):
+    # Función valor -> celda de una columna
+    if cache_cortes:
+        return lambda valor: ParrafoCacheado(str(valor), estilo)
+    if not texto_plano:
+        return lambda valor: Paragraph(str(valor), estilo)
+
+    def celda(valor):
+        texto = str(valor)
+        if "<" not in texto and "&" not in texto:
+            texto_sin_blancos = texto.strip()
+            if stringWidth(texto_sin_blancos, estilo.fontName, estilo.fontSize) <= ancho_disponible:
+                return texto_sin_blancos
+        return Paragraph(texto, estilo)
+
+    return celda
+
+
+def estilo_texto_plano(estilo, desde, hasta):
+    return [
+        ("FONTNAME", desde, hasta, estilo.fontName),
+        ("FONTSIZE", desde, hasta, estilo.fontSize),
+        ("LEADING", desde, hasta, estilo.leading),
+        ("ALIGN", desde, hasta, ALINEACIONES[estilo.alignment]),
+    ]
+
+
+class PlanColumnas:
+    def __init__(self, diseno, columna_descripcion):
+        self.nombre = diseno["nombre"]
+        self.orden = [columna for columna, _ in diseno["columnas"]]
+        self.columna_descripcion = columna_descripcion
+        definiciones = [COLUMNAS_DEMANDA[columna] for columna in self.orden]
+
+        # Anchos base normalizados a ANCHO_TABLA pulgadas
+        anchos_base = [ancho for _, ancho in diseno["columnas"]]
+        factor = ANCHO_TABLA / sum(anchos_base)
+        self.anchos = [round(ancho * factor, 2) * inch for ancho in anchos_base]
+
+        # Clave del renglón de cada columna (None: valor constante)
+        self.claves = [
+            None if "constante" in definicion else columna_descripcion if columna == "descripcion" else columna
+            for columna, definicion in zip(self.orden, definiciones)
+        ]
+        self.constantes = [definicion.get("constante") for definicion in definiciones]
+        self.indices_precio = [i for i, definicion in enumerate(definiciones) if definicion.get("precio")]
+        self.totales = [definicion.get("total", "") for definicion in definiciones]
+
+        estilo_total = ESTILOS["total"]
+        self.celdas = []
+        self.celdas_total = []
+        for ancho, definicion in zip(self.anchos, definiciones):
+            texto_plano = definicion.get("texto_plano", False)
+            ancho_disponible = ancho - 2 * PADDING_CELDAS
+            self.celdas.append(
+                generar_celda(
+                    ESTILOS[definicion["estilo"]],
+                    ancho_disponible,
+                    texto_plano,
+                    definicion.get("cache_cortes", False),
+                )
+            )
+            self.celdas_total.append(generar_celda(estilo_total, ancho_disponible, texto_plano))
+
+        # Encabezado y celdas unidas
+        self.encabezado = []
+        spans = []
+        for i, definicion in enumerate(definiciones):
+            titulo = definicion["titulo"]
+            self.encabezado.append(Paragraph(titulo, ESTILOS["encabezado"]) if titulo else "")
+            if definicion.get("une_siguiente"):
+                spans.append(("SPAN", (i, 0), (i + 1, 0)))
+
+        # Bloque de precios: desde el primer signo hasta el precio total
+        inicio_precios = self.orden.index("Col_signo")
+        segundo_signo = self.orden.index("Col_signo2")
+        fin_precios = self.orden.index("precio_vta_total")
+
+        comandos = [
+            ("BACKGROUND", (0, 0), (-1, 0), COLOR_ENCABEZADO),
+            *spans,
+            ("GRID", (0, 0), (-1, 0), 1.5, colors.black),
+            ("GRID", (0, 1), (inicio_precios - 1, -2), 1, colors.black),
+            ("LINEAFTER", (fin_precios, 1), (fin_precios, -1), 1, colors.black),
+            ("BOX", (len(self.orden), 0), (-1, -1), 1, colors.black),
+            ("BOX", (0, 0), (-1, -1), 1.5, colors.black),
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+            ("LEFTPADDING", (0, 0), (-1, -1), PADDING_CELDAS),
+            ("RIGHTPADDING", (0, 0), (-1, -1), PADDING_CELDAS),
+            ("TOPPADDING", (0, 0), (-1, -1), 2),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), PADDING_CELDAS),
+            ("BACKGROUND", (0, -1), (-1, -1), COLOR_TOTALES),
+            # Línea arriba de cada fila del bloque de precios
+            ("LINEABOVE", (inicio_precios, 1), (-1, -1), 1, colors.black),
+            ("LINEBEFORE", (segundo_signo, 0), (segundo_signo, -1), 1, colors.black),
+        ]
+        # Texto plano de los renglones (filas 1 a -2) y de la fila de totales
+        comandos_cuerpo = []
+        for i, definicion in enumerate(definiciones):
+            if definicion.get("texto_plano"):
+                comandos_cuerpo.extend(estilo_texto_plano(ESTILOS[definicion["estilo"]], (i, 1), (i, -2)))
+        comandos_total = estilo_texto_plano(estilo_total, (0, -1), (-1, -1))
+        comandos_total.append(("TEXTCOLOR", (0, -1), (-1, -1), estilo_total.textColor))
+
+        self.estilo = TableStyle(comandos + comandos_cuerpo + comandos_total)
+        # Sin renglones (sólo encabezado y totales) no hay filas de cuerpo
+        self.estilo_sin_renglones = TableStyle(comandos + comandos_total)
+
+    def fila(self, renglon):
+        # Valores de un renglón en el orden del plan; los faltantes, "-" (como fillna)
+        fila = []
+        for clave, constante in zip(self.claves, self.constantes):
+            if clave is None:
+                fila.append(constante)
+            else:
+                valor = renglon.get(clave)
+                fila.append("-" if valor is None else valor)
+        return fila
+
+    def fila_totales(self, total_precio_total):
+        return [total_precio_total if valor is TOTAL_LICITACION else valor for valor in self.totales]
+
+
+_planes = {}
+
+
+def plan_columnas(columnas):
+    # Plan compilado para un juego de columnas (los de la licitación, con o sin
+    # las agregadas); uno por diseño y clave de descripción
+    diseno = elegir_diseno(columnas)
+    columna_descripcion = clave_descripcion(columnas)
+    clave = (diseno["nombre"], columna_descripcion)
+    plan = _planes.get(clave)
+    if plan is None:
+        plan = _planes[clave] = PlanColumnas(diseno, columna_descripcion)
+    return plan
@@ -1,22 +1,31 @@
-import pandas as pd
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
 from reportlab.platypus import (
     Table,
     TableStyle,
     Paragraph,
-    Image,
     Spacer,
     BaseDocTemplate,
     PageTemplate,
     Frame,
 )
 from reportlab.lib.units import inch
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.colors import Color
 from io import BytesIO
 import os
-from reportlab.platypus import Image
+import sys
+import recursos
+from recursos import ImagenRecurso, obtener_encabezado, obtener_pie, obtener_firma
+import disenos_columnas
+from disenos_columnas import plan_columnas
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.cache_documentos import cache, version_de_archivos
+from comun import formato
+from comun.metricas import Metricas
+from comun import perfiles
+from comun import parrafos
+from comun.parrafos import cache_parrafos
 
 
 def generar_tablas_datos_cliente(data_cliente):
@@ -79,405 +88,183 @@ def generar_tablas_datos_cliente(data_cliente):
     return tabla
 
 
-def generar_tabla_demanda(data_renglones, total_precio_total):
-    # Definir estilos para Paragraph
-    styles = getSampleStyleSheet()
-
-    df = pd.DataFrame(data_renglones)
-    df = df.fillna("-")
-    # Obtener el índice de la última fila
-    ultima_fila_index = len(df)
-    # Crear listas con el signo de pesos, una por cada fila
-    col_signo_pesos = ["$"] * (len(df))
-
-    # Insertar las nuevas columnas en las posiciones deseadas
-    df.insert(5, "Col_signo", col_signo_pesos)
-    df.insert(7, "Col_signo2", col_signo_pesos)
-
-    # Crear un estilo de Paragraph para los encabezados
-    header_style = ParagraphStyle(
-        name="HeaderStyle",
-        parent=styles["Heading1"],
-        fontName="Helvetica-Bold",
-        fontSize=8,
-        alignment=1,
-        textColor="white",
-        # textColor="black",
-        leading=10,
-    )
-
-    data_style = ParagraphStyle(
-        name="BodyStyle",
-        parent=styles["BodyText"],
-        wordWrap="CJK",
-        fontSize=7,
-        leading=10,
-        alignment=1,
-    )
-
-    data_style_descripcion = ParagraphStyle(
-        name="BodyStyle",
-        parent=styles["BodyText"],
-        wordWrap="CJK",
-        fontSize=7,
-        leading=10,
-        alignment=0,
-    )
-
-    data_style_precio_u = ParagraphStyle(
-        name="BodyStyle",
-        parent=styles["BodyText"],
-        wordWrap="CJK",
-        fontSize=7,
-        leading=10,
-        alignment=2,
+class TablaDemanda(Table):
+    # Table que suma en las métricas cada corte de página que hace reportlab;
+    # las partes heredan las métricas para contar también sus propios cortes.
+    # Con capturar = True guarda en codigo los operadores PDF que genera al
+    # dibujarse (lo usa el modo incremental, ver oferta_incremental.py)
+    metricas = None
+    capturar = False
+    codigo = None
+    fuentes = None
+
+    def split(self, availWidth, availHeight):
+        partes = Table.split(self, availWidth, availHeight)
+        if self.metricas is not None:
+            if len(partes) > 1:
+                self.metricas.contar("cortes_tabla")
+            for parte in partes:
+                parte.metricas = self.metricas
+        return partes
+
+    def draw(self):
+        if not self.capturar:
+            return Table.draw(self)
+        registrar_fuentes_tabla(self.canv)
+        inicio = len(self.canv._code)
+        Table.draw(self)
+        self.codigo = self.canv._code[inicio:]
+        # Nombre interno (F1, F2...) de cada fuente que el código referencia
+        self.fuentes = dict(self.canv._doc.fontMapping)
+
+
+# Fuentes que puede usar la tabla de demanda. En el modo incremental se
+# registran en este orden antes de dibujar cada parte, así los nombres internos
+# quedan iguales en todos los documentos de la misma licitación
+FUENTES_TABLA = ("Helvetica", "Helvetica-Bold", "Helvetica-Oblique", "Helvetica-BoldOblique")
+
+
+def registrar_fuentes_tabla(canvas):
+    for fuente in FUENTES_TABLA:
+        canvas._doc.getInternalFontName(fuente)
+
+
+def columnas_demanda(data_renglones):
+    # Columnas presentes en al menos un renglón (equivale a las columnas del DataFrame)
+    columnas = set()
+    for renglon in data_renglones:
+        columnas.update(renglon.keys())
+    return columnas
+
+
+def generar_tabla_demanda(data_renglones, total_precio_total, columnas=None):
+    # columnas: las de toda la licitación cuando se arma la tabla de sólo
+    # algunos renglones, para que el juego de columnas no cambie. Orden,
+    # anchos, encabezado, estilos y celdas salen del plan compilado para ese
+    # juego de columnas (ver disenos_columnas.py)
+    plan = plan_columnas(columnas_demanda(data_renglones) if columnas is None else columnas)
+
+    # Filas como listas en el orden del plan, con la de totales al final
+    filas = [plan.fila(renglon) for renglon in data_renglones]
+    filas.append(plan.fila_totales(total_precio_total))
+
+    # Precios en formato argentino, columna por columna (comun/formato.py)
+    for indice in plan.indices_precio:
+        precios = formato.formatear_numeros([fila[indice] for fila in filas])
+        for fila, precio in zip(filas, precios):
+            fila[indice] = precio
+
+    celdas = plan.celdas
+    data_for_table = [list(plan.encabezado)]
+    data_for_table.extend(
+        [celda(valor) for celda, valor in zip(celdas, fila)] for fila in filas[:-1]
     )
+    data_for_table.append([celda(valor) for celda, valor in zip(plan.celdas_total, filas[-1])])
 
-    data_style_precio_total = ParagraphStyle(
-        name="BodyStyle",
-        parent=styles["BodyText"],
-        fontName="Helvetica-Bold",
-        wordWrap="CJK",
-        fontSize=7,
-        leading=14,
-        alignment=2,
-    )
+    table = TablaDemanda(data_for_table)
+    table._argW = list(plan.anchos)
+    table.setStyle(plan.estilo if data_renglones else plan.estilo_sin_renglones)
+    table.repeatRows = 1  # Repetir la primera fila en cada página
 
-    data_style_TOTAL = ParagraphStyle(
-        name="BodyStyle",
-        parent=styles["BodyText"],
-        fontName="Helvetica-Bold",
-        wordWrap="CJK",
-        fontSize=8,
-        textColor="white",
-        leading=14,
-        alignment=2,
-    )
+    return table
 
-    # Reordenar columnas
-    orden_deseado = []
-    col_widths = []
-    # Agregar una fila vacía al final
-
-    # Si existe 'descripcionTarot' pero no 'descripcion', se reemplaza
-    if "descripcionTarot" in df.columns and "descripcion" not in df.columns:
-        df["descripcion"] = df["descripcionTarot"]
-
-    df.loc[len(df)] = {
-        "renglon": "",
-        "cantidad": "",
-        "descripcion": "",
-        "ANMAT": "",
-        "laboratorio_elegido": "",
-        "Col_signo": "",
-        "precio_vta": " ",
-        "Col_signo2": "$",
-        "precio_vta_total": total_precio_total,
-        "nombre_comercial": "",
-        "observaciones": "",
-    }
-
-    # Definir los casos y columnas
-    casos_columnas = [
-        {
-            "condicion": lambda df: "observaciones" in df.columns
-            and "nombre_comercial" in df.columns,
-            "orden": [
-                "renglon",
-                "cantidad",
-                "descripcion",
-                "nombre_comercial",
-                "laboratorio_elegido",
-                "ANMAT",
-                "Col_signo",
-                "precio_vta",
-                "Col_signo2",
-                "precio_vta_total",
-                "observaciones",
-            ],
-            "anchos_base": [
-                0.4,
-                0.4,
-                1.4,
-                1.2,
-                0.9,
-                0.5,
-                0.1,
-                0.6,
-                0.1,
-                0.9,
-                1.3,
-            ],
-            "caso": "CASO 1",
-        },
-        {
-            "condicion": lambda df: "observaciones" in df.columns,
-            "orden": [
-                "renglon",
-                "cantidad",
-                "descripcion",
-                "laboratorio_elegido",
-                "ANMAT",
-                "Col_signo",
-                "precio_vta",
-                "Col_signo2",
-                "precio_vta_total",
-                "observaciones",
-            ],
-            "anchos_base": [
-                0.4,
-                0.4,
-                1.5,
-                0.9,
-                0.5,
-                0.1,
-                0.6,
-                0.1,
-                0.9,
-                1.4,
-            ],
-            "caso": "CASO 2",
-        },
-        {
-            "condicion": lambda df: "nombre_comercial" in df.columns,
-            "orden": [
-                "renglon",
-                "cantidad",
-                "descripcion",
-                "nombre_comercial",
-                "laboratorio_elegido",
-                "ANMAT",
-                "Col_signo",
-                "precio_vta",
-                "Col_signo2",
-                "precio_vta_total",
-            ],
-            "anchos_base": [
-                0.4,
-                0.4,
-                1.6,
-                1.5,
-                0.9,
-                0.5,
-                0.1,
-                0.6,
-                0.1,
-                0.9,
-            ],
-            "caso": "CASO 3",
-        },
-        {
-            "condicion": lambda df: True,
-            "orden": [
-                "renglon",
-                "cantidad",
-                "descripcion",
-                "laboratorio_elegido",
-                "ANMAT",
-                "Col_signo",
-                "precio_vta",
-                "Col_signo2",
-                "precio_vta_total",
-            ],
-            "anchos_base": [0.4, 0.4, 1.7, 0.9, 0.7, 0.1, 0.7, 0.1, 1.0],
-            "caso": "CASO 4",
-        },
-    ]
 
-    # Encontrar el caso correspondiente
-    for caso in casos_columnas:
-        if caso["condicion"](df):
-            # print(caso["caso"])
-
-            # Definir orden de columnas
-            orden_deseado = caso["orden"]
-
-            # Normalizar anchos para que sumen 8.0 * inch
-            suma_actual = sum(caso["anchos_base"])
-            factor = 8.0 / suma_actual
-            col_widths = [
-                round(ancho * factor, 2) * inch for ancho in caso["anchos_base"]
-            ]
-            break
-            # return orden_deseado, col_widths
-
-    # Si no entra en ningún caso (teóricamente imposible)
-    # raise ValueError("No se encontró un caso correspondiente.")
-
-    df = df[orden_deseado]
-
-    df = df.rename(
-        columns={
-            "renglon": "N° RENG.",
-            "cantidad": "CANT",
-            "descripcion": "DESCRIPCIÓN",
-            "laboratorio_elegido": "LABORATORIO",
-            "nombre_comercial": "NOMBRE COMERCIAL",
-            "observaciones": "OBSERVACIONES",
-        }
+# A partir de esta cantidad de renglones la tabla se entrega ya partida por página
+UMBRAL_TABLA_POR_PARTES = 300
+ALTO_SIN_LIMITE = 1e9
+
+
+# Parte la tabla de demanda en una tabla por página, con el encabezado repetido.
+# Es el mismo corte que hace reportlab al ir partiendo la tabla página a página,
+# pero sin su costo cuadrático (cada split vuelve a recorrer todas las filas y
+# estilos restantes): las alturas se calculan una sola vez y los cortes se hacen
+# dividiendo a la mitad, así que el resultado se ve igual
+def partir_tabla_por_pagina(tabla, ancho_disponible, alto_disponible):
+    alturas = medir_filas(tabla, ancho_disponible)
+    cortes = calcular_cortes(alturas, alto_disponible)
+    if cortes is None:
+        # Una fila que no entra sola en una página: que lo resuelva reportlab
+        return [tabla]
+    return dividir_tabla(tabla, cortes, ancho_disponible)
+
+
+def medir_filas(tabla, ancho_disponible):
+    # Alturas de todas las filas en una pasada (sin el corte de longTableOptimize,
+    # que suma las alturas acumuladas en cada fila)
+    tabla._longTableOptimize = 0
+    tabla._calc(ancho_disponible, ALTO_SIN_LIMITE)
+    tabla._longTableOptimize = 1
+    alturas = tabla._rowHeights
+    # Fijadas como alturas explícitas, los _calc siguientes no vuelven a medir celdas
+    tabla._argH = list(alturas)
+    return list(alturas)
+
+
+def calcular_cortes(alturas, alto_disponible):
+    # Primera fila de cada página a partir de la segunda (mismo criterio que
+    # Table._getFirstPossibleSplitRowPosition). La fila 0 es el encabezado, que
+    # se repite en cada página. None si una fila no entra sola en una página
+    cortes = []
+    alto_pagina = 0
+    for fila, alto_fila in enumerate(alturas):
+        if alto_pagina + alto_fila > alto_disponible:
+            inicio_pagina = cortes[-1] if cortes else 0
+            if fila <= inicio_pagina + 1:
+                return None
+            cortes.append(fila)
+            alto_pagina = alturas[0]
+        alto_pagina += alto_fila
+    return cortes
+
+
+def dividir_tabla(tabla, cortes, ancho_disponible):
+    def dividir(parte, cortes_parte):
+        if not cortes_parte:
+            return [parte]
+        medio = len(cortes_parte) // 2
+        corte = cortes_parte[medio]
+        parte._calc(ancho_disponible, ALTO_SIN_LIMITE)
+        alto_corte = sum(parte._rowHeights[:corte])
+        primera, segunda = parte._splitRows(alto_corte + 0.001)
+        # En la segunda parte la fila "corte" pasa a ser la 1 (la 0 es el encabezado)
+        cortes_segunda = [c - corte + 1 for c in cortes_parte[medio + 1:]]
+        return dividir(primera, cortes_parte[:medio]) + dividir(segunda, cortes_segunda)
+
+    return dividir(tabla, cortes)
+
+
+# Márgenes de la oferta y alto reservado arriba del frame para el encabezado fijo
+MARGENES_OFERTA = {
+    "left": 0.3 * inch,
+    "right": 0.3 * inch,
+    "top": 0.1 * inch,
+    "bottom": 0.5 * inch,
+}
+ALTO_ENCABEZADO_FIJO = 1.2 * inch
+
+
+def crear_frame_oferta():
+    # Área de contenido de cada página (mismo frame en todas)
+    ancho = letter[0] - MARGENES_OFERTA["left"] - MARGENES_OFERTA["right"]
+    alto = letter[1] - MARGENES_OFERTA["top"] - MARGENES_OFERTA["bottom"]
+    return Frame(
+        MARGENES_OFERTA["left"],
+        MARGENES_OFERTA["bottom"],
+        ancho,
+        alto - ALTO_ENCABEZADO_FIJO,
+        id="normal",
     )
 
-    indice_precio_vta = df.columns.get_loc("precio_vta")
-
-    # Convertir el DataFrame en una lista para la tabla con Paragraphs
-    header_paragraphs = [
-        [Paragraph(str(cell), header_style) for cell in df.columns.tolist()]
-    ]
-
-    def formatear_miles(valor):
-        try:
-            valor_float = float(valor)
-            # Primero formateamos en "estilo inglés": 15,200.00
-            valor_en = f"{valor_float:,.2f}"
-            # valor_en = "15,200.00"
-
-            # Reemplazo las comas por un símbolo temporal, por ejemplo "X"
-            paso1 = valor_en.replace(",", "X")
-            # paso1 = "15X200.00"
-
-            # Reemplazo el punto (.) por la coma (,)
-            paso2 = paso1.replace(".", ",")
-            # paso2 = "15X200,00"
-
-            # Finalmente, reemplazo la "X" por punto (.)
-            valor_final = paso2.replace("X", ".")
-            # valor_final = "15.200,00"
-
-            return valor_final
-        except (ValueError, TypeError):
-            if valor == "": return "-"
-            return str(valor)
-
-    df["precio_vta"] = df["precio_vta"].apply(formatear_miles)
-    df["precio_vta_total"] = df["precio_vta_total"].apply(formatear_miles)
-
-
-    # Aplicar estilos al DataFrame
-    data_paragraphs = [
-        [
-            Paragraph(
-                str(cell),
-                (
-                    data_style_TOTAL
-                    if (
-                        row_index
-                        == ultima_fila_index
-                        # and (i == 8 or i == 7)
-                    )  # Última fila, columna 6
-                    else (
-                        data_style_descripcion
-                        if i == 2
-                        else (
-                            data_style_precio_u
-                            if i == indice_precio_vta
-                            else (
-                                data_style_precio_total
-                                if i == (indice_precio_vta + 2)
-                                else data_style
-                            )
-                        )
-                    )
-                ),
-            )
-            for i, cell in enumerate(row)
-        ]
-        for row_index, row in enumerate(df.values.tolist())
-    ]
-
-    data_for_table = header_paragraphs + data_paragraphs
-
-    cantidad_columnas = len(df.columns)
-    table = Table(data_for_table)
-
-    # Establecer colspan para simular la fusión
-    table._cellvalues[0][indice_precio_vta - 1] = Paragraph(
-        "PRECIO VTA UNITARIO", header_style
-    )  # Contenido para la fusión
-    table._cellvalues[0][indice_precio_vta] = ""  # Dejar vacía
-    table._cellvalues[0][indice_precio_vta + 1] = Paragraph(
-        "PRECIO TOTAL", header_style
-    )  # Contenido para la fusión
-    table._cellvalues[0][indice_precio_vta + 2] = ""  # Dejar vacía
-
-    table._argW = col_widths
-
-    # Convertir los valores RGB a valores en el rango 0-1
-    color_encabezado = Color(17 / 255.0, 126 / 255.0, 191 / 255.0)
-    color_totales = Color(68 / 255.0, 114 / 255.0, 196 / 255.0)
-
-    padding_celdas = 1.5
-    estilos_de_tabla = [
-        # Estilo para la fila en blanco (primera fila)
-        # ("BACKGROUND", (0, 0), (-1, 0), colors.white),  # Fondo blanco (transparente)
-        # ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),  # Texto blanco (invisible)
-        # Configurar altura mínima para la primera fila (encabezado)
-        # ("ROWHEIGHT", (0, 0), (-1, 0), 150),  # Altura mínima de la primera fila
-        # HEADER
-        ("BACKGROUND", (0, 0), (-1, 0), color_encabezado),
-        # Un borde en la parte izquierda de todas las celdas
-        ("SPAN", (indice_precio_vta - 1, 0), (indice_precio_vta, 0)),
-        ("SPAN", (indice_precio_vta + 1, 0), (indice_precio_vta + 2, 0)),
-        (
-            "GRID",
-            (0, 0),
-            (-1, 0),
-            1.5,
-            colors.black,
-        ),  # Rejilla negra para toda la tabla
-        # CONTENT
-        (
-            "GRID",
-            (0, 1),
-            (indice_precio_vta - 2, -2),
-            1,
-            colors.black,
-        ),  # Rejilla negra para toda la tabla
-        (
-            "LINEAFTER",
-            (indice_precio_vta + 2, 1),
-            (indice_precio_vta + 2, -1),
-            1,
-            colors.black,
-        ),
-        ("BOX", (cantidad_columnas, 0), (-1, -1), 1, colors.black),
-        # TODOS
-        ("BOX", (0, 0), (-1, -1), 1.5, colors.black),
-        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-        ("LEFTPADDING", (0, 0), (-1, -1), padding_celdas),  # Sin padding a la izquierda
-        ("RIGHTPADDING", (0, 0), (-1, -1), padding_celdas),  # Sin padding a la derecha
-        ("TOPPADDING", (0, 0), (-1, -1), 2),  # Sin padding en la parte superior
-        (
-            "BOTTOMPADDING",
-            (0, 0),
-            (-1, -1),
-            padding_celdas,
-        ),  # Sin padding en la parte inferior
-        # FILA TOTAL
-        ("BACKGROUND", (0, -1), (-1, -1), color_totales),
-    ]
-
-    for i in range(1, len(df) + 1):
-        estilos_de_tabla.append(
-            ("LINEABOVE", (indice_precio_vta - 1, i), (-1, i), 1, colors.black)
-        )
 
-    estilos_de_tabla.append(
-        (
-            "LINEBEFORE",
-            (indice_precio_vta + 1, 0),
-            (indice_precio_vta + 1, -1),
-            1,
-            colors.black,
-        )
+def area_tabla_demanda(frame=None):
+    # (ancho, alto) disponibles para cada parte de la tabla de demanda
+    if frame is None:
+        frame = crear_frame_oferta()
+    return (
+        frame._width - frame._leftPadding - frame._rightPadding,
+        frame._height - frame._topPadding - frame._bottomPadding,
     )
 
-    # Estilizar la tabla
-    table_style = TableStyle(estilos_de_tabla)
-    table.setStyle(table_style)
-    table.repeatRows = 1  # Repetir la primera fila en cada página
-
-    return table
-
 
 def generar_tabla_entrega(data_entrega):
     tabla_data_entrega = [
@@ -532,20 +319,16 @@ def generar_tabla_entrega(data_entrega):
 
 def generar_lista_firmas_img(firmas_chequeadas):
     lista_imagenes = []
-    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    ruta_firmas = os.path.join(BASE_DIR, "imagenes", "firmas")
 
     for firma in firmas_chequeadas:
-        path_firma = os.path.join(ruta_firmas, f"{firma}.png")
+        recurso_firma = obtener_firma(firma)
 
-        if not os.path.exists(path_firma):
-            print(f"[ADVERTENCIA] No se encontró la firma: {path_firma}")
+        if recurso_firma is None:
+            # A stderr: stdout lleva el documento
+            print(f"[ADVERTENCIA] No se encontró la firma: {firma}", file=sys.stderr)
             continue  # O podrías poner una imagen por defecto
 
-        img_firma = Image(path_firma)
-        img_firma.drawHeight = 2 * inch
-        img_firma.drawWidth = 2 * inch
-        img_firma.hAlign = 0
+        img_firma = ImagenRecurso(recurso_firma, 2 * inch, 2 * inch, hAlign=0)
 
         lista_imagenes.append(img_firma)
 
@@ -599,47 +382,146 @@ def generar_lista_firmas_img(firmas_chequeadas):
     return lista_tablas
 
 
-def generar_PDF(
-    data_renglones, data_cliente, data_entrega, firmas_chequeadas, total_precio_total
-):
-    tabla_datos_cliente = generar_tablas_datos_cliente(data_cliente)
+_version_oferta = None
 
-    space_between_tables = Spacer(1, 0.25 * inch)  # Ajusta la altura según necesites
+# Los otros caminos de render de la oferta: guardan su PDF con la misma clave
+# de cache, así que su código entra en la versión (se importan desde acá sólo
+# cuando hacen falta, por eso van por nombre)
+MODULOS_OFERTA = ("oferta_incremental.py", "oferta_paralela.py", "vista_previa.py", "oferta_acotada.py")
 
-    tabla_demanda = generar_tabla_demanda(data_renglones, total_precio_total)
 
-    tabla_entrega = generar_tabla_entrega(data_entrega)
+def version_oferta():
+    # Código e imágenes que determinan el PDF; se calcula una vez por proceso
+    global _version_oferta
+    if _version_oferta is None:
+        carpeta = os.path.dirname(os.path.abspath(__file__))
+        _version_oferta = version_de_archivos([
+            __file__,
+            *(os.path.join(carpeta, modulo) for modulo in MODULOS_OFERTA),
+            recursos.__file__,
+            formato.__file__,
+            perfiles.__file__,
+            disenos_columnas.__file__,
+            parrafos.__file__,
+            recursos.IMG_ENCABEZADO,
+            recursos.IMG_PIE,
+            *recursos.FIRMAS_DISPONIBLES.values(),
+        ])
+    return _version_oferta
 
-    # BASE_DIR apunta a /generador_pdf/scripts
-    CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 
-    # Subir un nivel: ahora apunta a /generador_pdf
-    BASE_DIR = os.path.dirname(CURRENT_DIR)
+def generar_PDF(
+    data_renglones,
+    data_cliente,
+    data_entrega,
+    firmas_chequeadas,
+    total_precio_total,
+    tabla_por_partes=None,
+    metricas=None,
+    perfil=None,
+    incremental=False,
+    vista_previa=False,
+    paralelo=False,
+):
+    # El mismo pedido devuelve el PDF ya generado (ver comun/cache_documentos.py);
+    # tabla_por_partes e incremental no entran en la clave porque no cambian el
+    # resultado. metricas (comun/metricas.py) recibe los tiempos por fase y los
+    # conteos. perfil: "estandar" (None) o "compacto", ver comun/perfiles.py.
+    # incremental: rearma sólo las páginas que cambiaron desde el último pedido
+    # de la misma licitación (ver oferta_incremental.py).
+    # vista_previa: sólo la primera página, con la cantidad estimada de páginas
+    # en metricas ("paginas_estimadas"); no pasa por la cache (ver vista_previa.py)
+    # paralelo: la tabla de demanda se arma y dibuja en varios procesos, con el
+    # mismo resultado (ver oferta_paralela.py); no entra en la clave de la cache
+    # "parrafos_reusados": párrafos parseados o cortados que salieron de la
+    # cache del proceso (comun/parrafos.py)
+    if metricas is None:
+        metricas = Metricas("oferta")
+    perfil = perfiles.validar_perfil(perfil)
+    metricas.registrar("renglones", len(data_renglones or []))
+    metricas.registrar("perfil", perfil)
+    aciertos_parrafos = cache_parrafos.contadores["aciertos"]
+    datos = [data_renglones, data_cliente, data_entrega, firmas_chequeadas, total_precio_total]
+    if vista_previa:
+        from vista_previa import construir_vista_previa
+        buffer = construir_vista_previa(*datos, metricas=metricas, perfil=perfil)
+        metricas.registrar("bytes", buffer.getbuffer().nbytes)
+        metricas.registrar("parrafos_reusados", cache_parrafos.contadores["aciertos"] - aciertos_parrafos)
+        return buffer
+    with metricas.fase("cache"):
+        version = version_oferta()
+    if incremental:
+        from oferta_incremental import construir_PDF_incremental
+        construir, opciones = construir_PDF_incremental, {}
+    elif paralelo:
+        from oferta_paralela import construir_PDF_paralelo
+        construir, opciones = construir_PDF_paralelo, {}
+    else:
+        construir, opciones = construir_PDF, {"tabla_por_partes": tabla_por_partes}
+    contenido = cache.obtener(
+        "oferta",
+        version,
+        # El perfil estándar conserva las mismas claves que antes de existir perfiles
+        datos if perfil == perfiles.PERFIL_ESTANDAR else [*datos, perfil],
+        lambda: construir(
+            *datos, metricas=metricas, perfil=perfil, **opciones
+        ).getvalue(),
+        metricas=metricas,
+    )
+    metricas.registrar("bytes", len(contenido))
+    metricas.registrar("parrafos_reusados", cache_parrafos.contadores["aciertos"] - aciertos_parrafos)
+    return BytesIO(contenido)
+
+
+def construir_PDF(
+    data_renglones,
+    data_cliente,
+    data_entrega,
+    firmas_chequeadas,
+    total_precio_total,
+    tabla_por_partes=None,
+    metricas=None,
+    perfil=None,
+    tablas_demanda=None,
+    incluir_cierre=True,
+    destino=None,
+):
+    # tabla_por_partes: None decide según la cantidad de renglones.
+    # tablas_demanda: la tabla de demanda ya armada y partida por página (modo
+    # incremental, vista previa); en ese caso no se arma ni se parte acá.
+    # incluir_cierre=False deja afuera la tabla de entrega, el pie y las firmas.
+    # destino: archivo donde escribir el PDF en lugar de un BytesIO nuevo
+    if metricas is None:
+        metricas = Metricas("oferta")
+    dpi_imagenes = perfiles.dpi_imagenes(perfil)
 
-    # Ruta final correcta a la imagen
-    IMG_FOOTER_PATH = os.path.join(BASE_DIR, "imagenes", "Pie.png")
+    with metricas.fase("tablas"):
+        tabla_datos_cliente = generar_tablas_datos_cliente(data_cliente)
 
-    # Verificamos que exista
-    if not os.path.exists(IMG_FOOTER_PATH):
-        raise FileNotFoundError(f"No se encontró la imagen del pie: {IMG_FOOTER_PATH}")
+        space_between_tables = Spacer(1, 0.25 * inch)  # Ajusta la altura según necesites
 
-    # Usar imagen
-    img_footer = Image(IMG_FOOTER_PATH, width=..., height=...)
+        if tablas_demanda is None:
+            tabla_demanda = generar_tabla_demanda(data_renglones, total_precio_total)
+            tabla_demanda.metricas = metricas
+
+        if incluir_cierre:
+            tabla_entrega = generar_tabla_entrega(data_entrega)
+
+    # Imagen del pie desde el registro de recursos (decodificada una vez por proceso)
     # 1 / 3.268
-    img_footer.drawHeight = 2 * inch
-    img_footer.drawWidth = 6.5 * inch
-    img_footer.hAlign = 0
+    with metricas.fase("recursos"):
+        if incluir_cierre:
+            ancho_pie, alto_pie = recursos.TAMANO_PIE
+            img_footer = ImagenRecurso(
+                obtener_pie(dpi_imagenes), ancho_pie * inch, alto_pie * inch, hAlign=0
+            )
+        encabezado = obtener_encabezado(dpi_imagenes)
 
     # Configuración de los márgenes del documento
-    margins = {
-        "left": 0.3 * inch,
-        "right": 0.3 * inch,
-        "top": 0.1 * inch,
-        "bottom": 0.5 * inch,
-    }
+    margins = MARGENES_OFERTA
 
     # Crear un objeto BytesIO para guardar el PDF en memoria
-    buffer = BytesIO()
+    buffer = BytesIO() if destino is None else destino
 
     # Crear un documento PDF con márgenes personalizados en memoria
     doc = BaseDocTemplate(
@@ -649,6 +531,7 @@ def generar_PDF(
         rightMargin=margins["right"],
         topMargin=margins["top"],
         bottomMargin=margins["bottom"],
+        **perfiles.opciones_documento(perfil),
     )
 
     ##################################################
@@ -656,74 +539,73 @@ def generar_PDF(
     ##################################################
 
     # Definir el frame (área de contenido)
-    frame = Frame(
-        margins["left"],
-        margins["bottom"],
-        doc.width,
-        doc.height - 1.2 * inch,
-        id="normal",
-    )
+    frame = crear_frame_oferta()
 
     # Crear el PageTemplate con el encabezado personalizado
     template = PageTemplate(
         id="custom",
         frames=[frame],
         onPage=lambda canvas, doc: agregar_encabezadoYfooter(
-            canvas, doc, tabla_datos_cliente
+            canvas, doc, tabla_datos_cliente, encabezado
         ),
     )
     doc.addPageTemplates([template])
 
-    elements = [
-        tabla_demanda,
-        space_between_tables,
-        tabla_entrega,
-        img_footer,
-    ]
-
-    if len(firmas_chequeadas) > 0:
-        lista_firmas_img = generar_lista_firmas_img(firmas_chequeadas)
+    if tabla_por_partes is None:
+        tabla_por_partes = len(data_renglones) >= UMBRAL_TABLA_POR_PARTES
+
+    if tablas_demanda is not None:
+        metricas.contar("cortes_tabla", len(tablas_demanda) - 1)
+    elif tabla_por_partes:
+        with metricas.fase("particion"):
+            tablas_demanda = partir_tabla_por_pagina(tabla_demanda, *area_tabla_demanda(frame))
+        metricas.contar("cortes_tabla", len(tablas_demanda) - 1)
+    else:
+        tablas_demanda = [tabla_demanda]
+
+    elements = list(tablas_demanda)
+    if incluir_cierre:
+        elements.extend([space_between_tables, tabla_entrega, img_footer])
+
+    if incluir_cierre and len(firmas_chequeadas) > 0:
+        with metricas.fase("tablas"):
+            lista_firmas_img = generar_lista_firmas_img(firmas_chequeadas)
         elements.extend(lista_firmas_img)
 
     # Construir el PDF
-    doc.build(elements)
+    metricas.contar("cortes_tabla", 0)  # presente aunque la tabla entre en una página
+    with metricas.fase("build"):
+        doc.build(elements)
+    metricas.registrar("paginas", doc.page)
 
     buffer.seek(0)
 
     return buffer
 
 
-def agregar_encabezadoYfooter(canvas, doc, tabla_datos_cliente):
-    canvas.saveState()
-
-    # Imagen de encabezado
-    # BASE_DIR apunta a /generador_pdf/scripts
-    CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
-
-    # Subir un nivel: ahora apunta a /generador_pdf
-    BASE_DIR = os.path.dirname(CURRENT_DIR)
-
-    # Ruta final correcta a la imagen
-    IMG_HEADER = os.path.join(BASE_DIR, "imagenes", "Encabezado.png")
-
-    # Verificamos que exista
-    if not os.path.exists(IMG_HEADER):
-        raise FileNotFoundError(f"No se encontró la imagen del pie: {IMG_HEADER}")
+# Nombre del form XObject con el encabezado y pie fijos de cada oferta
+NOMBRE_FORM_ENCABEZADO_PIE = "EncabezadoPieOferta"
 
-    # Usar imagen
-    img_header = Image(IMG_HEADER, width=..., height=...)
 
-    img_header.drawHeight = 1 * inch
-    img_header.drawWidth = 3.38 * inch
+def dibujar_encabezadoYfooter_fijo(canvas, doc, tabla_datos_cliente, encabezado=None):
+    # Imagen de encabezado: mismo XObject en todas las páginas
+    ancho_encabezado = recursos.TAMANO_ENCABEZADO[0] * inch
+    alto_encabezado = recursos.TAMANO_ENCABEZADO[1] * inch
     # 3.38 ---- 1
 
-    img_header.drawOn(
-        canvas, doc.leftMargin, doc.pagesize[1] - doc.topMargin - img_header.drawHeight
+    if encabezado is None:
+        encabezado = obtener_encabezado()
+    encabezado.dibujar(
+        canvas,
+        doc.leftMargin,
+        doc.pagesize[1] - doc.topMargin - alto_encabezado,
+        ancho_encabezado,
+        alto_encabezado,
     )
 
     # Posición inicial para la tabla de datos
     y_position = (
-        doc.pagesize[1] - doc.topMargin - img_header.drawHeight
+        doc.pagesize[1] - doc.topMargin - alto_encabezado
     )  # Ajusta el espacio según el diseño
 
     # Dibujar tabla de datos del cliente
@@ -731,22 +613,37 @@ def agregar_encabezadoYfooter(canvas, doc, tabla_datos_cliente):
         tabla_datos_cliente.wrapOn(canvas, doc.width, doc.height)
         tabla_datos_cliente.drawOn(canvas, doc.leftMargin + 3.8 * inch, y_position)
 
-    # Pie de página: "FOOTER" en el centro y número de página a la derecha
-    footer_y_position = 0.5 * inch  # Altura del pie de página desde la parte inferior
+    # Pie de página: "FOOTER" en el centro
     canvas.setFont("Helvetica", 8)
 
     # Texto "FOOTER" en el centro del pie de página
     canvas.drawString(
         doc.pagesize[0] / 2 - 15,  # Centro del documento
-        footer_y_position,
+        ALTURA_PIE,
         "OFERTA ENVIADA POR MACROPHARMA S.A.",
     )
 
+
+ALTURA_PIE = 0.5 * inch  # Altura del pie de página desde la parte inferior
+
+
+def agregar_encabezadoYfooter(canvas, doc, tabla_datos_cliente, encabezado=None):
+    canvas.saveState()
+
+    # Lo único que cambia entre páginas es el número: el resto se dibuja una sola
+    # vez por documento en un form XObject y cada página lo referencia
+    if not canvas.hasForm(NOMBRE_FORM_ENCABEZADO_PIE):
+        canvas.beginForm(NOMBRE_FORM_ENCABEZADO_PIE)
+        dibujar_encabezadoYfooter_fijo(canvas, doc, tabla_datos_cliente, encabezado)
+        canvas.endForm()
+    canvas.doForm(NOMBRE_FORM_ENCABEZADO_PIE)
+
     # Número de página en la esquina inferior derecha
+    canvas.setFont("Helvetica", 8)
     page_number_text = f"Página {doc.page}"
     canvas.drawRightString(
         doc.pagesize[0] - doc.rightMargin,  # Alineación a la derecha
-        footer_y_position,
+        ALTURA_PIE,
         page_number_text,
     )
 
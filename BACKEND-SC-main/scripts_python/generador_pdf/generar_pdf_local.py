@@ -1,16 +1,47 @@
 import sys
 import io
+import os
 import json
-import base64
 from generador_pdf import generar_PDF # este es tu script existente con toda la lógica
+from oferta_acotada import modo_memoria_acotada, leer_pedido, generar_PDF_acotado
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.salida import escribir_documento, escribir_documento_archivo, escribir_error
+from comun.metricas import Metricas
 
 # 🔧 Leer correctamente stdin como UTF-8
 sys.stdin = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
 
 
+def generar_con_memoria_acotada(metricas):
+    # --memoria-acotada: renglones leídos de a uno y PDF en un archivo temporal
+    # que se envía por partes (ver oferta_acotada.py)
+    with metricas.fase("lectura_json"):
+        data, renglones = leer_pedido(sys.stdin)
+    try:
+        if not data.get("data_cliente") or not renglones:
+            raise ValueError("Faltan datos obligatorios para generar el PDF")
+
+        archivo = generar_PDF_acotado(
+            renglones, data.get("data_cliente"), data.get("data_entrega"),
+            data.get("firmas_chequeadas"), data.get("total_licitacion"),
+            metricas=metricas, perfil=data.get("perfil"),
+        )
+        with archivo:
+            escribir_documento_archivo(archivo, "documento.pdf", "application/pdf", metricas)
+    finally:
+        renglones.cerrar()
+
+
 def main():
     try:
-        data = json.load(sys.stdin)
+        metricas = Metricas("oferta")
+        if modo_memoria_acotada():
+            generar_con_memoria_acotada(metricas)
+            return
+
+        with metricas.fase("lectura_json"):
+            data = json.load(sys.stdin)
         
         data_value = data.get("data_renglones")
         data_cliente = data.get("data_cliente")
@@ -21,19 +52,19 @@ def main():
         if not data_cliente or not data_value:
             raise ValueError("Faltan datos obligatorios para generar el PDF")
 
-        buffer = generar_PDF(data_value, data_cliente, data_entrega, firmas_chequeadas, total)
-
-        # Convertir PDF a base64
-        encoded_pdf = base64.b64encode(buffer.read()).decode("utf-8")
+        buffer = generar_PDF(
+            data_value, data_cliente, data_entrega, firmas_chequeadas, total,
+            metricas=metricas, perfil=data.get("perfil"),
+            incremental=bool(data.get("incremental")),
+            vista_previa=bool(data.get("vista_previa")),
+            paralelo=bool(data.get("paralelo")),
+        )
 
-        print(json.dumps({
-            "fileName": "documento.pdf",
-            "contentBase64": encoded_pdf
-        }))
+        # JSON con base64 por defecto, trama binaria con --binario
+        escribir_documento(buffer, "documento.pdf", "application/pdf", metricas)
 
     except Exception as e:
-        print(json.dumps({ "error": str(e) }), file=sys.stderr)
-        sys.exit(1)
+        escribir_error(e)
 
 if __name__ == "__main__":
     main()
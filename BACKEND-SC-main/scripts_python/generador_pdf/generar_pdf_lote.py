@@ -0,0 +1,77 @@
+import sys
+import io
+import os
+import json
+from generador_pdf import generar_PDF
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.salida import modo_binario, escribir_error
+from comun.metricas import Metricas
+from comun import lotes
+
+# Genera las ofertas de varias licitaciones en una sola llamada.
+#
+# Entrada (stdin): {"licitaciones": [{data_renglones, data_cliente, data_entrega,
+#                   firmas_chequeadas, total_licitacion, nombre_archivo?, perfil?,
+#                   incremental?}, ...]}
+#
+# Salida (stdout binario), a medida que termina cada PDF:
+#   - por defecto un zip con un PDF por licitación y un errores.json si alguna falló
+#   - con --binario una secuencia de tramas (ver comun/salida.py); cada encabezado
+#     lleva "index", "metrics" y, si esa licitación falló, "error" con size 0
+#
+# Por cada licitación generada se emite una línea de métricas en stderr.
+#
+# Un error en una licitación no corta el lote.
+
+CANTIDAD_WORKERS = int(os.getenv("WORKERS_LOTE_PDF", os.cpu_count() or 1))
+
+
+def nombre_archivo_licitacion(indice, licitacion):
+    return lotes.nombre_pdf(indice, licitacion, "oferta", "data_cliente", "nroLic")
+
+
+def generar_pdf_licitacion(indice, licitacion):
+    if not isinstance(licitacion, dict):
+        raise ValueError(f"Licitación {indice + 1}: no es un objeto")
+    data_value = licitacion.get("data_renglones")
+    data_cliente = licitacion.get("data_cliente")
+
+    if not data_cliente or not data_value:
+        raise ValueError("Faltan datos obligatorios para generar el PDF")
+
+    metricas = Metricas("oferta")
+    buffer = generar_PDF(
+        data_value,
+        data_cliente,
+        licitacion.get("data_entrega"),
+        licitacion.get("firmas_chequeadas") or [],
+        licitacion.get("total_licitacion"),
+        metricas=metricas,
+        perfil=licitacion.get("perfil"),
+        incremental=bool(licitacion.get("incremental")),
+    )
+    return buffer.getvalue(), metricas.como_dict()
+
+
+def main():
+    try:
+        sys.stdin = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+        data = json.load(sys.stdin)
+        licitaciones = data.get("licitaciones") if isinstance(data, dict) else data
+
+        if not licitaciones:
+            raise ValueError("No se recibieron licitaciones para generar")
+
+        resultados = lotes.generar_lote(licitaciones, generar_pdf_licitacion, CANTIDAD_WORKERS)
+        if modo_binario():
+            lotes.escribir_tramas(sys.stdout.buffer, licitaciones, resultados, nombre_archivo_licitacion)
+        else:
+            lotes.escribir_zip(sys.stdout.buffer, licitaciones, resultados, nombre_archivo_licitacion)
+
+    except Exception as e:
+        escribir_error(e)
+
+
+if __name__ == "__main__":
+    main()
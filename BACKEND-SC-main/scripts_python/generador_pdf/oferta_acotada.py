@@ -0,0 +1,204 @@
+import os
+import sys
+import tempfile
+from itertools import islice
+from reportlab.platypus import Flowable
+
+from generador_pdf import (
+    area_tabla_demanda,
+    calcular_cortes,
+    construir_PDF,
+    dividir_tabla,
+    generar_tabla_demanda,
+    medir_filas,
+)
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun import perfiles
+from comun.entrada_json import LectorJSON, RenglonesEnDisco
+from comun.metricas import Metricas
+
+# Modo de memoria acotada de la oferta, para licitaciones muy grandes
+# (py generar_pdf_local.py --binario --memoria-acotada).
+#
+# - Los renglones se leen de stdin de a uno (comun/entrada_json.py) y se
+#   guardan en un archivo temporal; el resto del JSON es chico y se lee entero.
+# - La tabla de demanda se arma de a RENGLONES_POR_BLOQUE renglones mientras
+#   el documento la va ubicando (TablaDemandaDiferida): nunca están armadas a
+#   la vez las celdas de toda la tabla, que es lo que más memoria ocupa.
+# - El PDF se escribe en un SpooledTemporaryFile (pasa a disco después de
+#   UMBRAL_SALIDA_EN_MEMORIA) y se envía por partes (comun/salida.py).
+#
+# Las páginas quedan iguales a las de generar_PDF: los cortes se calculan con
+# las mismas alturas de fila y el mismo alto por página. No pasa por la cache
+# de documentos ni por el modo incremental, que necesitan el PDF en memoria.
+
+FLAG_MEMORIA_ACOTADA = "--memoria-acotada"
+
+RENGLONES_POR_BLOQUE = 400
+UMBRAL_SALIDA_EN_MEMORIA = 16 * 1024 * 1024
+
+
+def modo_memoria_acotada(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    return FLAG_MEMORIA_ACOTADA in argv
+
+
+def leer_pedido(entrada):
+    # (campos del pedido sin data_renglones, RenglonesEnDisco)
+    campos = {}
+    renglones = RenglonesEnDisco()
+    try:
+        for clave, valor in LectorJSON(entrada).recorrer_objeto(listas=("data_renglones",)):
+            if clave != "data_renglones":
+                campos[clave] = valor
+                continue
+            for renglon in valor:
+                if not isinstance(renglon, dict):
+                    raise ValueError("Cada renglón de data_renglones debe ser un objeto")
+                renglones.agregar(renglon)
+    except Exception:
+        renglones.cerrar()
+        raise
+    return campos, renglones
+
+
+class TablaDemandaDiferida(Flowable):
+    # La tabla de demanda partida por página, armada de a bloques a medida que
+    # el documento la ubica: cada split entrega la página siguiente y se
+    # devuelve a sí misma con lo que falta. Los renglones del final de un
+    # bloque que no completan una página pasan al bloque siguiente.
+    #
+    # Cada bloque después del primero empieza con el último renglón de la
+    # página anterior, que se corta y se descarta: así su primera página es,
+    # como en la tabla completa, la continuación de una tabla partida (con el
+    # encabezado repetido dibujado igual)
+    def __init__(self, renglones, total_precio_total, metricas=None, renglones_por_bloque=RENGLONES_POR_BLOQUE):
+        Flowable.__init__(self)
+        self.columnas = set(renglones.claves)
+        self.total_precio_total = total_precio_total
+        self.metricas = metricas
+        self.renglones_por_bloque = renglones_por_bloque
+        self.fuente = iter(renglones)
+        self.agotada = False
+        self.arrastre = []
+        self.previo = None
+        self.paginas = []
+        self.terminada = False
+        self.ubicadas = 0
+        self.ancho, self.alto = area_tabla_demanda()
+
+    def tomar(self, cantidad):
+        renglones = list(islice(self.fuente, cantidad))
+        if len(renglones) < cantidad:
+            self.agotada = True
+        return renglones
+
+    def armar_bloque(self):
+        renglones = self.arrastre
+        self.arrastre = []
+        # Filas de la tabla antes de los renglones del bloque: encabezado y,
+        # si hay, el renglón previo que se descarta
+        desde = 1 if self.previo is None else 2
+        while True:
+            if not self.agotada:
+                renglones.extend(self.tomar(self.renglones_por_bloque))
+            filas = renglones if self.previo is None else [self.previo] + renglones
+            # La fila de totales sólo queda en la última página del último bloque
+            tabla = generar_tabla_demanda(filas, self.total_precio_total, columnas=self.columnas)
+            tabla.metricas = self.metricas
+            alturas = medir_filas(tabla, self.ancho)
+            # Cortes contados sin el renglón previo (fila 1 = primer renglón del bloque)
+            cortes = calcular_cortes(alturas[:1] + alturas[desde:], self.alto)
+            if self.metricas is not None:
+                self.metricas.contar("bloques_tabla")
+
+            def partir(cortes_bloque):
+                # Partes de la tabla desde el primer renglón del bloque
+                corte_previo = [] if self.previo is None else [2]
+                partes = dividir_tabla(
+                    tabla, corte_previo + [corte + desde - 1 for corte in cortes_bloque], self.ancho
+                )
+                return partes[desde - 1:]
+
+            # cortes None: un renglón no entra solo en una página. Como en
+            # generar_PDF, la tabla pasa entera a reportlab, que no la puede
+            # ubicar y corta el armado con LayoutError
+            if self.agotada:
+                self.terminada = True
+                self.paginas = partir(cortes or [])
+                return
+            if cortes is None:
+                self.paginas = partir([len(alturas) - desde])[:1]
+                self.previo = None
+                return
+            if cortes:
+                self.paginas = partir(cortes)[:-1]
+                self.arrastre = renglones[cortes[-1] - 1:]
+                self.previo = renglones[cortes[-1] - 2]
+                return
+            # Todo el bloque entra en una página: se le suman más renglones
+
+    def wrap(self, availWidth, availHeight):
+        # Nunca entra entera: el documento la ubica de a una página con split
+        return availWidth, availHeight + 1
+
+    def split(self, availWidth, availHeight):
+        if not self.paginas:
+            self.armar_bloque()
+        pagina = self.paginas[0]
+        alto = pagina.wrap(availWidth, availHeight)[1]
+        if availHeight < alto <= self.alto:
+            # No entra en lo que queda de esta página: va en la siguiente
+            return []
+        self.paginas.pop(0)
+        # reportlab marca como postergado lo que no entró en una página y, si
+        # vuelve a no entrar, lo da por demasiado grande; acá cada split ubica
+        # una página, así que la marca se saca
+        self.__dict__.pop("_postponed", None)
+        if self.ubicadas and self.metricas is not None:
+            self.metricas.contar("cortes_tabla")
+        self.ubicadas += 1
+        if self.paginas or not self.terminada:
+            return [pagina, self]
+        return [pagina]
+
+
+def generar_PDF_acotado(
+    renglones,
+    data_cliente,
+    data_entrega,
+    firmas_chequeadas,
+    total_precio_total,
+    metricas=None,
+    perfil=None,
+):
+    # Como generar_PDF con los renglones de leer_pedido; devuelve el PDF en un
+    # archivo temporal ya rebobinado, que hay que cerrar
+    if metricas is None:
+        metricas = Metricas("oferta")
+    perfil = perfiles.validar_perfil(perfil)
+    metricas.registrar("renglones", len(renglones))
+    metricas.registrar("perfil", perfil)
+    metricas.registrar("memoria_acotada", True)
+
+    salida = tempfile.SpooledTemporaryFile(max_size=UMBRAL_SALIDA_EN_MEMORIA)
+    try:
+        construir_PDF(
+            renglones,
+            data_cliente,
+            data_entrega,
+            firmas_chequeadas,
+            total_precio_total,
+            metricas=metricas,
+            perfil=perfil,
+            tablas_demanda=[TablaDemandaDiferida(renglones, total_precio_total, metricas)],
+            destino=salida,
+        )
+    except Exception:
+        salida.close()
+        raise
+    salida.seek(0, os.SEEK_END)
+    metricas.registrar("bytes", salida.tell())
+    salida.seek(0)
+    return salida
@@ -0,0 +1,249 @@
+import os
+import sys
+import json
+import zlib
+import hashlib
+from reportlab.platypus import Flowable
+
+from generador_pdf import (
+    TablaDemanda,
+    area_tabla_demanda,
+    calcular_cortes,
+    columnas_demanda,
+    construir_PDF,
+    dividir_tabla,
+    generar_tabla_demanda,
+    medir_filas,
+    registrar_fuentes_tabla,
+    version_oferta,
+)
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.cache_documentos import CacheDocumentos, serializar_canonico, version_de_archivos
+from comun.metricas import Metricas
+
+# Modo incremental de la oferta: cuando se vuelve a generar la misma licitación
+# con pocos renglones cambiados (ej: un precio corregido) sólo se rearman las
+# páginas de la tabla de demanda que tienen esos renglones.
+#
+# Por cada licitación (misma tabla de datos del cliente) se guarda en disco:
+#   - la huella de cada renglón, la altura de cada fila y los cortes de página
+#   - los operadores PDF de cada página de la tabla (menos la última), tal como
+#     los dibujó reportlab
+#
+# En el pedido siguiente se arman sólo las páginas con renglones cambiados (y
+# siempre la última, que lleva el total), se vuelven a calcular los cortes con
+# las alturas nuevas y, si la paginación quedó igual, las demás páginas se
+# copian de lo guardado. Si cambió la cantidad de renglones, el juego de
+# columnas o algún corte de página, se genera todo el documento de nuevo.
+# Encabezado, pie, tabla de entrega y firmas se dibujan siempre.
+#
+# Variables de entorno:
+#   CACHE_INCREMENTAL      "0" para desactivarlo (cada pedido se genera completo)
+#   CACHE_INCREMENTAL_DIR  carpeta (por defecto scripts_python/.cache_incremental)
+#   CACHE_INCREMENTAL_MB   tamaño máximo en MB (por defecto 256)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+estados = CacheDocumentos(
+    carpeta=os.getenv("CACHE_INCREMENTAL_DIR", os.path.join(BASE_DIR, ".cache_incremental")),
+    tamano_maximo=int(float(os.getenv("CACHE_INCREMENTAL_MB", "256")) * 1024 * 1024),
+    activa=os.getenv("CACHE_INCREMENTAL", "1") != "0",
+)
+
+VERSION_INCREMENTAL = version_de_archivos([__file__])
+
+
+class EstadoInvalido(Exception):
+    # Una página guardada no se puede copiar en este documento
+    pass
+
+
+class PaginaGuardada(Flowable):
+    # Una parte de la tabla de demanda ya dibujada en un documento anterior:
+    # ocupa el mismo lugar y agrega los mismos operadores PDF
+    def __init__(self, pagina):
+        Flowable.__init__(self)
+        self.width = pagina["ancho"]
+        self.height = pagina["alto"]
+        self.codigo = pagina["codigo"]
+        self.fuentes = pagina["fuentes"]
+        self.hAlign = "CENTER"
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        registrar_fuentes_tabla(self.canv)
+        documento = self.canv._doc
+        for fuente, nombre_interno in self.fuentes.items():
+            if documento.getInternalFontName(fuente) != nombre_interno:
+                raise EstadoInvalido(f"La fuente {fuente} no es {nombre_interno} en este documento")
+        self.canv._code.extend(self.codigo)
+
+
+def huella_renglon(renglon):
+    return hashlib.sha256(serializar_canonico(renglon)).hexdigest()[:16]
+
+
+def clave_licitacion(data_cliente):
+    return estados.clave("oferta_incremental", version_oferta() + VERSION_INCREMENTAL, data_cliente)
+
+
+def leer_estado(clave):
+    contenido = estados.leer(clave)
+    if contenido is None:
+        return None
+    try:
+        return json.loads(zlib.decompress(contenido))
+    except (zlib.error, ValueError):
+        return None
+
+
+def guardar_estado(clave, estado):
+    estados.guardar(clave, zlib.compress(json.dumps(estado, separators=(",", ":")).encode("utf-8")))
+
+
+def rango_parte(cortes, cantidad_filas, parte):
+    # Filas de la tabla completa (0 encabezado, 1..n renglones, n + 1 total) de una parte
+    inicio = 1 if parte == 0 else cortes[parte - 1]
+    fin = cortes[parte] if parte < len(cortes) else cantidad_filas
+    return inicio, fin
+
+
+def partes_completas(data_renglones, total_precio_total, huellas, metricas):
+    # Toda la tabla partida por página, capturando todas las páginas menos la
+    # última. Sin estado si no hay páginas para reusar
+    ancho, alto = area_tabla_demanda()
+    with metricas.fase("tablas"):
+        tabla = generar_tabla_demanda(data_renglones, total_precio_total)
+        tabla.metricas = metricas
+    with metricas.fase("particion"):
+        alturas = medir_filas(tabla, ancho)
+        cortes = calcular_cortes(alturas, alto)
+        if not cortes:
+            # Entra en una página o tiene una fila más alta que la página (la
+            # corta reportlab al armar el documento)
+            return [tabla], None
+        partes = dividir_tabla(tabla, cortes, ancho)
+    for parte in partes[:-1]:
+        parte.capturar = True
+    estado = {
+        "columnas": sorted(columnas_demanda(data_renglones)),
+        "filas": huellas,
+        "alturas": alturas,
+        "cortes": cortes,
+        "paginas": [None] * len(cortes),
+    }
+    return partes, estado
+
+
+def partes_cambiadas(estado, data_renglones, total_precio_total, huellas, metricas):
+    # Rearma sólo las páginas con renglones cambiados; None si la paginación
+    # no se puede mantener
+    columnas = columnas_demanda(data_renglones)
+    if estado["columnas"] != sorted(columnas) or len(estado["filas"]) != len(huellas):
+        return None, None
+
+    ancho, alto = area_tabla_demanda()
+    cortes = estado["cortes"]
+    alturas = list(estado["alturas"])
+    cantidad_partes = len(cortes) + 1
+    filas_cambiadas = {
+        indice + 1
+        for indice, (anterior, nueva) in enumerate(zip(estado["filas"], huellas))
+        if anterior != nueva
+    }
+
+    # Armado y medición de las páginas cambiadas
+    tablas = {}
+    with metricas.fase("tablas"):
+        for parte in range(cantidad_partes):
+            inicio, fin = rango_parte(cortes, len(alturas), parte)
+            ultima = parte == cantidad_partes - 1
+            guardada = None if ultima else estado["paginas"][parte]
+            if guardada is not None and filas_cambiadas.isdisjoint(range(inicio, fin)):
+                continue
+            # La fila de totales de la última parte la agrega generar_tabla_demanda
+            renglones_parte = data_renglones[inicio - 1:fin - 1]
+            tabla = generar_tabla_demanda(renglones_parte, total_precio_total, columnas=columnas)
+            alturas_parte = medir_filas(tabla, ancho)
+            if alturas_parte[0] != alturas[0]:
+                return None, None
+            alturas[inicio:fin] = alturas_parte[1:] if ultima else alturas_parte[1:-1]
+            tablas[parte] = tabla
+
+        if calcular_cortes(alturas, alto) != cortes:
+            return None, None
+
+        partes = []
+        for parte in range(cantidad_partes):
+            tabla = tablas.get(parte)
+            if tabla is None:
+                partes.append(PaginaGuardada(estado["paginas"][parte]))
+            elif parte == cantidad_partes - 1:
+                partes.append(tabla)
+            else:
+                # Sin la fila de totales, que queda en la segunda mitad
+                primera = dividir_tabla(tabla, [len(tabla._argH) - 1], ancho)[0]
+                primera.capturar = True
+                partes.append(primera)
+
+    nuevo_estado = dict(estado, filas=huellas, alturas=alturas, paginas=list(estado["paginas"]))
+    return partes, nuevo_estado
+
+
+def construir_PDF_incremental(
+    data_renglones,
+    data_cliente,
+    data_entrega,
+    firmas_chequeadas,
+    total_precio_total,
+    metricas=None,
+    perfil=None,
+):
+    # Mismos argumentos y mismo resultado visual que construir_PDF
+    if metricas is None:
+        metricas = Metricas("oferta")
+    datos = [data_renglones, data_cliente, data_entrega, firmas_chequeadas, total_precio_total]
+    clave = clave_licitacion(data_cliente)
+    huellas = [huella_renglon(renglon) for renglon in data_renglones]
+
+    partes = None
+    estado = leer_estado(clave)
+    if estado is not None:
+        partes, nuevo_estado = partes_cambiadas(
+            estado, data_renglones, total_precio_total, huellas, metricas
+        )
+    if partes is not None:
+        try:
+            buffer = construir_PDF(*datos, metricas=metricas, perfil=perfil, tablas_demanda=partes)
+            modo = "parcial"
+        except EstadoInvalido:
+            partes = None
+
+    if partes is None:
+        partes, nuevo_estado = partes_completas(data_renglones, total_precio_total, huellas, metricas)
+        if nuevo_estado is None:
+            metricas.registrar("incremental", "no_aplica")
+            return construir_PDF(*datos, metricas=metricas, perfil=perfil, tablas_demanda=partes)
+        buffer = construir_PDF(*datos, metricas=metricas, perfil=perfil, tablas_demanda=partes)
+        modo = "completo"
+
+    reusadas = 0
+    for indice, parte in enumerate(partes[:-1]):
+        if isinstance(parte, PaginaGuardada):
+            reusadas += 1
+        elif isinstance(parte, TablaDemanda) and parte.codigo is not None:
+            nuevo_estado["paginas"][indice] = {
+                "ancho": parte._width,
+                "alto": parte._height,
+                "codigo": parte.codigo,
+                "fuentes": parte.fuentes,
+            }
+    with metricas.fase("cache"):
+        guardar_estado(clave, nuevo_estado)
+
+    metricas.registrar("incremental", modo)
+    metricas.registrar("paginas_reusadas", reusadas)
+    return buffer
@@ -0,0 +1,188 @@
+import os
+import sys
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from reportlab.pdfgen.canvas import Canvas
+
+from generador_pdf import (
+    area_tabla_demanda,
+    calcular_cortes,
+    columnas_demanda,
+    construir_PDF,
+    dividir_tabla,
+    generar_tabla_demanda,
+    medir_filas,
+    registrar_fuentes_tabla,
+)
+from oferta_incremental import EstadoInvalido, PaginaGuardada, rango_parte
+from recursos import obtener_encabezado, obtener_pie
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun import perfiles
+from comun.metricas import Metricas
+
+# Modo paralelo de la oferta: la tabla de demanda de una licitación grande se
+# arma y se dibuja en varios procesos.
+#
+# 1. Medición: cada proceso arma la tabla de un tramo de renglones y mide sus
+#    filas. Con todas las alturas se calculan los cortes de página, los mismos
+#    que en generar_PDF.
+# 2. Dibujo: las páginas se reparten en tramos contiguos, uno por proceso. Cada
+#    proceso arma y parte la tabla de sus páginas y guarda los operadores PDF
+#    que genera al dibujarlas (como el modo incremental, ver
+#    oferta_incremental.py). Cada tramo después del primero empieza con el
+#    último renglón de la página anterior, que se corta y se descarta, como en
+#    oferta_acotada.py: su primera página queda igual que en la tabla completa.
+# 3. Unión: el documento se arma en este proceso con esas páginas ya dibujadas.
+#    Encabezado, pie, "Página N", tabla de entrega y firmas se dibujan acá, así
+#    que la numeración sigue siendo continua y el encabezado fijo es un solo
+#    XObject para todo el PDF.
+#
+# Las páginas quedan iguales a las de generar_PDF. Con pocos renglones o un solo
+# proceso se genera como siempre.
+#
+# Variables de entorno:
+#   WORKERS_OFERTA_PARALELA  procesos (por defecto la cantidad de CPU)
+
+CANTIDAD_WORKERS = int(os.getenv("WORKERS_OFERTA_PARALELA", os.cpu_count() or 1))
+
+# Con menos renglones el arranque de los procesos cuesta más de lo que ahorra
+UMBRAL_RENGLONES_PARALELO = 1000
+
+
+def medir_tramo(renglones, total_precio_total, columnas):
+    # Alturas de las filas de un tramo: encabezado, renglones y totales
+    tabla = generar_tabla_demanda(renglones, total_precio_total, columnas=columnas)
+    return medir_filas(tabla, area_tabla_demanda()[0])
+
+
+def capturar_pagina(tabla, canvas, ancho, alto):
+    # Dibuja una parte de la tabla en un canvas descartable y devuelve lo que
+    # necesita PaginaGuardada para repetirla en otro documento
+    tabla.capturar = True
+    tabla.wrapOn(canvas, ancho, alto)
+    tabla.drawOn(canvas, 0, 0)
+    return {
+        "ancho": tabla._width,
+        "alto": tabla._height,
+        "codigo": tabla.codigo,
+        "fuentes": tabla.fuentes,
+    }
+
+
+def dibujar_tramo(renglones, previo, cortes, ultimo, total_precio_total, columnas):
+    # Páginas de un tramo. cortes: primera fila de cada página después de la
+    # primera, contando desde la fila 1 = primer renglón del tramo. previo: el
+    # renglón anterior al tramo (None en el primero). Fuera del último tramo la
+    # fila de totales se corta y se descarta
+    ancho, alto = area_tabla_demanda()
+    filas = renglones if previo is None else [previo] + renglones
+    tabla = generar_tabla_demanda(filas, total_precio_total, columnas=columnas)
+    alturas = medir_filas(tabla, ancho)
+    desde = 1 if previo is None else 2
+    cortes_tabla = [] if previo is None else [2]
+    cortes_tabla.extend(corte + desde - 1 for corte in cortes)
+    if not ultimo:
+        cortes_tabla.append(len(alturas) - 1)
+    partes = dividir_tabla(tabla, cortes_tabla, ancho)
+    partes = partes[desde - 1:] if ultimo else partes[desde - 1:-1]
+
+    canvas = Canvas(BytesIO())
+    registrar_fuentes_tabla(canvas)
+    return [capturar_pagina(parte, canvas, ancho, alto) for parte in partes]
+
+
+def repartir(cantidad, partes):
+    # [(inicio, fin)] de partes contiguas y parejas de range(cantidad)
+    return [(cantidad * parte // partes, cantidad * (parte + 1) // partes) for parte in range(partes)]
+
+
+def construir_PDF_paralelo(
+    data_renglones,
+    data_cliente,
+    data_entrega,
+    firmas_chequeadas,
+    total_precio_total,
+    metricas=None,
+    perfil=None,
+    procesos=None,
+):
+    # Mismos argumentos y mismo resultado visual que construir_PDF
+    if metricas is None:
+        metricas = Metricas("oferta")
+    procesos = procesos or CANTIDAD_WORKERS
+    datos = [data_renglones, data_cliente, data_entrega, firmas_chequeadas, total_precio_total]
+    if procesos < 2 or len(data_renglones) < UMBRAL_RENGLONES_PARALELO:
+        metricas.registrar("paralelo", "no_aplica")
+        return construir_PDF(*datos, metricas=metricas, perfil=perfil)
+
+    columnas = columnas_demanda(data_renglones)
+    alto = area_tabla_demanda()[1]
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        with metricas.fase("tablas"):
+            tramos = repartir(len(data_renglones), procesos)
+            mediciones = list(pool.map(
+                medir_tramo,
+                [data_renglones[inicio:fin] for inicio, fin in tramos],
+                [total_precio_total] * len(tramos),
+                [columnas] * len(tramos),
+            ))
+            # Encabezado y totales son iguales en todos los tramos
+            alturas = mediciones[0][:1]
+            for medicion in mediciones:
+                alturas.extend(medicion[1:-1])
+            alturas.append(mediciones[-1][-1])
+
+        with metricas.fase("particion"):
+            cortes = calcular_cortes(alturas, alto)
+        if not cortes:
+            # Entra en una página o tiene una fila más alta que la página
+            metricas.registrar("paralelo", "no_aplica")
+            return construir_PDF(*datos, metricas=metricas, perfil=perfil)
+
+        with metricas.fase("tablas"):
+            # Tramos de páginas: filas desde la primera de su primera página
+            # hasta la anterior a la primera del tramo siguiente
+            tramos = repartir(len(cortes) + 1, min(procesos, len(cortes) + 1))
+            argumentos = []
+            for primera, siguiente in tramos:
+                inicio = rango_parte(cortes, len(alturas), primera)[0]
+                fin = rango_parte(cortes, len(alturas), siguiente - 1)[1]
+                argumentos.append((
+                    data_renglones[inicio - 1:fin - 1],
+                    data_renglones[inicio - 2] if inicio > 1 else None,
+                    [corte - inicio + 1 for corte in cortes[primera:siguiente - 1]],
+                    siguiente == len(cortes) + 1,
+                ))
+            resultados = pool.map(
+                dibujar_tramo,
+                *zip(*argumentos),
+                [total_precio_total] * len(argumentos),
+                [columnas] * len(argumentos),
+            )
+
+        # Mientras los procesos dibujan se decodifican las imágenes que
+        # construir_PDF va a usar (quedan cargadas en este proceso)
+        with metricas.fase("recursos"):
+            dpi_imagenes = perfiles.dpi_imagenes(perfil)
+            obtener_encabezado(dpi_imagenes)
+            obtener_pie(dpi_imagenes)
+
+        with metricas.fase("tablas"):
+            paginas = [pagina for paginas_tramo in resultados for pagina in paginas_tramo]
+
+    metricas.registrar("procesos", procesos)
+    metricas.registrar("tramos_paralelos", len(argumentos))
+    try:
+        buffer = construir_PDF(
+            *datos,
+            metricas=metricas,
+            perfil=perfil,
+            tablas_demanda=[PaginaGuardada(pagina) for pagina in paginas],
+        )
+    except EstadoInvalido:
+        # Las fuentes del documento no quedaron como en los procesos
+        metricas.registrar("paralelo", "no_aplica")
+        return construir_PDF(*datos, metricas=metricas, perfil=perfil)
+    metricas.registrar("paralelo", "si")
+    return buffer
@@ -0,0 +1,227 @@
+import os
+import sys
+import copy
+import hashlib
+import tempfile
+from PIL import Image
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfdoc
+from reportlab.platypus import Flowable
+
+# Registro de imágenes del oferta (encabezado, pie y firmas).
+#
+# Cada imagen se lee y decodifica una sola vez por proceso: el PDFImageXObject
+# (datos comprimidos + máscara alfa) se arma la primera vez que se pide y queda
+# en memoria. Al dibujar se registra en el documento bajo un nombre derivado
+# del contenido del archivo, así que cada imagen se embebe una sola vez por
+# documento, todas las páginas referencian el mismo XObject y dos archivos con
+# los mismos bytes (ej: una firma copiada con otro nombre) comparten uno.
+#
+# Las firmas se embeben desde una versión preparada: reescalada a DPI_FIRMAS
+# para el tamaño con que se dibujan (2 x 2 pulgadas) y guardada en
+# CARPETA_IMAGENES_PREPARADAS con el mtime del original en el nombre. Si el PNG
+# original cambia se prepara de nuevo; las que ya tienen esa resolución o menos
+# se usan tal cual. Con dpi, obtener_encabezado / obtener_pie hacen lo mismo
+# (perfil de salida compacto, ver comun/perfiles.py).
+#
+#   py generador_pdf/recursos.py     # prepara todas las firmas por adelantado
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUTA_IMAGENES = os.path.join(BASE_DIR, "imagenes")
+RUTA_FIRMAS = os.path.join(RUTA_IMAGENES, "firmas")
+
+IMG_ENCABEZADO = os.path.join(RUTA_IMAGENES, "Encabezado.png")
+IMG_PIE = os.path.join(RUTA_IMAGENES, "Pie.png")
+
+# Tamaño con que se dibuja cada imagen en la oferta (ancho, alto en pulgadas)
+TAMANO_ENCABEZADO = (3.38, 1)
+TAMANO_PIE = (6.5, 2)
+TAMANO_FIRMA = (2, 2)
+
+# Resolución objetivo de las firmas
+DPI_FIRMAS = 150
+CARPETA_IMAGENES_PREPARADAS = os.getenv(
+    "CACHE_IMAGENES_DIR", os.path.join(BASE_DIR, ".cache_imagenes")
+)
+
+
+def indexar_firmas(ruta_firmas=RUTA_FIRMAS):
+    # { "DIEGO ZALAZAR": ".../firmas/DIEGO ZALAZAR.png", ... }
+    firmas = {}
+    if not os.path.isdir(ruta_firmas):
+        return firmas
+    for entrada in os.scandir(ruta_firmas):
+        nombre, extension = os.path.splitext(entrada.name)
+        if entrada.is_file() and extension.lower() == ".png":
+            firmas[nombre] = entrada.path
+    return firmas
+
+
+# Se indexan al importar: un pedido de firma no vuelve a tocar el disco para saber si existe
+FIRMAS_DISPONIBLES = indexar_firmas()
+
+
+class RecursoImagen:
+    def __init__(self, ruta, huella):
+        self.ruta = ruta
+        # Nombre estable del XObject dentro de cada PDF: huella del contenido
+        self.nombre = "Recurso_" + huella
+
+        reader = ImageReader(ruta)
+        self.ancho, self.alto = reader.getSize()
+        self.xobject = pdfdoc.PDFImageXObject(self.nombre, reader, mask="auto")
+        self.smask = getattr(self.xobject, "_smask", None)
+        if self.smask is not None:
+            del self.xobject._smask
+
+    def registrar(self, canvas):
+        documento = canvas._doc
+        nombre_registro = documento.getXObjectName(self.nombre)
+        if documento.idToObject.get(nombre_registro) is None:
+            xobject = copy.copy(self.xobject)
+            documento.Reference(xobject, nombre_registro)
+            documento.addForm(self.nombre, xobject)
+            if self.smask is not None:
+                nombre_smask = documento.getXObjectName(self.smask.name)
+                if documento.idToObject.get(nombre_smask) is None:
+                    xobject.smask = documento.Reference(copy.copy(self.smask), nombre_smask)
+                else:
+                    xobject.smask = pdfdoc.PDFObjectReference(nombre_smask)
+        return nombre_registro
+
+    def dibujar(self, canvas, x, y, ancho, alto):
+        nombre_registro = self.registrar(canvas)
+        canvas._currentPageHasImages = 1
+        canvas.saveState()
+        canvas.translate(x, y)
+        canvas.scale(ancho, alto)
+        canvas._code.append("/%s Do" % nombre_registro)
+        canvas.restoreState()
+        canvas._formsinuse.append(self.nombre)
+
+
+class ImagenRecurso(Flowable):
+    # Equivalente a platypus.Image pero dibujando desde el registro
+    _fixedWidth = 1
+    _fixedHeight = 1
+
+    def __init__(self, recurso, ancho, alto, hAlign="CENTER"):
+        Flowable.__init__(self)
+        self.recurso = recurso
+        self.drawWidth = ancho
+        self.drawHeight = alto
+        self.hAlign = hAlign
+
+    def wrap(self, availWidth, availHeight):
+        return self.drawWidth, self.drawHeight
+
+    def draw(self):
+        self.recurso.dibujar(self.canv, 0, 0, self.drawWidth, self.drawHeight)
+
+
+# Por ruta y por huella del contenido: dos rutas con los mismos bytes dan el mismo recurso
+_recursos = {}
+_recursos_por_huella = {}
+
+
+def obtener_recurso(ruta):
+    recurso = _recursos.get(ruta)
+    if recurso is None:
+        if not os.path.exists(ruta):
+            raise FileNotFoundError(f"No se encontró la imagen: {ruta}")
+        with open(ruta, "rb") as archivo:
+            huella = hashlib.sha256(archivo.read()).hexdigest()[:16]
+        recurso = _recursos_por_huella.get(huella)
+        if recurso is None:
+            recurso = RecursoImagen(ruta, huella)
+            _recursos_por_huella[huella] = recurso
+        _recursos[ruta] = recurso
+    return recurso
+
+
+def obtener_encabezado(dpi=None):
+    # dpi None: el PNG original; si no, reescalado para TAMANO_ENCABEZADO
+    if dpi is None:
+        return obtener_recurso(IMG_ENCABEZADO)
+    return obtener_recurso(preparar_imagen(IMG_ENCABEZADO, TAMANO_ENCABEZADO, dpi))
+
+
+def obtener_pie(dpi=None):
+    if dpi is None:
+        return obtener_recurso(IMG_PIE)
+    return obtener_recurso(preparar_imagen(IMG_PIE, TAMANO_PIE, dpi))
+
+
+def ruta_imagen_preparada(ruta, tamano_maximo):
+    nombre = os.path.splitext(os.path.basename(ruta))[0]
+    mtime = os.stat(ruta).st_mtime_ns
+    ancho, alto = tamano_maximo
+    return os.path.join(CARPETA_IMAGENES_PREPARADAS, f"{nombre}_{ancho}x{alto}_{mtime}.png")
+
+
+def preparar_imagen(ruta, tamano_dibujo, dpi):
+    # Devuelve la ruta a embeber: la versión reescalada (creándola si hace falta)
+    # o el original si ya no supera la resolución objetivo.
+    # tamano_dibujo es (ancho, alto) en pulgadas
+    maximo = (round(tamano_dibujo[0] * dpi), round(tamano_dibujo[1] * dpi))
+    with Image.open(ruta) as imagen:
+        ancho, alto = imagen.size
+        # La imagen se estira al tamaño de dibujo, así que cada eje se limita por separado
+        nuevo_tamano = (min(ancho, maximo[0]), min(alto, maximo[1]))
+        if nuevo_tamano == (ancho, alto):
+            return ruta
+
+        destino = ruta_imagen_preparada(ruta, maximo)
+        if os.path.exists(destino):
+            return destino
+
+        imagen = imagen.convert("RGBA")
+        # Se reescala con alfa premultiplicado para no oscurecer los bordes del trazo
+        reducida = imagen.convert("RGBa").resize(nuevo_tamano, Image.LANCZOS).convert("RGBA")
+
+    try:
+        os.makedirs(CARPETA_IMAGENES_PREPARADAS, exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=CARPETA_IMAGENES_PREPARADAS, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as archivo:
+                reducida.save(archivo, format="PNG", optimize=True, dpi=(dpi, dpi))
+            os.chmod(temporal, 0o644)
+            os.replace(temporal, destino)
+        except OSError:
+            os.remove(temporal)
+            raise
+    except OSError as e:
+        # Sin carpeta escribible se embebe el original
+        print(f"[ADVERTENCIA] No se pudo guardar la imagen preparada {destino}: {e}", file=sys.stderr)
+        return ruta
+
+    borrar_preparadas_anteriores(destino)
+    return destino
+
+
+def borrar_preparadas_anteriores(destino):
+    # Versiones de la misma imagen y tamaño preparadas a partir de un original anterior
+    prefijo = os.path.basename(destino).rsplit("_", 1)[0] + "_"
+    for entrada in os.scandir(CARPETA_IMAGENES_PREPARADAS):
+        if entrada.name.startswith(prefijo) and entrada.path != destino:
+            try:
+                os.remove(entrada.path)
+            except OSError:
+                pass
+
+
+def preparar_firma(ruta, dpi=DPI_FIRMAS):
+    return preparar_imagen(ruta, TAMANO_FIRMA, dpi)
+
+
+def obtener_firma(nombre):
+    ruta = FIRMAS_DISPONIBLES.get(nombre)
+    if ruta is None:
+        return None
+    return obtener_recurso(preparar_firma(ruta))
+
+
+if __name__ == "__main__":
+    for nombre, ruta in sorted(FIRMAS_DISPONIBLES.items()):
+        preparada = preparar_firma(ruta)
+        print(f"{nombre}: {os.path.getsize(ruta)} B -> {os.path.getsize(preparada)} B ({preparada})")
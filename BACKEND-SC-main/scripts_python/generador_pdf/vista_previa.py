@@ -0,0 +1,230 @@
+import os
+import sys
+import math
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import getFont
+
+import recursos
+from generador_pdf import (
+    area_tabla_demanda,
+    calcular_cortes,
+    columnas_demanda,
+    construir_PDF,
+    dividir_tabla,
+    generar_tabla_demanda,
+    generar_tabla_entrega,
+    medir_filas,
+)
+from disenos_columnas import plan_columnas
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.metricas import Metricas
+
+# Vista previa de la oferta: sólo la primera página (encabezado, datos del
+# cliente y los renglones que entran en ella, con el juego de columnas de toda
+# la licitación) y una estimación de la cantidad total de páginas, para
+# mostrar algo enseguida mientras el documento completo se genera aparte.
+#
+# El alto de cada renglón se estima por el largo de sus textos (las celdas
+# cortan por carácter, wordWrap CJK) con el ancho promedio de carácter de los
+# primeros renglones. Con esa estimación se eligen los renglones que podrían
+# entrar en la primera página y sólo con ellos se arma y mide la tabla. Las
+# alturas reales de esos renglones corrigen la estimación del resto, que se
+# usa para contar las páginas sin armar sus celdas.
+#
+#   buffer = generar_PDF(..., vista_previa=True, metricas=metricas)
+#   metricas.valores["paginas_estimadas"]
+
+# Mismos valores que los estilos de disenos_columnas.py: fuente del cuerpo,
+# interlineado y padding de las celdas
+FUENTE_CUERPO = "Helvetica"
+TAMANO_FUENTE_CUERPO = 7
+INTERLINEADO_CUERPO = 10
+PADDING_HORIZONTAL = 2 * 1.5
+PADDING_VERTICAL = 2 + 1.5
+ALTO_MINIMO_FILA = INTERLINEADO_CUERPO + PADDING_VERTICAL
+
+# Columnas con texto libre, que pueden ocupar varias líneas
+COLUMNAS_TEXTO = ("descripcion", "nombre_comercial", "laboratorio_elegido", "observaciones")
+
+# Renglones con que se mide el ancho promedio de carácter
+RENGLONES_CALIBRACION = 20
+# Con más renglones que esto después de la primera página, las líneas se
+# estiman sobre una muestra pareja de ellos
+RENGLONES_ESTIMACION = 2000
+# Margen sobre la estimación al elegir los renglones de la primera página
+MARGEN_MUESTRA = 1.25
+
+# Lo que va después de la tabla de demanda (ver construir_PDF)
+ALTO_ESPACIO_ENTREGA = 0.25 * inch
+FIRMAS_POR_FILA = 3
+PADDING_TABLA_FIRMAS = 3 + 3
+
+
+def columnas_de_texto(columnas):
+    # [(clave del renglón, ancho útil de la celda)] de las columnas de texto libre
+    plan = plan_columnas(columnas)
+    return [
+        (clave, ancho - PADDING_HORIZONTAL)
+        for columna, clave, ancho in zip(plan.orden, plan.claves, plan.anchos)
+        if columna in COLUMNAS_TEXTO
+    ]
+
+
+def ancho_texto(texto, anchos_fuente):
+    # Como stringWidth para una fuente estándar (codificación WinAnsi), sumando
+    # directamente la tabla de anchos de la fuente
+    codigos = texto.encode("cp1252", "replace")
+    return sum(map(anchos_fuente.__getitem__, codigos)) * TAMANO_FUENTE_CUERPO / 1000
+
+
+def proporciones_por_columna(renglones, columnas):
+    # [(clave, líneas por carácter)]: ancho promedio de carácter sobre ancho útil
+    anchos_fuente = getFont(FUENTE_CUERPO).widths
+    proporciones = []
+    for clave, ancho_util in columnas:
+        textos = [str(renglon.get(clave) or "") for renglon in renglones]
+        caracteres = sum(map(len, textos))
+        ancho = sum(ancho_texto(texto, anchos_fuente) for texto in textos)
+        proporcion = ancho / caracteres if caracteres else TAMANO_FUENTE_CUERPO / 2
+        proporciones.append((clave, proporcion / ancho_util))
+    return proporciones
+
+
+def estimar_lineas(renglones, proporciones):
+    # Líneas que ocupa el texto más largo de cada renglón
+    cantidades = []
+    for renglon in renglones:
+        lineas = 1
+        for clave, proporcion in proporciones:
+            valor = renglon.get(clave)
+            if valor:
+                lineas = max(lineas, math.ceil(len(str(valor)) * proporcion))
+        cantidades.append(lineas)
+    return cantidades
+
+
+def estimar_lineas_resto(renglones, proporciones):
+    # Como estimar_lineas; con muchos renglones se estima uno de cada "paso" y
+    # ese valor se usa para los siguientes
+    if len(renglones) <= RENGLONES_ESTIMACION:
+        return estimar_lineas(renglones, proporciones)
+    paso = math.ceil(len(renglones) / RENGLONES_ESTIMACION)
+    cantidades = estimar_lineas(renglones[::paso], proporciones)
+    return [lineas for lineas in cantidades for _ in range(paso)][:len(renglones)]
+
+
+def alturas_de_lineas(cantidades, factor=1.0):
+    # factor corrige el alto del texto con lo medido en la primera página
+    alto_linea = INTERLINEADO_CUERPO * factor
+    return [lineas * alto_linea + PADDING_VERTICAL for lineas in cantidades]
+
+
+def renglones_por_pagina(alto_disponible):
+    # Cota de los renglones que pueden entrar en una página (todos de una línea)
+    return int(alto_disponible // ALTO_MINIMO_FILA) + 1
+
+
+def renglones_primera_pagina(alturas, alto_disponible):
+    # Renglones que entran en alto_disponible * MARGEN_MUESTRA, más uno
+    acumulado = 0
+    for cantidad, alto in enumerate(alturas, 1):
+        acumulado += alto
+        if acumulado > alto_disponible * MARGEN_MUESTRA:
+            return cantidad
+    return len(alturas)
+
+
+def alturas_cierre(data_entrega, firmas_chequeadas, ancho_disponible):
+    # Espacio, tabla de entrega, imagen del pie y una fila por cada tres firmas
+    alturas = [ALTO_ESPACIO_ENTREGA]
+    if data_entrega:
+        alturas.append(generar_tabla_entrega(data_entrega).wrap(ancho_disponible, 1e9)[1])
+    alturas.append(recursos.TAMANO_PIE[1] * inch)
+    firmas = [firma for firma in firmas_chequeadas or [] if firma in recursos.FIRMAS_DISPONIBLES]
+    filas_firmas = math.ceil(len(firmas) / FIRMAS_POR_FILA)
+    alturas.extend([recursos.TAMANO_FIRMA[1] * inch + PADDING_TABLA_FIRMAS] * filas_firmas)
+    return alturas
+
+
+def estimar_paginas(alturas, alto_disponible, cierre):
+    # Mismo corte que la tabla partida por página; después, lo que no entra en
+    # lo que queda de la última página pasa a la siguiente
+    cortes = calcular_cortes(alturas, alto_disponible) or []
+    paginas = len(cortes) + 1
+    alto_ultima = (alturas[0] if cortes else 0) + sum(alturas[cortes[-1] if cortes else 0:])
+    restante = alto_disponible - alto_ultima
+    for alto in cierre:
+        if alto > restante:
+            paginas += 1
+            restante = alto_disponible
+        restante -= alto
+    return paginas
+
+
+def construir_vista_previa(
+    data_renglones,
+    data_cliente,
+    data_entrega,
+    firmas_chequeadas,
+    total_precio_total,
+    metricas=None,
+    perfil=None,
+):
+    if metricas is None:
+        metricas = Metricas("oferta")
+    ancho, alto = area_tabla_demanda()
+    columnas = columnas_demanda(data_renglones)
+
+    with metricas.fase("tablas"):
+        proporciones = proporciones_por_columna(
+            data_renglones[:RENGLONES_CALIBRACION], columnas_de_texto(columnas)
+        )
+        lineas = estimar_lineas(data_renglones[:renglones_por_pagina(alto)], proporciones)
+        cantidad = renglones_primera_pagina(alturas_de_lineas(lineas), alto)
+        while True:
+            muestra = data_renglones[:cantidad]
+            tabla = generar_tabla_demanda(muestra, total_precio_total, columnas=columnas)
+            alturas = medir_filas(tabla, ancho)
+            cortes = calcular_cortes(alturas, alto)
+            if cortes != [] or cantidad == len(data_renglones):
+                break
+            # La estimación se quedó corta: todavía no hay corte de página
+            cantidad = min(cantidad * 2, len(data_renglones))
+
+    with metricas.fase("particion"):
+        if cortes:
+            primera_pagina = dividir_tabla(tabla, cortes[:1], ancho)[0]
+        elif cortes is None:
+            # Un renglón más alto que la página: el primer pedazo que corta reportlab
+            primera_pagina = (tabla.split(ancho, alto) or [tabla])[0]
+        else:
+            primera_pagina = tabla
+
+        # Alturas reales de la muestra (sin su fila de totales) y estimadas del
+        # resto, corregidas por lo que se desvió la estimación en la muestra
+        reales = alturas[1:-1]
+        texto_real = sum(reales) - PADDING_VERTICAL * len(reales)
+        texto_estimado = sum(estimar_lineas(muestra, proporciones)) * INTERLINEADO_CUERPO
+        factor = texto_real / texto_estimado if texto_estimado > 0 else 1.0
+        resto = alturas_de_lineas(
+            estimar_lineas_resto(data_renglones[cantidad:], proporciones), factor
+        )
+        paginas = estimar_paginas(
+            alturas[:-1] + resto + alturas[-1:],
+            alto,
+            alturas_cierre(data_entrega, firmas_chequeadas, ancho),
+        )
+
+    metricas.registrar("paginas_estimadas", paginas)
+    return construir_PDF(
+        data_renglones,
+        data_cliente,
+        data_entrega,
+        firmas_chequeadas,
+        total_precio_total,
+        metricas=metricas,
+        perfil=perfil,
+        tablas_demanda=[primera_pagina],
+        incluir_cierre=False,
+    )
@@ -1,5 +1,10 @@
+import os
+import sys
 import pandas as pd
 import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.formato import formatear_fechas, formatear_numeros
 #from generar_pdf_demanda import generar_PDF
     
 def analizar_excel(data_productos, data_cliente, data_entrega):
@@ -136,8 +141,7 @@ def leer_excel(df):
     #df['CANTIDAD'] = df['CANTIDAD'].astype(str)
     
      # Convertir la columna 'FECHA APERTURA' a datetime y luego formatear
-    df['FECHA APERTURA'] = pd.to_datetime(df['FECHA APERTURA'])
-    df['FECHA APERTURA'] = df['FECHA APERTURA'].dt.strftime('%d/%m/%Y')
+    df['FECHA APERTURA'] = formatear_fechas(df['FECHA APERTURA'])
     
     # Reemplazar NaN en 'PRECIO VTA UNITARIO' con 0
     df['PRECIO VTA UNITARIO'] = pd.to_numeric(df['PRECIO VTA UNITARIO'], errors='coerce')
@@ -148,6 +152,9 @@ def leer_excel(df):
     df['PRECIO TOTAL'] = df['PRECIO TOTAL'].fillna(0)
     df['PRECIO TOTAL'] = df['PRECIO TOTAL'].astype(str)
     
+    # Precio con coma decimal para Tarot, con todos los decimales de la planilla
+    precios_vta = formatear_numeros(df['PRECIO VTA UNITARIO'], decimales=None)
+    
     datos_renglon = []
     productos_no_asociados_a_tarot = []
     
@@ -168,7 +175,7 @@ def leer_excel(df):
         laboratorio = df.loc[fila_leida, 'LABORATORIO']
         if laboratorio=='nan':
             laboratorio = ''
-        precio_vta = str(df.loc[fila_leida, 'PRECIO VTA UNITARIO']).replace('.',',')
+        precio_vta = precios_vta.loc[fila_leida]
         
         if str(descripcion) != 'nan':
             if str(renglon) != '<NA>':
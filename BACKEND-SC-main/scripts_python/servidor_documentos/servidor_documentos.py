@@ -0,0 +1,341 @@
+import os
+import sys
+import io
+import json
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from flask import Flask, request, send_file, jsonify
+
+# Las carpetas de los generadores no son paquetes: se agregan al path para
+# importar los mismos módulos que usan los scripts de línea de comandos
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+for carpeta in ("generador_pdf", "generador_excel", "generador_parte_entregas"):
+    ruta_carpeta = os.path.join(BASE_DIR, carpeta)
+    if ruta_carpeta not in sys.path:
+        sys.path.append(ruta_carpeta)
+
+# Se importan una sola vez por proceso: pandas, reportlab y openpyxl quedan
+# cargados tanto en el servidor como en cada worker del pool
+from generador_pdf import generar_PDF
+from generador_parte import generar_parte_entregas_pdf
+from generador_excel import generar_excel
+from comun.cache_documentos import cache
+from comun.metricas import Metricas, emitir_linea
+from comun.trabajos import cola, TERMINADO
+
+HOST = os.getenv("HOST_SERVICIO_DOCUMENTOS", "127.0.0.1")
+PUERTO = int(os.getenv("PUERTO_SERVICIO_DOCUMENTOS", "5000"))
+CANTIDAD_WORKERS = int(os.getenv("WORKERS_SERVICIO_DOCUMENTOS", os.cpu_count() or 1))
+# Cada cuánto se revisa la cola de trabajos sin pedidos nuevos (y se purgan los vencidos)
+INTERVALO_COLA = float(os.getenv("INTERVALO_COLA_TRABAJOS", "1"))
+
+MIMETYPE_PDF = "application/pdf"
+MIMETYPE_EXCEL = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+app = Flask(__name__)
+pool = None
+
+# Aciertos y fallos de cache de los pedidos atendidos por este servidor (los
+# contadores de comun/cache_documentos.py viven en cada worker)
+aciertos_cache = {"hits": 0, "misses": 0}
+lock_aciertos_cache = threading.Lock()
+
+# Se marca al encolar un trabajo para que un despachador lo tome sin esperar
+# el próximo intervalo
+hay_trabajos = threading.Event()
+
+
+# ==== TAREAS (se ejecutan dentro de los workers) ====
+
+# Cada tarea devuelve (bytes, acierto de cache, bloque de métricas)
+
+def tarea_pdf(data, metricas=None):
+    metricas = metricas or Metricas("oferta")
+    buffer = generar_PDF(
+        data.get("data_renglones"),
+        data.get("data_cliente"),
+        data.get("data_entrega"),
+        data.get("firmas_chequeadas"),
+        data.get("total_licitacion"),
+        metricas=metricas,
+        perfil=data.get("perfil"),
+        incremental=bool(data.get("incremental")),
+        vista_previa=bool(data.get("vista_previa")),
+        paralelo=bool(data.get("paralelo")),
+    )
+    return buffer.getvalue(), cache.ultimo_acierto, metricas.como_dict()
+
+
+def tarea_excel(data, metricas=None):
+    metricas = metricas or Metricas("excel")
+    output = generar_excel(data.get("data_renglones", []), data.get("headers", {}), metricas)
+    return output.getvalue(), cache.ultimo_acierto, metricas.como_dict()
+
+
+def tarea_parte(data, metricas=None):
+    metricas = metricas or Metricas("parte_entregas")
+    buffer = generar_parte_entregas_pdf(
+        data.get("json_data"), data.get("entregas"), metricas, perfil=data.get("perfil")
+    )
+    return buffer.getvalue(), cache.ultimo_acierto, metricas.como_dict()
+
+
+# Tipos de trabajo de la cola: tarea, documento de las métricas, validación de
+# los datos y opciones de send_file para la descarga
+TIPOS_TRABAJO = {
+    "pdf": {
+        "tarea": tarea_pdf,
+        "documento": "oferta",
+        "obligatorios": ("data_cliente", "data_renglones"),
+        "descarga": {"as_attachment": False, "download_name": "documento.pdf", "mimetype": MIMETYPE_PDF},
+    },
+    "excel": {
+        "tarea": tarea_excel,
+        "documento": "excel",
+        "obligatorios": (),
+        "descarga": {"as_attachment": True, "download_name": "datos.xlsx", "mimetype": MIMETYPE_EXCEL},
+    },
+    "parte": {
+        "tarea": tarea_parte,
+        "documento": "parte_entregas",
+        "obligatorios": ("json_data", "entregas"),
+        "descarga": {"as_attachment": False, "download_name": "parte_entregas.pdf", "mimetype": MIMETYPE_PDF},
+    },
+}
+
+
+def tarea_trabajo(id_trabajo, tipo, data):
+    # Genera el documento de un trabajo de la cola y lo deja guardado; el
+    # documento no vuelve al servidor, sólo el acierto de cache y las métricas
+    ultima_fase = [None]
+
+    def avisar_fase(fase):
+        if fase != ultima_fase[0]:
+            ultima_fase[0] = fase
+            cola.registrar_fase(id_trabajo, fase)
+
+    metricas = Metricas(TIPOS_TRABAJO[tipo]["documento"], al_iniciar_fase=avisar_fase)
+    contenido, acierto, bloque = TIPOS_TRABAJO[tipo]["tarea"](data, metricas)
+    cola.terminar(id_trabajo, contenido, bloque)
+    return acierto, bloque
+
+
+def despachar_trabajos():
+    # Hilo del servidor: toma trabajos pendientes y los genera en el pool. Hay
+    # uno por worker, así que la cola nunca ocupa más workers que el pool
+    while True:
+        try:
+            trabajo = cola.tomar()
+        except Exception as e:
+            print(f"Error al leer la cola de trabajos: {e}", file=sys.stderr)
+            trabajo = None
+        if trabajo is None:
+            hay_trabajos.wait(INTERVALO_COLA)
+            hay_trabajos.clear()
+            try:
+                cola.purgar()
+            except Exception as e:
+                print(f"Error al purgar la cola de trabajos: {e}", file=sys.stderr)
+            continue
+
+        id_trabajo, tipo, data = trabajo
+        try:
+            acierto, metricas = ejecutar_en_pool(tarea_trabajo, id_trabajo, tipo, data)
+            registrar_acierto(acierto)
+            emitir_linea(metricas)
+        except Exception as e:
+            print(f"Error en el trabajo {id_trabajo} ({tipo}): {e}", file=sys.stderr)
+            traceback.print_exc(file=sys.stderr)
+            try:
+                cola.fallar(id_trabajo, str(e))
+            except Exception:
+                pass
+
+
+def iniciar_despachadores():
+    cola.reanudar()
+    for _ in range(CANTIDAD_WORKERS):
+        threading.Thread(target=despachar_trabajos, daemon=True).start()
+
+
+def calentar_worker():
+    # Fuerza la carga de fuentes y estilos de reportlab antes del primer pedido
+    from reportlab.lib.styles import getSampleStyleSheet
+    getSampleStyleSheet()
+
+
+def ejecutar_en_pool(tarea, *argumentos):
+    if pool is None:
+        return tarea(*argumentos)
+    return pool.submit(tarea, *argumentos).result()
+
+
+def registrar_acierto(acierto):
+    if acierto is None:
+        return
+    with lock_aciertos_cache:
+        aciertos_cache["hits" if acierto else "misses"] += 1
+
+
+def enviar_documento(contenido, acierto, metricas, **opciones):
+    registrar_acierto(acierto)
+    # Una línea de métricas por pedido en el stderr del servidor; el mismo
+    # bloque viaja en el encabezado X-Metricas de la respuesta
+    emitir_linea(metricas)
+    respuesta = send_file(io.BytesIO(contenido), **opciones)
+    if acierto is not None:
+        respuesta.headers["X-Cache"] = "HIT" if acierto else "MISS"
+    respuesta.headers["X-Metricas"] = json.dumps(metricas, separators=(",", ":"))
+    return respuesta
+
+
+# ==== RUTAS ====
+
+@app.route("/salud", methods=["GET"])
+def salud():
+    return jsonify({"estado": "ok", "workers": CANTIDAD_WORKERS})
+
+
+@app.route("/cache", methods=["GET"])
+def estado_cache():
+    with lock_aciertos_cache:
+        aciertos = dict(aciertos_cache)
+    estadisticas = cache.estadisticas()
+    return jsonify({
+        "activa": cache.activa,
+        "hits": aciertos["hits"],
+        "misses": aciertos["misses"],
+        "documentos": estadisticas["documentos"],
+        "bytes": estadisticas["bytes"],
+        "bytes_maximo": estadisticas["bytes_maximo"],
+    })
+
+
+@app.route("/generarpdf", methods=["POST"])
+def generar_pdf():
+    try:
+        data = request.get_json()
+
+        if not data.get("data_cliente") or not data.get("data_renglones"):
+            return jsonify({"error": "Faltan datos obligatorios para generar el PDF"}), 400
+
+        contenido, acierto, metricas = ejecutar_en_pool(tarea_pdf, data)
+        return enviar_documento(
+            contenido,
+            acierto,
+            metricas,
+            as_attachment=False,
+            download_name="documento.pdf",
+            mimetype=MIMETYPE_PDF,
+        )
+    except Exception as e:
+        print(f"Error al generar PDF: {e}", file=sys.stderr)
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/generarexcel", methods=["POST"])
+def generar_excel_ruta():
+    try:
+        data = request.get_json()
+        contenido, acierto, metricas = ejecutar_en_pool(tarea_excel, data)
+        return enviar_documento(
+            contenido,
+            acierto,
+            metricas,
+            as_attachment=True,
+            download_name="datos.xlsx",
+            mimetype=MIMETYPE_EXCEL,
+        )
+    except Exception as e:
+        print(f"Error al exportar datos: {e}", file=sys.stderr)
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/generarparteentregas", methods=["POST"])
+def generar_parte_entregas():
+    try:
+        data = request.get_json()
+
+        if not data.get("json_data") or not data.get("entregas"):
+            return jsonify({"error": "Faltan json_data o entregas"}), 400
+
+        contenido, acierto, metricas = ejecutar_en_pool(tarea_parte, data)
+        return enviar_documento(
+            contenido,
+            acierto,
+            metricas,
+            as_attachment=False,
+            download_name="parte_entregas.pdf",
+            mimetype=MIMETYPE_PDF,
+        )
+    except Exception as e:
+        print(f"Error al generar parte entregas: {e}", file=sys.stderr)
+        return jsonify({"error": str(e)}), 500
+
+
+# ==== COLA DE TRABAJOS ====
+# POST /trabajos/<tipo> encola (202 con el id), GET /trabajos/<id> informa el
+# estado y el progreso y GET /trabajos/<id>/documento descarga el resultado
+
+@app.route("/trabajos", methods=["GET"])
+def estado_trabajos():
+    return jsonify(cola.estadisticas())
+
+
+@app.route("/trabajos/<tipo>", methods=["POST"])
+def encolar_trabajo(tipo):
+    try:
+        if tipo not in TIPOS_TRABAJO:
+            return jsonify({"error": f"Tipo de trabajo desconocido: {tipo}"}), 404
+
+        data = request.get_json()
+        faltantes = [campo for campo in TIPOS_TRABAJO[tipo]["obligatorios"] if not data.get(campo)]
+        if faltantes:
+            return jsonify({"error": f"Faltan datos obligatorios: {', '.join(faltantes)}"}), 400
+
+        id_trabajo = cola.encolar(tipo, data)
+        hay_trabajos.set()
+        return jsonify(cola.estado(id_trabajo)), 202
+    except Exception as e:
+        print(f"Error al encolar trabajo: {e}", file=sys.stderr)
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/trabajos/<id_trabajo>", methods=["GET"])
+def consultar_trabajo(id_trabajo):
+    estado = cola.estado(id_trabajo)
+    if estado is None:
+        return jsonify({"error": "Trabajo inexistente o vencido"}), 404
+    return jsonify(estado)
+
+
+@app.route("/trabajos/<id_trabajo>/documento", methods=["GET"])
+def descargar_trabajo(id_trabajo):
+    estado = cola.estado(id_trabajo)
+    if estado is None:
+        return jsonify({"error": "Trabajo inexistente o vencido"}), 404
+    if estado["estado"] != TERMINADO:
+        return jsonify(estado), 409
+    contenido = cola.artefacto(id_trabajo)
+    if contenido is None:
+        return jsonify({"error": "Trabajo inexistente o vencido"}), 404
+    respuesta = send_file(io.BytesIO(contenido), **TIPOS_TRABAJO[estado["tipo"]]["descarga"])
+    respuesta.headers["X-Metricas"] = json.dumps(estado.get("metricas", {}), separators=(",", ":"))
+    return respuesta
+
+
+if __name__ == "__main__":
+    # El pool se crea acá (y no al importar) para que los workers lanzados con
+    # "spawn" en Windows no intenten crear su propio pool
+    pool = ProcessPoolExecutor(max_workers=CANTIDAD_WORKERS, initializer=calentar_worker)
+    # Los workers se lanzan antes que los hilos de la cola: con "fork" un hijo
+    # que hereda una conexión SQLite abierta en otro hilo puede dañar la base
+    pool.submit(calentar_worker).result()
+    iniciar_despachadores()
+    try:
+        app.run(host=HOST, port=PUERTO, threaded=True)
+    finally:
+        pool.shutdown(wait=True)
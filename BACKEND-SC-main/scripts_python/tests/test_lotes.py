@@ -0,0 +1,71 @@
+import io
+import os
+import sys
+import json
+import zipfile
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Lotes con elementos inválidos: cada uno tiene que quedar como un error en
+# errores.json sin cortar el zip de los demás.
+#
+#   py -m pytest tests/test_lotes.py
+
+
+def ejecutar_lote(script, entrada):
+    proceso = subprocess.run(
+        [sys.executable, os.path.join(BASE_DIR, script)],
+        input=json.dumps(entrada).encode("utf-8"),
+        capture_output=True,
+        env={**os.environ, "CACHE_DOCUMENTOS": "0"},
+        timeout=120,
+    )
+    assert proceso.returncode == 0, proceso.stderr.decode("utf-8", "replace")
+    archivo_zip = zipfile.ZipFile(io.BytesIO(proceso.stdout))
+    # testzip lee cada entrada completa y controla su CRC
+    assert archivo_zip.testzip() is None
+    return archivo_zip
+
+
+def errores_del_zip(archivo_zip):
+    return {error["index"]: error for error in json.loads(archivo_zip.read("errores.json"))}
+
+
+def test_lote_ofertas_con_elementos_invalidos():
+    archivo_zip = ejecutar_lote("generador_pdf/generar_pdf_lote.py", {"licitaciones": [None, "basura"]})
+    errores = errores_del_zip(archivo_zip)
+    assert sorted(errores) == [0, 1]
+    assert errores[0]["fileName"] == "oferta_1.pdf"
+    assert errores[1]["fileName"] == "oferta_2.pdf"
+    assert archivo_zip.namelist() == ["errores.json"]
+
+
+def parte_valido(numero_parte):
+    return {
+        "json_data": {
+            "fecha_parte": "01/03/2025",
+            "conductor": "JUAN PEREZ",
+            "numero_parte": numero_parte,
+            "sucursal": "CASA CENTRAL",
+            "fecha_entrega": "02/03/2025",
+            "vehiculo": "FIAT DUCATO",
+            "patente": "AB123CD",
+            "observaciones": "",
+        },
+        "entregas": [{"orden": "1", "cliente": "FARMACIA SAN JOSE", "remito": "0001-00000001"}],
+    }
+
+
+def test_lote_partes_con_elementos_invalidos():
+    partes = [parte_valido("10"), "basura", None, {"json_data": "texto", "entregas": [{}]}]
+    archivo_zip = ejecutar_lote(
+        "generador_parte_entregas/generar_partes_lote.py", {"partes": partes, "formato": "zip"}
+    )
+    errores = errores_del_zip(archivo_zip)
+    assert sorted(errores) == [1, 2, 3]
+    assert [errores[indice]["fileName"] for indice in (1, 2, 3)] == [
+        "parte_entregas_2.pdf", "parte_entregas_3.pdf", "parte_entregas_4.pdf"
+    ]
+    assert sorted(archivo_zip.namelist()) == ["errores.json", "parte_entregas_1_10.pdf"]
+    assert archivo_zip.read("parte_entregas_1_10.pdf").startswith(b"%PDF")
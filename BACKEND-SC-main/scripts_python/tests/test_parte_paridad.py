@@ -0,0 +1,90 @@
+import os
+import sys
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, "generador_parte_entregas"))
+
+from generador_parte import ENTREGAS_POR_PAGINA, construir_parte_entregas_pdf
+from parte_canvas import construir_parte_entregas_canvas
+
+pdfium = pytest.importorskip("pypdfium2")
+
+# Paridad visual de los motores del parte de entregas: el motor "canvas"
+# (parte_canvas.py) tiene que dar página por página la misma imagen que el
+# "platypus" (las tablas de generador_parte.py).
+#
+#   py -m pytest tests/test_parte_paridad.py
+
+JSON_DATA = {
+    "fecha_parte": "01/03/2025",
+    "conductor": "JUAN PEREZ",
+    "numero_parte": "1234",
+    "sucursal": "CASA CENTRAL",
+    "fecha_entrega": "02/03/2025",
+    "vehiculo": "FIAT DUCATO",
+    "patente": "AB123CD",
+    "observaciones": "SIN OBSERVACIONES",
+}
+
+CLIENTES = [
+    "FARMACIA SAN JOSE",
+    "HOSPITAL REGIONAL DEL NORTE SOCIEDAD COOPERATIVA ASOCIACION MUTUAL PROVINCIAL MUNICIPAL",
+    "CLINICA SANTA RITA S.R.L.",
+]
+
+
+def entregas(cantidad, **cambios):
+    # cantidad entregas comunes; cambios: {indice: {campo: valor}}
+    lista = [
+        {
+            "orden": str(indice + 1),
+            "cliente": CLIENTES[indice % len(CLIENTES)],
+            "remito": f"{indice % 20 + 1:04d}-{indice * 7919 % 99999999:08d}",
+        }
+        for indice in range(cantidad)
+    ]
+    for indice, valores in cambios.get("filas", {}).items():
+        lista[indice].update(valores)
+    return lista
+
+
+CASOS = {
+    "marcado": entregas(3, filas={0: {"cliente": "A & B <b>DISTRIBUIDORA</b> S.R.L."}}),
+    "entidad": entregas(3, filas={1: {"cliente": "PEREZ &amp; HIJOS S.A."}}),
+    "palabra_larga_cliente": entregas(3, filas={0: {"cliente": "X" * 120}}),
+    "palabra_larga_remito": entregas(3, filas={2: {"remito": "R" * 40}}),
+    "remito_varias_lineas": entregas(3, filas={1: {"remito": "0001-00000001 0002-00000002 0003-00000003"}}),
+    "vacios": entregas(3, filas={0: {"cliente": "", "remito": ""}, 1: {"orden": ""}}),
+    "espacios_y_acentos": entregas(2, filas={0: {"cliente": "  ESPACIOS   \n  Y TABULACIONES\t ÁÉÍÓÚ Ñ  "}}),
+    "orden_numerico_y_multilinea": entregas(3, filas={0: {"orden": 7}, 1: {"orden": "1\n2"}}),
+    "sin_entregas": [],
+    "una_entrega": entregas(1),
+    "pagina_justa": entregas(ENTREGAS_POR_PAGINA),
+    "pagina_y_una": entregas(ENTREGAS_POR_PAGINA + 1),
+    "dos_paginas_justas": entregas(2 * ENTREGAS_POR_PAGINA),
+    "dos_paginas_y_una": entregas(2 * ENTREGAS_POR_PAGINA + 1),
+    "paginas_repetidas": entregas(ENTREGAS_POR_PAGINA) * 2,
+}
+
+
+def imagenes(pdf):
+    documento = pdfium.PdfDocument(pdf)
+    return [documento[numero].render(scale=2).to_pil().convert("L").tobytes() for numero in range(len(documento))]
+
+
+@pytest.fixture(autouse=True)
+def sin_cache(monkeypatch):
+    monkeypatch.setenv("CACHE_DOCUMENTOS", "0")
+
+
+@pytest.mark.parametrize("caso", sorted(CASOS))
+def test_canvas_igual_a_platypus(caso):
+    lista = CASOS[caso]
+    platypus = imagenes(construir_parte_entregas_pdf(JSON_DATA, lista).getvalue())
+    canvas = imagenes(construir_parte_entregas_canvas(JSON_DATA, lista).getvalue())
+    assert len(canvas) == len(platypus)
+    distintas = [numero + 1 for numero, (a, b) in enumerate(zip(platypus, canvas)) if a != b]
+    assert not distintas, f"páginas distintas: {distintas}"